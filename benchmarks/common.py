@@ -0,0 +1,108 @@
+"""
+Общие утилиты бенчмарков: замер времени и пиковой памяти,
+машиночитаемый отчет и сравнение с предыдущим прогоном.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def add_master_path():
+    """Делает импортируемыми модули мастера (core, models, utils)"""
+    sys.path.insert(0, os.path.join(ROOT, "master"))
+
+
+def measure(func: Callable[[], int], repeat: int = 3, trace_memory: bool = True) -> Dict[str, Any]:
+    """
+    Выполняет func repeat раз. func возвращает число обработанных элементов.
+    Возвращает лучшее время, элементы в секунду и пиковую память.
+    tracemalloc заметно замедляет выполнение, поэтому память меряется
+    отдельным прогоном, не входящим в замер времени
+    """
+    best = None
+    items = 0
+    
+    for _ in range(repeat):
+        started = time.perf_counter()
+        items = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        
+    result = {
+        "items": items,
+        "seconds": round(best, 6),
+        "items_per_second": round(items / best, 1) if best else None
+    }
+    
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            func()
+            result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def build_report(name: str, params: Dict[str, Any], results: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "suite": name,
+        "meta": {
+            "timestamp": time.time(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "params": params,
+        "results": results
+    }
+
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> bool:
+    """
+    Печатает сравнение с baseline по items_per_second.
+    Возвращает False, если есть регрессия больше threshold (доля)
+    """
+    ok = True
+    print(f"\n{'benchmark':40} {'baseline':>14} {'current':>14} {'change':>8}")
+    
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("items_per_second") or not result.get("items_per_second"):
+            continue
+            
+        change = result["items_per_second"] / base["items_per_second"] - 1
+        marker = ""
+        if change < -threshold:
+            marker = "  REGRESSION"
+            ok = False
+        print(f"{name:40} {base['items_per_second']:>14.1f} {result['items_per_second']:>14.1f} "
+              f"{change * 100:>7.1f}%{marker}")
+              
+    return ok
+
+
+def write_report(report: Dict[str, Any], path: str):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
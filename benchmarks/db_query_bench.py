@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Задержка запросов DatabaseManager/SecurityAnalyzer и путей обновления GUI
+на БД разного размера (см. seed_database.py).
+
+Для каждой БД замеряются все запросы и те же обращения к данным, что
+выполняют refresh_dashboard, refresh_findings и refresh_tasks. Если доступен
+дисплей, дополнительно замеряются сами методы MainWindow вместе с заполнением
+Treeview. При нескольких --db печатается показатель роста времени от числа
+находок: ~0 - константа, ~1 - линейный рост, больше 1 - сверхлинейный.
+
+Пример:
+    python benchmarks/seed_database.py --db /tmp/f1m.db --findings 1000000
+    python benchmarks/seed_database.py --db /tmp/f5m.db --findings 5000000 --tasks 10000
+    python benchmarks/db_query_bench.py --db /tmp/f1m.db --db /tmp/f5m.db --output db.json
+"""
+import argparse
+import logging
+import math
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Dict, List, Any
+
+from common import add_master_path, measure, build_report, compare_reports, write_report, load_report
+
+add_master_path()
+
+from core.security_analyzer import SecurityAnalyzer
+from models.database import DatabaseManager, FINDING_LIST_FIELDS
+
+
+class DatabaseMaster:
+    """
+    Фасад с интерфейсом MasterCore, которым пользуется MainWindow,
+    но без Redis: данные берутся только из БД
+    """
+    
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self.security_analyzer = SecurityAnalyzer(db)
+        
+    def get_wordlists(self) -> Dict[str, str]:
+        return {}
+        
+    def get_workers(self) -> Dict[str, Any]:
+        return {}
+        
+    def get_queue_metrics(self) -> Dict[str, Any]:
+        return {}
+        
+    def get_tasks(self, limit: int = 100, changed_since: int = None) -> List[Dict[str, Any]]:
+        return self.db.get_tasks(limit=limit, changed_since=changed_since)
+        
+    def get_change_marks(self) -> Dict[str, int]:
+        return self.db.get_change_marks()
+        
+    def get_schedule(self) -> Dict[str, Any]:
+        return {"tasks": [], "worker_load": {}, "decisions": []}
+        
+    def get_findings(self, task_id: str = None, checked: bool = None,
+                     host: str = None, severity: str = None,
+                     issue_code: int = None, fields: List[str] = None,
+                     search: str = None) -> List[Dict[str, Any]]:
+        return self.db.get_findings(task_id=task_id, checked=checked, host=host,
+                                    severity=severity, issue_code=issue_code, fields=fields,
+                                    search=search)
+        
+    def get_findings_page(self, after: List[str] = None, page_size: int = 100,
+                          fields: List[str] = None, **filters) -> Dict[str, Any]:
+        return self.db.get_findings_page(after=after, page_size=page_size, fields=fields, **filters)
+        
+    def count_findings(self, **filters) -> int:
+        return self.db.count_findings(**filters)
+        
+    def get_finding(self, finding_id: str) -> Dict[str, Any]:
+        return self.db.get_finding(finding_id)
+        
+    def get_issue_codes(self) -> Dict[int, str]:
+        return self.db.get_issue_codes()
+        
+    def get_security_summary(self) -> Dict[str, Any]:
+        return self.security_analyzer.get_security_summary()
+        
+    def export_findings(self, format_type: str, task_id: str = None) -> str:
+        return self.security_analyzer.export_findings(format_type, task_id)
+        
+    def export_findings_to_file(self, filename: str, format_type: str, task_id: str = None,
+                                finding_ids: List[str] = None, progress=None, cancelled=None) -> int:
+        return self.security_analyzer.export_findings_to_file(filename, format_type, task_id=task_id,
+                                                              finding_ids=finding_ids, progress=progress,
+                                                              cancelled=cancelled)
+        
+    def stop(self):
+        pass
+
+
+def dataset_info(db_path: str) -> Dict[str, Any]:
+    with sqlite3.connect(db_path) as conn:
+        findings = conn.execute("SELECT COUNT(*) FROM finding_rows").fetchone()[0]
+        tasks = conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+        # Самая крупная задача - худший случай для выборки по task_id
+        largest = conn.execute('''
+            SELECT task_id FROM finding_rows GROUP BY task_id ORDER BY COUNT(*) DESC LIMIT 1
+        ''').fetchone()
+        sample = conn.execute("SELECT finding_id, host FROM findings LIMIT 1").fetchone()
+        # Самая частая проблема - худший случай для фильтра по коду
+        middle = conn.execute(
+            "SELECT created_at, finding_id FROM finding_rows ORDER BY created_at, finding_id LIMIT 1 OFFSET ?",
+            (findings // 2,)
+        ).fetchone()
+        issue = conn.execute('''
+            SELECT code FROM finding_issues GROUP BY code ORDER BY COUNT(*) DESC LIMIT 1
+        ''').fetchone()
+        
+    return {
+        "findings": findings,
+        "tasks": tasks,
+        "largest_task_id": largest[0] if largest else None,
+        "sample_finding_id": sample[0] if sample else None,
+        "sample_host": sample[1] if sample else None,
+        "sample_issue_code": issue[0] if issue else None,
+        "middle_cursor": list(middle) if middle else None,
+        "size_bytes": os.path.getsize(db_path)
+    }
+
+
+def query_benchmarks(db: DatabaseManager, analyzer: SecurityAnalyzer, info: Dict[str, Any],
+                     full_scans: bool) -> Dict[str, Any]:
+    """Набор замеров: имя -> функция, возвращающая число обработанных элементов"""
+    task_id = info["largest_task_id"]
+    finding_id = info["sample_finding_id"]
+    counter = iter(range(10 ** 9))
+    # Курсор из середины таблицы: keyset-страница не зависит от глубины
+    deep_cursor = info["middle_cursor"]
+    
+    def new_finding(i: int) -> Dict[str, Any]:
+        return {
+            "finding_id": f"finding_dbbench_{i}",
+            "task_id": task_id or "task_dbbench",
+            "url": f"https://dbbench.example.com/admin{i}",
+            "status_code": 200,
+            "content_length": 1520,
+            "words": 253,
+            "lines": 25,
+            "severity": "medium",
+            "detected_issues": ["MEDIUM: Suspicious pattern in URL: (admin|login|auth|dashboard)"],
+            "raw_response": "{}"
+        }
+        
+    def refresh_findings_page() -> int:
+        """То же, что MainWindow.refresh_findings: страница с фильтрами и счетчик"""
+        filters = {"severity": "critical", "checked": False}
+        page = db.get_findings_page(page_size=200, fields=FINDING_LIST_FIELDS, **filters)
+        db.count_findings(**filters)
+        return len(page["findings"])
+        
+    benchmarks = {
+        "get_tasks": lambda: len(db.get_tasks()),
+        "get_findings_task": lambda: len(db.get_findings(task_id=task_id)),
+        "get_findings_host": lambda: len(db.get_findings(host=info["sample_host"] or "")),
+        "get_findings_critical": lambda: len(db.get_findings(severity="critical")),
+        "get_findings_issue": lambda: len(db.get_findings(issue_code=info["sample_issue_code"] or 0)),
+        "get_security_summary": lambda: analyzer.get_security_summary() and 1,
+        "count_findings_task_critical": lambda: db.count_findings(task_id=task_id, severity="critical") + 1,
+        "count_findings_unchecked": lambda: db.count_findings(checked=False) + 1,
+        "export_findings_json_task": lambda: analyzer.export_findings("json", task_id) and 1,
+        "get_finding": lambda: int(db.get_finding(finding_id) is not None),
+        "mark_finding_checked": lambda: db.mark_finding_checked(finding_id, True) or 1,
+        "update_task_progress": lambda: db.update_task_progress(task_id, 100) or 1,
+        "save_finding": lambda: int(db.save_finding(new_finding(next(counter)))),
+        "save_findings_1000": lambda: db.save_findings([new_finding(next(counter)) for _ in range(1000)]),
+        "get_findings_page_first": lambda: len(db.get_findings_page(page_size=200, fields=FINDING_LIST_FIELDS)["findings"]),
+        "get_findings_page_deep": lambda: len(db.get_findings_page(
+            after=deep_cursor, page_size=200, fields=FINDING_LIST_FIELDS
+        )["findings"]),
+        "get_findings_page_search": lambda: len(db.get_findings_page(
+            page_size=200, fields=FINDING_LIST_FIELDS, search="admin"
+        )["findings"]),
+        # Проверка отметок - все, что делает инкрементальное обновление GUI без изменений
+        "get_change_marks": lambda: len(db.get_change_marks()),
+        "get_findings_added_since": lambda: len(db.get_findings_page(
+            page_size=200, fields=FINDING_LIST_FIELDS, added_since=max(info["findings"] - 100, 0)
+        )["findings"]),
+        "gui_data_refresh_dashboard": lambda: analyzer.get_security_summary() and 1,
+        "gui_data_refresh_tasks": lambda: len(db.get_tasks()),
+        "gui_data_refresh_findings": refresh_findings_page
+    }
+    
+    if full_scans:
+        # Выборки всей таблицы - то, что сейчас делают GUI и экспорт
+        benchmarks.update({
+            "get_findings_all": lambda: len(db.get_findings()),
+            "get_findings_unchecked": lambda: len(db.get_findings(checked=False)),
+            "get_findings_all_list_fields": lambda: len(db.get_findings(fields=FINDING_LIST_FIELDS)),
+            "export_findings_json": lambda: analyzer.export_findings("json") and info["findings"],
+            "export_findings_csv": lambda: analyzer.export_findings("csv") and info["findings"],
+            # Потоковый экспорт GUI: страницами прямо в файл
+            "export_findings_json_stream": lambda: analyzer.export_findings_to_file(os.devnull, "json"),
+            "export_findings_csv_stream": lambda: analyzer.export_findings_to_file(os.devnull, "csv")
+        })
+        
+    return benchmarks
+
+
+def gui_benchmarks(master: DatabaseMaster, repeat: int) -> Dict[str, Any]:
+    """Замер методов MainWindow с настоящим Tk (нужен дисплей)"""
+    try:
+        import tkinter
+        from gui.main_window import MainWindow
+    except ImportError as e:
+        return {"skipped": f"tkinter is not available: {e}"}
+        
+    class BenchWindow(MainWindow):
+        def setup_data_refresh(self):
+            # Фоновое автообновление исказило бы замеры
+            pass
+            
+    try:
+        window = BenchWindow(master)
+    except tkinter.TclError as e:
+        return {"skipped": f"no display: {e}"}
+        
+    window.root.withdraw()
+    results = {}
+    
+    def timed(method):
+        def run():
+            # Обновления выполняются в фоне - ждем, пока результат будет применен к таблицам
+            method()
+            while window.executor.pending:
+                window.root.update()
+                time.sleep(0.001)
+            window.root.update()
+            return 1
+        return run
+        
+    try:
+        for name in ("refresh_dashboard", "refresh_tasks", "refresh_findings"):
+            results[f"gui_{name}"] = measure(timed(getattr(window, name)), repeat, trace_memory=False)
+    finally:
+        window.root.destroy()
+        
+    return results
+
+
+def growth_exponents(reports: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Показатель степени роста времени запроса от числа находок между крайними БД"""
+    if len(reports) < 2:
+        return {}
+        
+    smallest, largest = reports[0], reports[-1]
+    ratio = largest["dataset"]["findings"] / max(smallest["dataset"]["findings"], 1)
+    if ratio <= 1:
+        return {}
+        
+    exponents = {}
+    for name, result in largest["results"].items():
+        base = smallest["results"].get(name)
+        if not base or not base.get("seconds") or not result.get("seconds"):
+            continue
+        exponents[name] = round(math.log(result["seconds"] / base["seconds"]) / math.log(ratio), 2)
+    return exponents
+
+
+def run_database(db_path: str, args) -> Dict[str, Any]:
+    # Открытие БД переносит находки старого формата в текущую схему
+    db = DatabaseManager(db_path)
+    info = dataset_info(db_path)
+    print(f"\n{db_path}: {info['findings']} findings, {info['tasks']} tasks, "
+          f"{info['size_bytes'] / 1024 / 1024:.0f} MiB")
+          
+    full_scans = args.allow_full_scans or info["findings"] <= args.full_scan_limit
+    analyzer = SecurityAnalyzer(db)
+    results = {}
+    
+    for name, func in query_benchmarks(db, analyzer, info, full_scans).items():
+        results[name] = measure(func, args.repeat, args.memory)
+        line = f"  {name:32} {results[name]['seconds'] * 1000:>12.2f} ms"
+        if args.memory:
+            line += f" {results[name]['peak_memory_bytes'] / 1024 / 1024:>9.1f} MiB peak"
+        print(line)
+              
+    if not full_scans:
+        print(f"  full-table queries skipped above {args.full_scan_limit} findings (--allow-full-scans)")
+        
+    if args.gui:
+        if full_scans:
+            gui_results = gui_benchmarks(DatabaseMaster(db), args.repeat)
+            if "skipped" in gui_results:
+                print(f"  GUI benchmarks skipped: {gui_results['skipped']}")
+            else:
+                for name, result in gui_results.items():
+                    results[name] = result
+                    print(f"  {name:32} {result['seconds'] * 1000:>12.2f} ms")
+        else:
+            print("  GUI benchmarks skipped: refresh_findings loads the whole table")
+            
+    return {"db": db_path, "dataset": info, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Database query latency benchmark')
+    parser.add_argument('--db', action='append', required=True, help='Seeded database, repeatable')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per query, best time is reported')
+    parser.add_argument('--full-scan-limit', type=int, default=2000000,
+                        help='Skip whole-table queries on larger databases')
+    parser.add_argument('--allow-full-scans', action='store_true', help='Run whole-table queries at any size')
+    parser.add_argument('--memory', action='store_true', help='Also record peak memory (one extra traced run)')
+    parser.add_argument('--gui', action='store_true', help='Also time MainWindow refresh methods (needs a display)')
+    parser.add_argument('--in-place', action='store_true',
+                        help='Run on the given files instead of temporary copies (write queries modify them)')
+    parser.add_argument('--output', help='Write JSON results to file')
+    parser.add_argument('--compare', help='Baseline JSON file to compare with (largest database)')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Allowed slowdown before regression')
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    workdir = tempfile.mkdtemp(prefix="db_query_bench_")
+    databases = []
+    
+    try:
+        for db_path in args.db:
+            if not args.in_place:
+                copy = os.path.join(workdir, os.path.basename(db_path))
+                shutil.copyfile(db_path, copy)
+                db_path = copy
+            databases.append(run_database(db_path, args))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        
+    databases.sort(key=lambda r: r["dataset"]["findings"])
+    exponents = growth_exponents(databases)
+    if exponents:
+        print(f"\nGrowth exponent {databases[0]['dataset']['findings']} -> {databases[-1]['dataset']['findings']} findings:")
+        for name, exponent in sorted(exponents.items(), key=lambda item: -item[1]):
+            print(f"  {name:32} {exponent:>6.2f}")
+            
+    # Для сравнения между прогонами используется самая большая БД
+    report = build_report("db_query", {"repeat": args.repeat}, databases[-1]["results"])
+    report["databases"] = databases
+    report["growth_exponents"] = exponents
+    
+    if args.output:
+        write_report(report, args.output)
+        
+    if args.compare:
+        if not compare_reports(report, load_report(args.compare), args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
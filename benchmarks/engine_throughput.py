@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Сравнение пропускной способности движков фаззинга (native и ffuf)
+на локальном HTTP сервере.
+
+Пример:
+    python benchmarks/engine_throughput.py --words 20000 --threads 40 --output engines.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "worker"))
+
+from core.engines import create_engine
+
+class FuzzTargetHandler(BaseHTTPRequestHandler):
+    """Отвечает 200 на слова из hits, 301 на каталоги и 404 на остальное"""
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело пишутся отдельно - без TCP_NODELAY упираемся в delayed ACK
+    disable_nagle_algorithm = True
+    hits = set()
+    
+    def do_GET(self):
+        word = self.path.lstrip("/")
+        if word in self.hits:
+            status, body = 200, f"<html>found {word}</html>".encode()
+        elif word.startswith("dir"):
+            status, body = 301, b""
+        else:
+            status, body = 404, b"not found"
+            
+        self.send_response(status)
+        if status == 301:
+            self.send_header("Location", f"/{word}/")
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    """Запускает локальный сервер на свободном порту"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FuzzTargetHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_wordlist(words: int, hit_ratio: float):
+    """Генерирует словарь и набор слов, на которые сервер ответит 200"""
+    hit_every = max(1, int(1 / hit_ratio)) if hit_ratio > 0 else 0
+    hits = set()
+    
+    fd, path = tempfile.mkstemp(suffix=".txt", prefix="bench_wordlist_")
+    with os.fdopen(fd, "w") as f:
+        for i in range(words):
+            word = f"word{i}"
+            if hit_every and i % hit_every == 0:
+                hits.add(word)
+            f.write(word + "\n")
+    return path, hits
+
+
+def run_engine(name: str, target: str, wordlist: str, options: dict, ffuf_path: str):
+    """Запускает движок и возвращает метрики пропускной способности"""
+    engine = create_engine(name, {"ffuf_path": ffuf_path})
+    if not engine.is_available():
+        return {"skipped": f"{name} is not available"}
+        
+    started = time.perf_counter()
+    report = asyncio.run(engine.run_async(target, wordlist, options))
+    elapsed = time.perf_counter() - started
+    
+    if "error" in report:
+        return {"error": report["error"]}
+        
+    return {
+        "seconds": round(elapsed, 3),
+        "results": len(report.get("results", [])),
+        "found": sorted(item["input"]["FUZZ"] for item in report.get("results", []))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fuzzing engine throughput benchmark')
+    parser.add_argument('--words', type=int, default=10000, help='Wordlist size')
+    parser.add_argument('--hit-ratio', type=float, default=0.01, help='Share of words answered with 200')
+    parser.add_argument('--threads', type=int, default=40, help='Concurrent requests per engine')
+    parser.add_argument('--engines', default='native,ffuf', help='Comma-separated engines to run')
+    parser.add_argument('--ffuf-path', default=shutil.which("ffuf") or "ffuf", help='Path to ffuf binary')
+    parser.add_argument('--output', help='Write JSON results to file')
+    args = parser.parse_args()
+    
+    wordlist, hits = make_wordlist(args.words, args.hit_ratio)
+    FuzzTargetHandler.hits = hits
+    server = start_server()
+    target = f"http://127.0.0.1:{server.server_address[1]}/FUZZ"
+    options = {"threads": args.threads, "match_codes": "200"}
+    
+    report = {"words": args.words, "threads": args.threads, "expected_results": len(hits), "engines": {}}
+    
+    try:
+        for name in args.engines.split(","):
+            result = run_engine(name.strip(), target, wordlist, options, args.ffuf_path)
+            if "seconds" in result:
+                result["requests_per_second"] = round(args.words / result["seconds"], 1)
+                # Проверка корректности: найдены ровно ожидаемые слова
+                result["correct"] = result.pop("found") == sorted(hits)
+            report["engines"][name] = result
+            print(f"{name}: {json.dumps(result)}")
+    finally:
+        server.shutdown()
+        os.unlink(wordlist)
+        
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
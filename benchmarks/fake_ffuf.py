@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Заглушка ffuf для нагрузочных тестов без сети.
+
+Принимает те же аргументы, что FFufWrapper передает ffuf, "перебирает"
+словарь с заданной скоростью и печатает синтетический JSON-отчет.
+Параметры задаются переменными окружения:
+    FAKE_FFUF_RPS         - запросов в секунду (по умолчанию 10000, 0 - без задержки)
+    FAKE_FFUF_HIT_RATIO   - доля слов, попадающих в результаты (0.02)
+    FAKE_FFUF_STATUS_MIX  - веса статусов, например 200:0.6,403:0.4
+    FAKE_FFUF_FAIL_RATIO  - доля запусков, завершающихся ошибкой (0)
+
+Пример:
+    python worker/main.py --engine ffuf --ffuf-path benchmarks/fake_ffuf.py
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_hits, parse_status_mix
+
+
+def main():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('-h', action='store_true')
+    parser.add_argument('-u', dest='url', default='http://localhost/FUZZ')
+    parser.add_argument('-w', dest='wordlists', action='append', default=[])
+    parser.add_argument('-mode', dest='mode', default='clusterbomb')
+    args, _ = parser.parse_known_args()
+    
+    # FFufWrapper.is_available вызывает "ffuf -h"
+    if args.h:
+        print("Fuzz Faster U Fool (fake)")
+        return 0
+        
+    rps = float(os.environ.get("FAKE_FFUF_RPS", "10000"))
+    hit_ratio = float(os.environ.get("FAKE_FFUF_HIT_RATIO", "0.02"))
+    fail_ratio = float(os.environ.get("FAKE_FFUF_FAIL_RATIO", "0"))
+    status_mix = parse_status_mix(os.environ.get("FAKE_FFUF_STATUS_MIX", ""))
+    
+    # -w путь[:КЛЮЧЕВОЕ_СЛОВО], число запросов - число комбинаций словарей
+    sizes = []
+    for wordlist in args.wordlists:
+        path = wordlist.rsplit(":", 1)[0] if ":" in wordlist and not os.path.exists(wordlist) else wordlist
+        with open(path, "rb") as f:
+            sizes.append(sum(1 for line in f if line.strip()))
+    words = 0
+    if sizes:
+        words = min(sizes) if args.mode == "pitchfork" else 1
+        if args.mode != "pitchfork":
+            for size in sizes:
+                words *= size
+            
+    if rps > 0:
+        time.sleep(words / rps)
+        
+    if random.random() < fail_ratio:
+        print("fake ffuf failure", file=sys.stderr)
+        return 1
+        
+    url = args.url.replace("FUZZ", "{word}")
+    host = urlparse(args.url).netloc or "localhost"
+    results = generate_hits(
+        int(words * hit_ratio),
+        status_mix=status_mix,
+        url_patterns=[url],
+        host=host,
+        seed=random.randrange(1 << 30)
+    )
+    
+    print(json.dumps({
+        "commandline": " ".join(sys.argv),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+        "config": {"url": args.url}
+    }))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарки конвейера приема результатов мастера:
+разбор вывода ffuf (ResultParser), запись находок (DatabaseManager)
+и экспорт (SecurityAnalyzer, Exporters).
+
+Пример:
+    python benchmarks/ingest_bench.py --hits 20000 --output baseline.json
+    python benchmarks/ingest_bench.py --hits 20000 --compare baseline.json
+"""
+import argparse
+import itertools
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+from common import add_master_path, measure, build_report, compare_reports, write_report, load_report
+from synthetic import generate_report, parse_status_mix
+
+add_master_path()
+
+from core.result_parser import ResultParser
+from core.security_analyzer import SecurityAnalyzer
+from models.database import DatabaseManager
+from utils.exporters import Exporters
+
+
+def parse_findings(parser: ResultParser, report: dict, task_ids) -> list:
+    """Разбирает отчет с новым task_id, чтобы finding_id не повторялись между прогонами"""
+    return parser.parse_ffuf_results(next(task_ids), report)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Master ingestion pipeline benchmark')
+    arg_parser.add_argument('--hits', type=int, default=10000, help='Results in synthetic ffuf report')
+    arg_parser.add_argument('--status-mix', default='', help='Status weights, e.g. 200:0.5,403:0.3,404:0.2')
+    arg_parser.add_argument('--url-pattern', action='append', help='URL template with {host} and {word}, repeatable')
+    arg_parser.add_argument('--sensitive-ratio', type=float, default=0.1, help='Share of words matching parser rules')
+    arg_parser.add_argument('--single-inserts', type=int, default=2000, help='Findings written with save_finding')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark, best time is reported')
+    arg_parser.add_argument('--output', help='Write JSON results to file')
+    arg_parser.add_argument('--compare', help='Baseline JSON file to compare with')
+    arg_parser.add_argument('--threshold', type=float, default=0.1, help='Allowed slowdown before regression')
+    args = arg_parser.parse_args()
+    
+    # Парсер пишет info-лог на каждый отчет - в бенчмарке он не нужен
+    logging.disable(logging.INFO)
+    
+    report = generate_report(
+        args.hits,
+        status_mix=parse_status_mix(args.status_mix),
+        url_patterns=args.url_pattern,
+        sensitive_ratio=args.sensitive_ratio
+    )
+    parser = ResultParser()
+    task_ids = (f"bench{i}" for i in itertools.count())
+    findings = parse_findings(parser, report, task_ids)
+    
+    workdir = tempfile.mkdtemp(prefix="ingest_bench_")
+    db = DatabaseManager(os.path.join(workdir, "bench.db"))
+    analyzer = SecurityAnalyzer(db)
+    results = {}
+    
+    try:
+        def parse():
+            parser.parse_ffuf_results("parse", report)
+            return len(report["results"])
+            
+        results["parse_ffuf_results"] = measure(parse, args.repeat)
+        
+        # Находки для каждого прогона (и прогона с tracemalloc) готовятся заранее,
+        # чтобы разбор не попадал в замер
+        single_batches = iter([parse_findings(parser, report, task_ids)[:args.single_inserts]
+                               for _ in range(args.repeat + 1)])
+        results["save_finding"] = measure(
+            lambda: sum(db.save_finding(f) for f in next(single_batches)),
+            args.repeat
+        )
+        
+        bulk_batches = iter([parse_findings(parser, report, task_ids) for _ in range(args.repeat + 1)])
+        results["save_findings"] = measure(lambda: db.save_findings(next(bulk_batches)), args.repeat)
+        
+        stored = db.get_findings()
+        results["get_findings"] = measure(lambda: len(db.get_findings()), args.repeat)
+        
+        # Пропускная способность экспорта - находки в секунду
+        for format_type in ("json", "csv"):
+            results[f"export_findings_{format_type}"] = measure(
+                lambda: analyzer.export_findings(format_type) and len(stored),
+                args.repeat
+            )
+        for name, exporter in (("json", Exporters.export_to_json),
+                               ("csv", Exporters.export_to_csv),
+                               ("html", Exporters.export_to_html)):
+            results[f"exporters_{name}"] = measure(lambda: exporter(stored) and len(stored), args.repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        
+    params = {
+        "hits": args.hits,
+        "findings_per_report": len(findings),
+        "status_mix": args.status_mix or "default",
+        "url_patterns": args.url_pattern or "default",
+        "sensitive_ratio": args.sensitive_ratio,
+        "single_inserts": args.single_inserts,
+        "repeat": args.repeat
+    }
+    bench_report = build_report("ingest", params, results)
+    
+    for name, result in results.items():
+        print(f"{name:28} {result['items']:>9} items {result['items_per_second']:>12} items/s "
+              f"{result['peak_memory_bytes'] / 1024 / 1024:>8.1f} MiB peak")
+        
+    if args.output:
+        write_report(bench_report, args.output)
+        
+    if args.compare:
+        if not compare_reports(bench_report, load_report(args.compare), args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
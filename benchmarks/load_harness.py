@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Сквозной нагрузочный тест: локальный Redis (redis-server или fakeredis),
+мастер в этом процессе, N воркеров в отдельных процессах и заглушка ffuf
+(benchmarks/fake_ffuf.py) вместо реального сканирования.
+
+Нагрузка подается ступенями с возрастающей интенсивностью (задач в секунду).
+Для каждой ступени считаются задержка задачи от создания до завершения,
+время до первой находки, глубина очереди результатов во времени и
+достигнутая пропускная способность. Точка насыщения - первая ступень,
+на которой мастер перестает успевать за подаваемой нагрузкой.
+
+Пример:
+    python benchmarks/load_harness.py --workers 4 --rates 2,4,8,16 --words 5000 --output load.json
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Any
+
+from common import ROOT, add_master_path, build_report, write_report
+
+add_master_path()
+
+import redis
+from core.master_core import MasterCore
+
+FAKE_FFUF = os.path.join(ROOT, "benchmarks", "fake_ffuf.py")
+WORKER_MAIN = os.path.join(ROOT, "worker", "main.py")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalRedis:
+    """Локальный Redis: redis-server, если установлен, иначе fakeredis TcpFakeServer"""
+    
+    def __init__(self):
+        self.port = free_port()
+        self.process = None
+        self.server = None
+        self.kind = None
+        
+    def start(self):
+        redis_server = shutil.which("redis-server")
+        if redis_server:
+            self.process = subprocess.Popen(
+                [redis_server, "--port", str(self.port), "--bind", "127.0.0.1",
+                 "--save", "", "--appendonly", "no"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            self.kind = "redis-server"
+        else:
+            try:
+                from fakeredis import TcpFakeServer
+            except ImportError:
+                raise RuntimeError("Neither redis-server nor fakeredis is available")
+                
+            TcpFakeServer.daemon_threads = True
+            TcpFakeServer.block_on_close = False
+            self.server = TcpFakeServer(("127.0.0.1", self.port), server_type="redis")
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            self.kind = "fakeredis"
+            
+        client = redis.Redis(port=self.port)
+        for _ in range(50):
+            try:
+                client.ping()
+                return
+            except redis.ConnectionError:
+                time.sleep(0.1)
+        raise RuntimeError(f"Local Redis did not start on port {self.port}")
+        
+    def stop(self):
+        if self.process:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+class LoadProbe:
+    """Собирает временные метки задач и глубину очередей"""
+    
+    def __init__(self, master: MasterCore, sample_interval: float):
+        self.master = master
+        self.sample_interval = sample_interval
+        self.lock = threading.Lock()
+        self.created = {}
+        self.first_finding = {}
+        self.completed = {}
+        self.failed = {}
+        self.samples = []
+        self.is_running = False
+        self._instrument()
+        
+    def _instrument(self):
+        """Оборачивает методы БД и TaskManager, через которые проходит каждый результат"""
+        db = self.master.db
+        task_manager = self.master.task_manager
+        save_findings = db.save_findings
+        complete_task = db.complete_task
+        process_result = task_manager.process_result
+        
+        def timed_save_findings(findings):
+            saved = save_findings(findings)
+            if findings:
+                with self.lock:
+                    self.first_finding.setdefault(findings[0]["task_id"], time.time())
+            return saved
+            
+        def timed_complete_task(task_id, findings_count):
+            complete_task(task_id, findings_count)
+            with self.lock:
+                self.completed[task_id] = time.time()
+                
+        def timed_process_result(result):
+            if result.get("status") == "failed":
+                with self.lock:
+                    self.failed.setdefault(result.get("task_id"), time.time())
+            process_result(result)
+            
+        db.save_findings = timed_save_findings
+        db.complete_task = timed_complete_task
+        task_manager.process_result = timed_process_result
+        
+    def start(self):
+        self.is_running = True
+        threading.Thread(target=self._sample_loop, daemon=True).start()
+        
+    def stop(self):
+        self.is_running = False
+        
+    def _sample_loop(self):
+        while self.is_running:
+            metrics = self.master.get_queue_metrics()
+            self.samples.append({
+                "t": time.time(),
+                "results": metrics.get("results", 0),
+                "tasks": sum(metrics.get("tasks", {}).values()),
+                "deferred": metrics.get("deferred", 0)
+            })
+            time.sleep(self.sample_interval)
+            
+    def mark_created(self, task_id: str, created_at: float):
+        with self.lock:
+            self.created[task_id] = created_at
+            
+    def finished(self, task_ids: List[str]) -> bool:
+        with self.lock:
+            return all(t in self.completed or t in self.failed for t in task_ids)
+
+
+def percentile(values: List[float], p: float):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return round(values[index], 4)
+
+
+def start_workers(args, redis_port: int, workdir: str) -> List[subprocess.Popen]:
+    """Запускает воркеров отдельными процессами"""
+    env = dict(os.environ)
+    env.update({
+        "FAKE_FFUF_RPS": str(args.fake_rps),
+        "FAKE_FFUF_HIT_RATIO": str(args.hit_ratio),
+        "FAKE_FFUF_STATUS_MIX": args.status_mix,
+        "FAKE_FFUF_FAIL_RATIO": str(args.fail_ratio)
+    })
+    
+    workers = []
+    for i in range(args.workers):
+        # worker.log пишется в текущий каталог - держим его во временном
+        workers.append(subprocess.Popen(
+            [sys.executable, WORKER_MAIN,
+             "--worker-id", f"load-worker-{i}",
+             "--redis-host", "127.0.0.1",
+             "--redis-port", str(redis_port),
+             "--runtime", args.worker_runtime,
+             "--max-concurrent-tasks", str(args.max_concurrent_tasks),
+             "--engine", "ffuf",
+             "--ffuf-path", FAKE_FFUF,
+             "--log-level", "WARNING"],
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL
+        ))
+    return workers
+
+
+def wait_for_workers(master: MasterCore, count: int, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if len(master.get_workers()) >= count:
+            return
+        time.sleep(0.2)
+    raise RuntimeError(f"Only {len(master.get_workers())} of {count} workers registered")
+
+
+def run_stage(master: MasterCore, probe: LoadProbe, worker_ids: List[str], rate: float,
+              args, wordlist_name: str) -> Dict[str, Any]:
+    """Подает tasks_per_stage задач с интенсивностью rate задач/с и ждет их завершения"""
+    task_ids = []
+    stage_start = time.time()
+    
+    for i in range(args.tasks_per_stage):
+        # Шарды задачи выдаются fanout воркерам, выбранным по кругу
+        offset = (i * args.fanout) % len(worker_ids)
+        targets = [worker_ids[(offset + j) % len(worker_ids)] for j in range(args.fanout)]
+        
+        created_at = time.time()
+        task_id = master.create_scan_task(f"http://load-target-{i}.local/FUZZ", wordlist_name, targets)
+        probe.mark_created(task_id, created_at)
+        task_ids.append(task_id)
+        
+        next_at = stage_start + (i + 1) / rate
+        time.sleep(max(0, next_at - time.time()))
+        
+    submit_end = time.time()
+    deadline = submit_end + args.stage_timeout
+    while time.time() < deadline and not probe.finished(task_ids):
+        time.sleep(0.05)
+    stage_end = time.time()
+    
+    with probe.lock:
+        latencies = [probe.completed[t] - probe.created[t] for t in task_ids if t in probe.completed]
+        ttff = [probe.first_finding[t] - probe.created[t] for t in task_ids if t in probe.first_finding]
+        completed_at = [probe.completed[t] for t in task_ids if t in probe.completed]
+        failed = sum(1 for t in task_ids if t in probe.failed)
+        
+    samples = [s for s in probe.samples if stage_start <= s["t"] <= stage_end]
+    depths = [s["results"] for s in samples]
+    
+    achieved = None
+    if completed_at:
+        achieved = len(completed_at) / max(max(completed_at) - stage_start, 1e-6)
+        
+    # Задача делится на шарды словаря, fanout задает лишь круг допустимых воркеров
+    hits_per_task = int(args.words * args.hit_ratio)
+    
+    return {
+        "offered_tasks_per_second": rate,
+        "offered_hits_per_second": round(rate * hits_per_task, 1),
+        "achieved_tasks_per_second": round(achieved, 3) if achieved else None,
+        "achieved_hits_per_second": round(achieved * hits_per_task, 1) if achieved else None,
+        "tasks": len(task_ids),
+        "completed": len(completed_at),
+        "failed": failed,
+        "timed_out": len(task_ids) - len(completed_at) - failed,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_max": percentile(latencies, 100),
+        "time_to_first_finding_p50": percentile(ttff, 50),
+        "time_to_first_finding_p95": percentile(ttff, 95),
+        "results_queue_max": max(depths) if depths else 0,
+        "results_queue_mean": round(statistics.mean(depths), 2) if depths else 0,
+        "drain_seconds": round(stage_end - submit_end, 3),
+        "queue_depth": [[round(s["t"] - stage_start, 2), s["results"], s["tasks"]] for s in samples]
+    }
+
+
+def is_saturated(stage: Dict[str, Any], baseline: Dict[str, Any], args) -> bool:
+    """
+    Ступень насыщена, если задачи не успели завершиться, достигнутая
+    пропускная способность заметно ниже подаваемой или задержка
+    выросла в latency_factor раз относительно первой ступени
+    """
+    if stage["timed_out"]:
+        return True
+    if stage["achieved_tasks_per_second"] is None:
+        return True
+    if stage["achieved_tasks_per_second"] < stage["offered_tasks_per_second"] * args.throughput_ratio:
+        return True
+    if baseline and baseline["latency_p95"] and stage["latency_p95"]:
+        return stage["latency_p95"] > baseline["latency_p95"] * args.latency_factor
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end distributed load harness')
+    parser.add_argument('--workers', type=int, default=4, help='Worker processes')
+    parser.add_argument('--rates', default='1,2,4,8,16', help='Offered load per stage, tasks per second')
+    parser.add_argument('--tasks-per-stage', type=int, default=20, help='Tasks submitted per stage')
+    parser.add_argument('--fanout', type=int, default=1, help='Workers eligible for each task')
+    parser.add_argument('--words', type=int, default=5000, help='Wordlist size')
+    parser.add_argument('--hit-ratio', type=float, default=0.02, help='Share of words reported by fake ffuf')
+    parser.add_argument('--status-mix', default='', help='Status weights for fake ffuf')
+    parser.add_argument('--fail-ratio', type=float, default=0.0, help='Share of failing fake ffuf runs')
+    parser.add_argument('--fake-rps', type=float, default=50000, help='Requests per second of fake ffuf')
+    parser.add_argument('--master-runtime', choices=['async', 'threaded'], default='async')
+    parser.add_argument('--result-consumers', type=int, default=4)
+    parser.add_argument('--worker-runtime', choices=['async', 'threaded'], default='async')
+    parser.add_argument('--max-concurrent-tasks', type=int, default=2)
+    parser.add_argument('--stage-timeout', type=float, default=60, help='Seconds to wait for a stage to drain')
+    parser.add_argument('--throughput-ratio', type=float, default=0.9,
+                        help='Stage is saturated below this share of offered throughput')
+    parser.add_argument('--latency-factor', type=float, default=3.0,
+                        help='Stage is saturated when p95 latency grows by this factor')
+    parser.add_argument('--sample-interval', type=float, default=0.25, help='Queue depth sampling interval')
+    parser.add_argument('--keep-going', action='store_true', help='Run all stages after saturation')
+    parser.add_argument('--output', help='Write JSON results to file')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    workdir = tempfile.mkdtemp(prefix="load_harness_")
+    wordlist = os.path.join(workdir, "wordlist.txt")
+    with open(wordlist, "w") as f:
+        f.writelines(f"word{i}\n" for i in range(args.words))
+        
+    local_redis = LocalRedis()
+    local_redis.start()
+    print(f"Redis: {local_redis.kind} on port {local_redis.port}")
+    
+    master = MasterCore({
+        "redis_host": "127.0.0.1",
+        "redis_port": local_redis.port,
+        "db_path": os.path.join(workdir, "load.db"),
+        "runtime": args.master_runtime,
+        "result_consumers": args.result_consumers,
+        # Лимиты очередей не должны ограничивать подаваемую нагрузку
+        "task_queue_high_water": args.tasks_per_stage * 10,
+        "results_high_water": 100000,
+        # Цели повторяются от ступени к ступени: кэш сканирования ответил бы
+        # без воркеров, а базовые линии отбросили бы повторные находки
+        "scan_cache_ttl": 0,
+        "incremental_rescans": False
+    })
+    master.add_wordlist("load.txt", wordlist)
+    probe = LoadProbe(master, args.sample_interval)
+    workers = []
+    stages = []
+    saturation = None
+    
+    try:
+        master.start()
+        workers = start_workers(args, local_redis.port, workdir)
+        wait_for_workers(master, args.workers)
+        worker_ids = sorted(master.get_workers())
+        probe.start()
+        
+        for rate in [float(r) for r in args.rates.split(",")]:
+            stage = run_stage(master, probe, worker_ids, rate, args, "load.txt")
+            stage["saturated"] = is_saturated(stage, stages[0] if stages else None, args)
+            stages.append(stage)
+            
+            print(f"rate {rate:>6} tasks/s: achieved {stage['achieved_tasks_per_second']} tasks/s, "
+                  f"{stage['achieved_hits_per_second']} hits/s, latency p50/p95 "
+                  f"{stage['latency_p50']}/{stage['latency_p95']}s, first finding p50 "
+                  f"{stage['time_to_first_finding_p50']}s, results queue max {stage['results_queue_max']}"
+                  f"{'  SATURATED' if stage['saturated'] else ''}")
+                  
+            if stage["saturated"] and saturation is None:
+                saturation = stage
+                if not args.keep_going:
+                    break
+    finally:
+        probe.stop()
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            try:
+                worker.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+        master.stop()
+        local_redis.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+        
+    sustained = [s for s in stages if not s["saturated"]]
+    summary = {
+        "saturation_offered_tasks_per_second": saturation["offered_tasks_per_second"] if saturation else None,
+        "max_sustained_tasks_per_second": max((s["offered_tasks_per_second"] for s in sustained), default=None),
+        "max_sustained_hits_per_second": max((s["offered_hits_per_second"] for s in sustained), default=None)
+    }
+    print(json.dumps(summary))
+    
+    if args.output:
+        params = {k: v for k, v in vars(args).items() if k != "output"}
+        params["redis"] = local_redis.kind
+        report = build_report("load", params, {"stages": stages, "summary": summary})
+        write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Проверка инкрементальных повторных сканирований: TaskManager на fakeredis
+и временной БД получает результаты воркера напрямую.
+
+Сценарии:
+  - чистое повторное сканирование сохраняет только новые, измененные
+    и исчезнувшие находки;
+  - повторное сканирование, шард которого завершился ошибкой ffuf
+    (таймаут, ненулевой код выхода), не помечает URL исчезнувшими.
+
+Пример:
+    python benchmarks/rescan_check.py
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from typing import Dict, List, Any
+
+from common import add_master_path
+
+add_master_path()
+
+import fakeredis
+from core.task_manager import TaskManager
+from models.database import DatabaseManager
+
+TARGET = "http://rescan.example/FUZZ"
+
+
+def hit(path: str, status: int = 200, length: int = 500) -> Dict[str, Any]:
+    return {"url": f"http://rescan.example/{path}", "status": status, "length": length, "words": 10, "lines": 1}
+
+
+def scan(task_manager: TaskManager, wordlist: str, report: Dict[str, Any]) -> List[tuple]:
+    """Задача с одним шардом и результатом воркера, возвращает (url, change_type) ее находок"""
+    task_id = task_manager.create_task({
+        "target": TARGET, "wordlist_name": "rescan.txt", "wordlist_path": wordlist, "worker_ids": []
+    })
+    task_manager.process_result({
+        "task_id": task_id, "worker_id": "worker-check", "status": "completed", "results": report, "target": TARGET
+    })
+    return sorted((f["url"], f["change_type"]) for f in task_manager.db.get_findings(task_id=task_id))
+
+
+def check(name: str, actual, expected) -> bool:
+    ok = actual == expected
+    print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+    if not ok:
+        print(f"       expected {expected}")
+        print(f"       actual   {actual}")
+    return ok
+
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    workdir = tempfile.mkdtemp(prefix="rescan_check_")
+    try:
+        wordlist = os.path.join(workdir, "rescan.txt")
+        with open(wordlist, "w") as f:
+            f.write("admin\nlogin\nbackup\nconfig\n")
+            
+        # Кэш сканирования ответил бы на повтор сохраненным отчетом без воркера
+        task_manager = TaskManager(fakeredis.FakeRedis(decode_responses=True),
+                                   DatabaseManager(os.path.join(workdir, "rescan.db")),
+                                   config={"scan_cache_ttl": 0})
+        url = "http://rescan.example/"
+        results = []
+        
+        print("Incremental rescans")
+        results.append(check("first scan stores every finding", scan(task_manager, wordlist, {"results": [
+            hit("admin"), hit("login"), hit("backup", 403)
+        ]}), [(url + "admin", "new"), (url + "backup", "new"), (url + "login", "new")]))
+        
+        results.append(check("clean rescan stores new, changed and disappeared", scan(task_manager, wordlist, {"results": [
+            hit("admin", length=900), hit("login"), hit("config")
+        ]}), [(url + "admin", "changed"), (url + "backup", "disappeared"), (url + "config", "new")]))
+        
+        results.append(check("errored shard marks nothing disappeared", scan(task_manager, wordlist, {
+            "results": [hit("login")], "error": "ffuf timed out"
+        }), []))
+        
+        results.append(check("baseline survives the errored shard", scan(task_manager, wordlist, {"results": [
+            hit("admin", length=900), hit("login"), hit("config")
+        ]}), []))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
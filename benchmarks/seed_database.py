@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Заполняет БД мастера реалистичными данными для бенчмарков на больших объемах.
+
+Находки строятся из пула синтетических результатов ffuf, пропущенных через
+ResultParser, поэтому распределение критичности, detected_issues и
+raw_response совпадает с тем, что пишет мастер. Задачи и находки
+распределяются по времени за последние --days дней, часть находок отмечена
+как проверенные.
+
+Пример:
+    python benchmarks/seed_database.py --db /tmp/findings_1m.db --findings 1000000 --tasks 2000
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import time
+
+from common import add_master_path
+from synthetic import generate_hits
+
+add_master_path()
+
+from core.result_parser import ResultParser
+from models.database import DatabaseManager
+
+TEMPLATE_HOST = "seed-template.example.com"
+
+
+def build_templates(size: int, seed: int) -> list:
+    """Готовит пул шаблонов находок через настоящий ResultParser"""
+    hits = generate_hits(size, host=TEMPLATE_HOST, sensitive_ratio=0.1, seed=seed)
+    findings = ResultParser().parse_ffuf_results("template", {"results": hits})
+    
+    prefix = f"https://{TEMPLATE_HOST}"
+    for finding in findings:
+        finding["path"] = finding["url"][len(prefix):]
+    return findings
+
+
+def split_findings(total: int, tasks: int, rng: random.Random) -> list:
+    """Распределяет находки по задачам неравномерно, как в реальных сканах"""
+    weights = [rng.paretovariate(1.5) for _ in range(tasks)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    counts[0] += total - sum(counts)
+    return counts
+
+
+def format_ts(ts: float) -> str:
+    # Формат CURRENT_TIMESTAMP в SQLite
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ts))
+
+
+def seed(db_path: str, findings: int, tasks: int, days: int, checked_ratio: float,
+         batch_size: int, seed_value: int):
+    rng = random.Random(seed_value)
+    db = DatabaseManager(db_path)
+    
+    counts = split_findings(findings, tasks, rng)
+    templates = build_templates(min(max(counts) + 1, 200000), seed_value)
+    now = time.time()
+    task_times = sorted(now - rng.random() * days * 86400 for _ in range(tasks))
+    
+    conn = sqlite3.connect(db_path)
+    # Заполнение - разовая операция, надежность записи здесь не нужна
+    conn.execute("PRAGMA synchronous=OFF")
+    
+    written = 0
+    started = time.time()
+    batch = []
+    
+    for task_no, (count, created) in enumerate(zip(counts, task_times)):
+        task_id = f"task_seed{seed_value}_{task_no:07d}"
+        host = f"target-{task_no}.example.com"
+        duration = rng.uniform(30, 3600)
+        
+        conn.execute('''
+            INSERT OR IGNORE INTO tasks
+            (task_id, target, wordlist_name, wordlist_path, options, worker_ids, status,
+             progress, findings_count, created_at, completed_at)
+            VALUES (?, ?, ?, ?, ?, ?, 'completed', 100, ?, ?, ?)
+        ''', (
+            task_id, f"https://{host}/FUZZ", "common.txt", "/opt/wordlists/common.txt",
+            json.dumps({"method": "GET"}), json.dumps([f"worker-{task_no % 16}"]),
+            count, format_ts(created), format_ts(created + duration)
+        ))
+        
+        offset = rng.randrange(len(templates))
+        for i in range(count):
+            template = templates[(offset + i) % len(templates)]
+            path = template["path"]
+            if i >= len(templates):
+                path = f"{path}?r={i // len(templates)}"
+            url = f"https://{host}{path}"
+            
+            batch.append(dict(
+                template,
+                finding_id=f"finding_{task_id}_{hashlib.md5(url.encode()).hexdigest()[:8]}",
+                task_id=task_id,
+                url=url,
+                raw_response=template["raw_response"].replace(TEMPLATE_HOST, host),
+                checked=rng.random() < checked_ratio,
+                created_at=format_ts(created + duration * i / max(count, 1))
+            ))
+            
+            if len(batch) >= batch_size:
+                written += flush(conn, db, batch)
+                batch = []
+                rate = written / (time.time() - started)
+                print(f"\r{written}/{findings} findings ({rate:.0f}/s)", end="", flush=True)
+                
+    written += flush(conn, db, batch)
+    conn.close()
+    print(f"\r{written}/{findings} findings in {time.time() - started:.1f}s")
+    return written
+
+
+def flush(conn: sqlite3.Connection, db: DatabaseManager, batch: list) -> int:
+    # Задачи пишутся своим соединением, находки - через DatabaseManager (справочники, сжатие)
+    conn.commit()
+    if not batch:
+        return 0
+    return db.save_findings(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed master database with synthetic findings')
+    parser.add_argument('--db', required=True, help='Database path (created if missing)')
+    parser.add_argument('--findings', type=int, default=1000000, help='Findings to insert')
+    parser.add_argument('--tasks', type=int, default=2000, help='Tasks to spread findings across')
+    parser.add_argument('--days', type=int, default=90, help='Time span of seeded data')
+    parser.add_argument('--checked-ratio', type=float, default=0.3, help='Share of findings marked checked')
+    parser.add_argument('--batch-size', type=int, default=50000, help='Rows per transaction')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    
+    if os.path.exists(args.db):
+        print(f"Appending to existing database {args.db}", file=sys.stderr)
+        
+    seed(args.db, args.findings, args.tasks, args.days, args.checked_ratio, args.batch_size, args.seed)
+
+
+if __name__ == "__main__":
+    main()
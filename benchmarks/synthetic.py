@@ -0,0 +1,79 @@
+"""
+Генератор синтетического JSON-вывода ffuf для бенчмарков.
+"""
+import random
+import time
+from typing import Dict, List, Any
+
+DEFAULT_STATUS_MIX = {200: 0.45, 301: 0.15, 302: 0.05, 403: 0.2, 500: 0.05, 404: 0.1}
+
+DEFAULT_URL_PATTERNS = [
+    "https://{host}/{word}",
+    "https://{host}/{word}.php",
+    "https://{host}/api/v1/{word}",
+    "https://{host}/{word}/",
+]
+
+# Слова, на которые срабатывают правила ResultParser
+SENSITIVE_WORDS = ["admin", "backup", ".git", ".env", "config", "debug", "login", "password", "dump.old"]
+
+
+def parse_status_mix(spec: str) -> Dict[int, float]:
+    """Разбирает строку вида "200:0.5,403:0.3,404:0.2" """
+    if not spec:
+        return dict(DEFAULT_STATUS_MIX)
+        
+    mix = {}
+    for part in spec.split(","):
+        status, weight = part.split(":")
+        mix[int(status)] = float(weight)
+    return mix
+
+
+def generate_hits(count: int, status_mix: Dict[int, float] = None, url_patterns: List[str] = None,
+                  host: str = "target.example.com", sensitive_ratio: float = 0.1,
+                  seed: int = 42) -> List[Dict[str, Any]]:
+    """Генерирует список результатов в формате ffuf"""
+    rng = random.Random(seed)
+    status_mix = status_mix or DEFAULT_STATUS_MIX
+    url_patterns = url_patterns or DEFAULT_URL_PATTERNS
+    statuses = list(status_mix)
+    weights = [status_mix[s] for s in statuses]
+    
+    hits = []
+    for position in range(1, count + 1):
+        if rng.random() < sensitive_ratio:
+            word = f"{rng.choice(SENSITIVE_WORDS)}{position}"
+        else:
+            word = f"path{position}"
+            
+        url = rng.choice(url_patterns).format(host=host, word=word)
+        status = rng.choices(statuses, weights)[0]
+        length = rng.choice([0, 42, 1520, 4096, 18234, 2_000_000]) if status == 200 else rng.randint(0, 600)
+        
+        hits.append({
+            "input": {"FUZZ": word},
+            "position": position,
+            "status": status,
+            "length": length,
+            "words": max(1, length // 6),
+            "lines": max(1, length // 60),
+            "content-type": "text/html",
+            "redirectlocation": url + "/" if status in (301, 302) else "",
+            "scraper": {},
+            "duration": rng.randint(1_000_000, 300_000_000),
+            "resultfile": "",
+            "url": url,
+            "host": host
+        })
+    return hits
+
+
+def generate_report(count: int, **kwargs) -> Dict[str, Any]:
+    """Генерирует полный отчет ffuf (-of json)"""
+    return {
+        "commandline": "ffuf -u https://target.example.com/FUZZ -w wordlist.txt -o - -of json",
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": generate_hits(count, **kwargs),
+        "config": {"url": "https://target.example.com/FUZZ", "method": "GET", "threads": 40}
+    }
@@ -4,11 +4,16 @@ import logging
 import sys
 import time
 import os
+import queue
+import redis
 
 # Добавляем путь для импортов
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from core.master_core import MasterCore
+from core.scheduler import PRIORITIES, DEFAULT_PRIORITY
+from models.database import FINDING_LIST_FIELDS
+from core.events import listen_events, DEFAULT_CHANNEL, EVENT_FINDINGS, EVENT_TASK, EVENT_WORKER
 
 class CLIController:
     def __init__(self, master_core: MasterCore):
@@ -36,6 +41,9 @@ class CLIController:
             print("6. Export Findings")
             print("7. Security Summary")
             print("8. Add Wordlist")
+            print("9. Task Latency")
+            print("10. Profiling")
+            print("11. Watch Live Events")
             print("0. Exit")
             print("="*50)
             
@@ -57,6 +65,12 @@ class CLIController:
                 self.security_summary()
             elif choice == "8":
                 self.add_wordlist()
+            elif choice == "9":
+                self.task_latency()
+            elif choice == "10":
+                self.profiling()
+            elif choice == "11":
+                self.watch_events()
             elif choice == "0":
                 self.logger.info("Exiting...")
                 break
@@ -67,7 +81,7 @@ class CLIController:
         """Запускает новое сканирование через CLI"""
         print("\n--- New Scan Configuration ---")
         
-        target = input("Target URL (with FUZZ): ").strip()
+        target = input("Target URL (with FUZZ), or @file with one target per line: ").strip()
         if not target:
             print("Target is required!")
             return
@@ -117,14 +131,68 @@ class CLIController:
             "threads": threads
         }
         
+        engine = input("Engine (ffuf/native, default: worker setting): ").strip()
+        if engine:
+            if engine not in ("ffuf", "native"):
+                print("Invalid engine!")
+                return
+            options["engine"] = engine
+        
+        priority = input(f"Priority ({'/'.join(PRIORITIES)}, default: {DEFAULT_PRIORITY}): ").strip().lower()
+        if priority:
+            if priority not in PRIORITIES:
+                print("Invalid priority!")
+                return
+            options["priority"] = priority
+        
+        project = input("Project for fair share (default: target host): ").strip()
+        if project:
+            options["project"] = project
+        
+        keywords = {}
+        extra = input("Extra wordlists for other keywords (e.g. W2=api-wordlist.txt, empty for none): ").strip()
+        for item in extra.split(","):
+            if not item.strip():
+                continue
+            keyword, _, name = item.partition("=")
+            if name.strip() not in wordlists:
+                print(f"Invalid extra wordlist: {item.strip()}")
+                return
+            keywords[keyword.strip()] = name.strip()
+        if keywords:
+            mode = input("Mode (clusterbomb/pitchfork, default: clusterbomb): ").strip().lower() or "clusterbomb"
+            if mode not in ("clusterbomb", "pitchfork"):
+                print("Invalid mode!")
+                return
+            options["mode"] = mode
+        
+        if input("Recursive scan of discovered directories? (y/N): ").strip().lower() == 'y':
+            options["recursive"] = True
+            depth = input("Max recursion depth (default: 2): ").strip()
+            if depth:
+                options["recursion_depth"] = int(depth)
+        
+        if input("Reuse cached results of identical scans? (Y/n): ").strip().lower() == 'n':
+            options["cache"] = False
+        
         # Запуск сканирования
         try:
-            task_id = self.master_core.create_scan_task(
-                target=target,
-                wordlist_name=wordlist_name,
-                worker_ids=selected_workers,
-                options=options
-            )
+            if target.startswith("@"):
+                task_id = self.master_core.create_batch_task(
+                    targets_file=target[1:],
+                    wordlist_name=wordlist_name,
+                    worker_ids=selected_workers,
+                    options=options,
+                    keywords=keywords
+                )
+            else:
+                task_id = self.master_core.create_scan_task(
+                    target=target,
+                    wordlist_name=wordlist_name,
+                    worker_ids=selected_workers,
+                    options=options,
+                    keywords=keywords
+                )
             print(f"\n✅ Scan started successfully!")
             print(f"Task ID: {task_id}")
             print(f"Workers: {', '.join(selected_workers)}")
@@ -136,8 +204,12 @@ class CLIController:
     def show_workers(self):
         """Показывает статус воркеров"""
         workers = self.master_core.get_workers()
+        queue_metrics = self.master_core.get_queue_metrics()
         
         print("\n--- Workers Status ---")
+        print(f"Results queue: {queue_metrics.get('results', 0)} "
+              f"(limit {queue_metrics.get('results_high_water', '-')}), "
+              f"deferred tasks: {queue_metrics.get('deferred', 0)}")
         if not workers:
             print("No workers connected")
             return
@@ -154,6 +226,7 @@ class CLIController:
             print(f"   Status: {status}")
             print(f"   Threads: {threads}")
             print(f"   Current Task: {current_task}")
+            print(f"   Queued Tasks: {queue_metrics.get('tasks', {}).get(worker_id, 0)}")
             print(f"   Last Seen: {last_seen}")
             print()
     
@@ -180,37 +253,52 @@ class CLIController:
             print(f"   Status: {status} ({progress}%)")
             print(f"   Findings: {findings_count}")
             print(f"   Created: {task['created_at']}")
+        
+        schedule = self.master_core.get_schedule()
+        if schedule["tasks"]:
+            print("\n--- Scheduler Queue ---")
+            print(f"  {'Task ID':<14} {'Project':<25} {'Priority':<8} {'Shards':>9} {'Running':>8} {'Pending':>8} {'Spec':>5}")
+            for task in schedule["tasks"]:
+                shards = f"{task['completed_shards']}/{task['total_shards']}"
+                print(f"  {task['task_id']:<14} {task['project'][:25]:<25} {task['priority']:<8} "
+                      f"{shards:>9} {task['running_shards']:>8} {task['pending_shards']:>8} "
+                      f"{task['speculative_shards']:>5}")
+                if task["targets"]:
+                    print(f"  {'':<14} batch targets completed: {task['targets']}")
+        
+        if schedule["decisions"]:
+            print("\nRecent scheduling decisions:")
+            for decision in schedule["decisions"][:10]:
+                print(f"  {time.strftime('%H:%M:%S', time.localtime(decision['time']))} "
+                      f"{decision['shard_id']} -> {decision['worker_id']}: {decision['reason']}")
             print()
     
     def show_findings(self):
         """Показывает находки"""
-        findings = self.master_core.get_findings()
+        host = input("Filter by host (scheme://host, empty for all): ").strip() or None
         
         print("\n--- Findings ---")
-        if not findings:
+        if not self.master_core.count_findings(host=host):
             print("No findings yet")
             return
         
-        # Группируем по критичности
-        by_severity = {}
-        for finding in findings:
-            severity = finding['severity']
-            if severity not in by_severity:
-                by_severity[severity] = []
-            by_severity[severity].append(finding)
-        
+        # По каждой критичности загружаются только первые 10 находок
         for severity in ['critical', 'high', 'medium', 'low', 'info']:
-            if severity in by_severity:
-                findings_list = by_severity[severity]
-                print(f"\n{severity.upper()} ({len(findings_list)}):")
-                print("-" * 50)
-                
-                for finding in findings_list[:10]:  # Показываем первые 10
-                    checked = "✓" if finding['checked'] else "✗"
-                    print(f"[{checked}] {finding['url']} ({finding['status_code']})")
-                
-                if len(findings_list) > 10:
-                    print(f"... and {len(findings_list) - 10} more")
+            total = self.master_core.count_findings(host=host, severity=severity)
+            if not total:
+                continue
+            page = self.master_core.get_findings_page(page_size=10, fields=FINDING_LIST_FIELDS,
+                                                      host=host, severity=severity)
+            print(f"\n{severity.upper()} ({total}):")
+            print("-" * 50)
+            
+            for finding in page["findings"]:
+                checked = "✓" if finding['checked'] else "✗"
+                change = f" [{finding['change_type']}]" if finding.get('change_type') else ""
+                print(f"[{checked}] {finding['url']} ({finding['status_code']}){change}")
+            
+            if total > 10:
+                print(f"... and {total - 10} more")
     
     def update_worker_threads(self):
         """Обновляет количество потоков воркера"""
@@ -280,6 +368,118 @@ class CLIController:
             for finding in summary['recent_critical'][:5]:
                 print(f"  - {finding['url']}")
     
+    def task_latency(self):
+        """Показывает водопад задержек задачи и сводку по стадиям"""
+        print("\n--- Task Latency ---")
+        task_id = input("Task ID (empty for summary of recent tasks): ").strip() or None
+        
+        if task_id:
+            waterfall = self.master_core.get_task_waterfall(task_id)
+            if not waterfall:
+                print("No trace data for this task")
+                return
+            
+            span = max((seg["offset"] + seg["duration"] for shard in waterfall for seg in shard["segments"]),
+                       default=0) or 1
+            width = 50
+            
+            for shard in waterfall:
+                print(f"\n{shard['shard_id']} (worker {shard['worker_id']}, total {shard['total']:.3f}s)")
+                for segment in shard["segments"]:
+                    start = int(segment["offset"] / span * width)
+                    length = max(1, int(segment["duration"] / span * width))
+                    bar = " " * start + "#" * length
+                    print(f"  {segment['stage']:<13} |{bar:<{width}}| {segment['duration']:.3f}s")
+        
+        summary = self.master_core.get_trace_summary(task_id)
+        print(f"\nStage percentiles ({summary['traces']} traces):")
+        print(f"  {'Stage':<13} {'Count':>6} {'P50 (s)':>9} {'P95 (s)':>9} {'Max (s)':>9}")
+        for stage, stats in summary["stages"].items():
+            print(f"  {stage:<13} {stats['count']:>6} {stats['p50']:>9.3f} {stats['p95']:>9.3f} {stats['max']:>9.3f}")
+        
+        export = input("\nExport summary (json/csv, empty to skip): ").strip().lower()
+        if export in ("json", "csv"):
+            try:
+                filename = f"latency_summary_{int(time.time())}.{export}"
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write(self.master_core.export_trace_summary(export, task_id))
+                print(f"✅ Latency summary exported to {filename}")
+            except Exception as e:
+                print(f"❌ Export failed: {str(e)}")
+    
+    def watch_events(self):
+        """Показывает события мастера по мере поступления до Ctrl+C"""
+        events = queue.Queue()
+        unsubscribe = self.master_core.subscribe_events(events.put)
+        print("\n--- Live Events (Ctrl+C to stop) ---")
+        try:
+            while True:
+                try:
+                    print(format_event(events.get(timeout=1)))
+                except queue.Empty:
+                    continue
+        except KeyboardInterrupt:
+            print()
+        finally:
+            unsubscribe()
+    
+    def profiling(self):
+        """Профилирование мастера и воркеров, скачивание профилей"""
+        print("\n--- Profiling ---")
+        print("1. Start Profile")
+        print("2. Stop Profile")
+        print("3. List / Download Profiles")
+        
+        try:
+            choice = int(input("Select action: "))
+            
+            if choice in (1, 2):
+                workers = self.master_core.get_workers()
+                targets = ["master"] + [wid for wid, info in workers.items() if info.get("status") == "active"]
+                
+                print("\nTargets:")
+                for i, target in enumerate(targets, 1):
+                    print(f"{i}. {target}")
+                target = targets[int(input("Select target: ")) - 1]
+                
+                if choice == 2:
+                    self.master_core.stop_profile(target)
+                    print(f"✅ Stop requested for {target}")
+                    return
+                
+                kind = input("Profiler (sampling/cprofile/tracemalloc) [sampling]: ").strip() or "sampling"
+                duration = int(input("Duration in seconds (1-600) [30]: ").strip() or 30)
+                
+                profile_id = self.master_core.start_profile(target, kind, duration)
+                print(f"✅ Started {kind} profile {profile_id} on {target}, ready in about {duration}s")
+                
+            elif choice == 3:
+                profiles = self.master_core.get_profiles()
+                if not profiles:
+                    print("No profiles available")
+                    return
+                
+                print(f"\n{'#':<3} {'Profile ID':<18} {'Source':<20} {'Kind':<12} {'Duration':>9} {'Size':>10}")
+                for i, profile in enumerate(profiles, 1):
+                    kind = profile["kind"] + (" (failed)" if profile.get("error") else "")
+                    print(f"{i:<3} {profile['profile_id']:<18} {profile['source']:<20} {kind:<12} "
+                          f"{profile['duration']:>8.1f}s {profile['size'] / 1024:>8.1f}KB")
+                
+                selection = input("\nDownload profile # (empty to skip): ").strip()
+                if selection:
+                    path = self.master_core.download_profile(profiles[int(selection) - 1]["profile_id"])
+                    if path:
+                        print(f"✅ Profile saved to {path}")
+                    else:
+                        print("❌ Profile has expired")
+            else:
+                print("Invalid choice!")
+                
+        except (ValueError, IndexError):
+            print("Invalid selection!")
+        except Exception as e:
+            print(f"❌ Profiling failed: {str(e)}")
+    
     def add_wordlist(self):
         """Добавляет новый словарь"""
         print("\n--- Add New Wordlist ---")
@@ -300,21 +500,98 @@ class CLIController:
         except Exception as e:
             print(f"❌ Failed to add wordlist: {str(e)}")
 
+def format_event(event: dict) -> str:
+    """Строка события мастера для вывода в терминал"""
+    stamp = time.strftime("%H:%M:%S", time.localtime(event["time"]))
+    if event["type"] == EVENT_FINDINGS:
+        lines = [f"[{stamp}] {event['count']} new findings in task {event['task_id']}"
+                 + (f" ({event['critical']} critical)" if event.get("critical") else "")]
+        for finding in event.get("findings", []):
+            change = f" [{finding['change_type']}]" if finding.get("change_type") else ""
+            lines.append(f"    {finding['severity'].upper():8} {finding['url']} ({finding['status_code']}){change}")
+        return "\n".join(lines)
+    if event["type"] == EVENT_TASK:
+        status = event.get("status", "running")
+        return f"[{stamp}] task {event['task_id']}: {status} {event['progress']:.0f}%"
+    if event["type"] == EVENT_WORKER:
+        return f"[{stamp}] worker {event['worker_id']}: {event['status']}"
+    return f"[{stamp}] {event['type']}: {event}"
+
+
+def watch_remote(redis_client, channel: str = DEFAULT_CHANNEL):
+    """CLI watch: события мастера, запущенного в другом процессе, через Redis pub/sub"""
+    print(f"👀 Watching master events on {channel} (Ctrl+C to stop)")
+    try:
+        for event in listen_events(redis_client, channel):
+            print(format_event(event))
+    except KeyboardInterrupt:
+        print("\n👋 Exiting...")
+
+
 def main():
     parser = argparse.ArgumentParser(description='FFUF Master CLI Controller')
     parser.add_argument('--redis-host', default='localhost', help='Redis host')
     parser.add_argument('--redis-port', type=int, default=6379, help='Redis port')
     parser.add_argument('--redis-password', help='Redis password')
     parser.add_argument('--db-path', default='ffuf_master.db', help='Database path')
+    parser.add_argument('--task-queue-limit', type=int, default=10,
+                       help='Max shards outstanding on one worker')
+    parser.add_argument('--shard-size', type=int, default=2000,
+                       help='Wordlist lines per task shard')
+    parser.add_argument('--scheduler-prefetch', type=int, default=1,
+                       help='Shards queued on a worker beyond its running slots')
+    parser.add_argument('--speculation-factor', type=float, default=2.0,
+                       help='Re-run a shard on an idle worker after this many task-median durations')
+    parser.add_argument('--no-speculation', action='store_true',
+                       help='Disable speculative re-execution of straggler shards')
+    parser.add_argument('--max-recursion-depth', type=int, default=2,
+                       help='Default depth limit for recursive scans')
+    parser.add_argument('--batch-host-limit', type=int, default=2,
+                       help='Max shards of a batch scan running against one host')
+    parser.add_argument('--scan-cache-ttl', type=int, default=21600,
+                       help='Seconds a cached shard result stays valid for identical rescans (0 disables)')
+    parser.add_argument('--no-baselines', action='store_true',
+                       help='Store every finding of a rescan instead of only changes against the target baseline')
+    parser.add_argument('--results-queue-limit', type=int, default=1000,
+                       help='Results backlog at which workers pause pushing')
+    parser.add_argument('--queue-ttl', type=int, default=86400,
+                       help='TTL in seconds for per-worker queues')
+    parser.add_argument('--runtime', default='async', choices=['async', 'threaded'],
+                       help='Result processing runtime')
+    parser.add_argument('--result-consumers', type=int, default=4,
+                       help='Concurrent result consumers (async runtime)')
+    parser.add_argument('--metrics-port', type=int, default=0,
+                       help='Serve Prometheus metrics on this port (0 disables)')
+    parser.add_argument('--watch', action='store_true',
+                       help='Only print live events of a running master (Redis pub/sub), do not start a master')
     
     args = parser.parse_args()
     
+    if args.watch:
+        watch_remote(redis.Redis(host=args.redis_host, port=args.redis_port,
+                                 password=args.redis_password, decode_responses=True))
+        return
+    
     try:
         config = {
             "redis_host": args.redis_host,
             "redis_port": args.redis_port,
             "redis_password": args.redis_password,
-            "db_path": args.db_path
+            "db_path": args.db_path,
+            "task_queue_high_water": args.task_queue_limit,
+            "results_high_water": args.results_queue_limit,
+            "queue_ttl": args.queue_ttl,
+            "runtime": args.runtime,
+            "result_consumers": args.result_consumers,
+            "metrics_port": args.metrics_port,
+            "shard_size": args.shard_size,
+            "scheduler_prefetch": args.scheduler_prefetch,
+            "speculation": not args.no_speculation,
+            "speculation_factor": args.speculation_factor,
+            "max_recursion_depth": args.max_recursion_depth,
+            "batch_host_limit": args.batch_host_limit,
+            "scan_cache_ttl": args.scan_cache_ttl,
+            "incremental_rescans": not args.no_baselines
         }
         
         master_core = MasterCore(config)
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+import redis.asyncio as aioredis
+from .tracing import mark
+
+logger = logging.getLogger(__name__)
+
+class AsyncMasterRuntime:
+    """
+    Asyncio-рантайм мастера.
+    
+    Крутит event loop в отдельном потоке: несколько конкурентных потребителей
+    очереди результатов на async Redis клиенте с пулом соединений, периодическое
+    обслуживание TaskManager. Парсинг и запись в SQLite выполняются в executor,
+    чтобы не блокировать loop. GUI и CLI продолжают работать через синхронный
+    фасад MasterCore.
+    """
+    
+    def __init__(self, task_manager, config: Dict[str, Any]):
+        self.task_manager = task_manager
+        self.config = config
+        self.consumers = max(1, config.get("result_consumers", 4))
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, config.get("db_workers", 2)),
+            thread_name_prefix="master-db"
+        )
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.pool: Optional[aioredis.BlockingConnectionPool] = None
+        self.redis: Optional[aioredis.Redis] = None
+        self.thread = None
+        self.is_running = False
+        self._started = threading.Event()
+        self._start_error = None
+        self._main_task = None
+        
+    def start(self):
+        """Запускает event loop в фоновом потоке"""
+        self.is_running = True
+        self.thread = threading.Thread(target=self._run_loop, name="master-async", daemon=True)
+        self.thread.start()
+        
+        if not self._started.wait(timeout=10):
+            raise RuntimeError("Async master runtime failed to start")
+        if self._start_error:
+            raise RuntimeError(f"Async master runtime failed to start: {self._start_error}")
+        logger.info(f"Async master runtime started with {self.consumers} result consumers")
+        
+    def stop(self):
+        """Останавливает потребителей и event loop"""
+        self.is_running = False
+        
+        if self.loop and self._main_task:
+            self.loop.call_soon_threadsafe(self._main_task.cancel)
+        if self.thread:
+            self.thread.join(timeout=5)
+            
+        self.executor.shutdown(wait=True)
+        logger.info("Async master runtime stopped")
+        
+    def _run_loop(self):
+        """Точка входа фонового потока"""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        
+        try:
+            self._main_task = self.loop.create_task(self._main())
+            self.loop.run_until_complete(self._main_task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Async master runtime failed: {e}")
+            self._start_error = e
+            self._started.set()
+        finally:
+            self.loop.run_until_complete(self._close_redis())
+            self.loop.close()
+            
+    async def _main(self):
+        """Создает клиент Redis и запускает потребителей результатов"""
+        # Каждый потребитель держит соединение в BLPOP, плюс запас под остальные команды
+        self.pool = aioredis.BlockingConnectionPool(
+            host=self.config["redis_host"],
+            port=self.config["redis_port"],
+            password=self.config.get("redis_password"),
+            max_connections=self.consumers + 4
+        )
+        self.redis = aioredis.Redis(connection_pool=self.pool)
+        await self.redis.ping()
+        self._started.set()
+        
+        workers = [asyncio.create_task(self._consume_results(i)) for i in range(self.consumers)]
+        workers.append(asyncio.create_task(self._maintenance_loop()))
+        
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+                
+    async def _close_redis(self):
+        """Закрывает пул соединений"""
+        if self.pool is not None:
+            await self.pool.disconnect()
+            
+    async def _consume_results(self, consumer_id: int):
+        """Потребитель очереди результатов"""
+        loop = asyncio.get_running_loop()
+        
+        while self.is_running:
+            try:
+                result_data = await self.redis.blpop("results", timeout=1)
+                if not result_data:
+                    continue
+                    
+                _, raw_result = result_data
+                # Декодирование и сборка чанков - в loop, парсинг и запись в БД - в executor
+                result = self.task_manager.codec.decode(raw_result)
+                if result is None:
+                    continue
+                    
+                mark(result.get("trace"), "result_popped")
+                await loop.run_in_executor(self.executor, self.task_manager.process_result, result)
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Result consumer {consumer_id} error: {e}")
+                await asyncio.sleep(1)
+                
+    async def _maintenance_loop(self):
+        """Периодическое обслуживание TaskManager"""
+        loop = asyncio.get_running_loop()
+        
+        while self.is_running:
+            await asyncio.sleep(self.task_manager.maintenance_interval)
+            try:
+                await loop.run_in_executor(self.executor, self.task_manager.maintenance_tick)
+            except Exception as e:
+                logger.error(f"Maintenance loop error: {e}")
@@ -0,0 +1,75 @@
+import json
+import hashlib
+import logging
+from typing import Dict, Any, Iterator, Tuple
+from urllib.parse import urlparse, urlunparse
+from utils import metrics
+from .scan_cache import normalize_target, normalize_options
+from .scheduler import iter_targets
+
+logger = logging.getLogger(__name__)
+
+BASELINE_CHANGES = metrics.counter(
+    "ffuf_master_baseline_changes_total", "Rescan results compared against the target baseline", ["change_type"]
+)
+
+# Типы изменений находки относительно базовой линии цели
+CHANGE_NEW = "new"
+CHANGE_CHANGED = "changed"
+CHANGE_DISAPPEARED = "disappeared"
+CHANGE_UNCHANGED = "unchanged"
+
+
+def normalize_url(url: str) -> str:
+    """Ключ результата в базовой линии: схема и хост в нижнем регистре, без fragment"""
+    parsed = urlparse(url)
+    return urlunparse(parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower(), fragment=""))
+
+
+def response_signature(finding: Dict[str, Any]) -> str:
+    return f"{finding['status_code']}:{finding['content_length']}:{finding['words']}"
+
+
+def baseline_scope(task_data: Dict[str, Any], target: str) -> Tuple[str, str]:
+    """
+    Базовая линия ведется для цели, словарей и опций, влияющих на ответы:
+    сканирование другим словарем или методом не считается повторным.
+    Возвращает (scope, нормализованная цель)
+    """
+    target = normalize_target(target)
+    payload = {
+        "target": target,
+        "wordlists": task_data.get("wordlists") or {"FUZZ": task_data["wordlist_path"]},
+        "options": normalize_options(task_data.get("options", {}))
+    }
+    scope = hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()[:32]
+    return scope, target
+
+
+def task_scopes(task_data: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+    """Базовые линии всех целей задачи (пакетная задача - по строке файла целей)"""
+    if "targets_file" in task_data:
+        for _, target in iter_targets(task_data["targets_file"]):
+            yield baseline_scope(task_data, target)
+    else:
+        yield baseline_scope(task_data, task_data["target"])
+
+
+def disappeared_finding(task_id: str, previous: Dict[str, Any]) -> Dict[str, Any]:
+    """Находка об URL, который повторное сканирование больше не нашло"""
+    url_hash = hashlib.md5(previous["url"].encode()).hexdigest()[:8]
+    return {
+        "finding_id": f"finding_{task_id}_{url_hash}",
+        "task_id": task_id,
+        "url": previous["url"],
+        "host": previous["host"],
+        "status_code": previous["status_code"],
+        "content_length": previous["content_length"],
+        "words": previous["words"],
+        "lines": previous["lines"],
+        "severity": previous["severity"],
+        "detected_issues": ["Resource no longer found by rescan"],
+        "raw_response": None,
+        "change_type": CHANGE_DISAPPEARED,
+        "previous_finding_id": previous["finding_id"]
+    }
@@ -0,0 +1,99 @@
+import json
+import time
+import threading
+import logging
+from typing import Dict, List, Any, Callable, Iterator, Optional
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PUBLISHED = metrics.counter(
+    "ffuf_master_events_published_total", "Change events published to subscribers", ["type"]
+)
+
+DEFAULT_CHANNEL = "ffuf:events"
+
+# Типы событий
+EVENT_FINDINGS = "findings"
+EVENT_TASK = "task"
+EVENT_WORKER = "worker"
+
+# Находок в событии: остальные клиент догружает из БД по отметкам изменений
+MAX_EVENT_FINDINGS = 20
+
+
+class EventBus:
+    """
+    Шина событий об изменениях: новые находки, прогресс задач, состояние воркеров.
+    
+    Подписчики в процессе мастера (GUI, CLI) получают событие сразу из
+    публикующего потока, процессы вне мастера - через Redis pub/sub
+    (см. listen_events). Публикация не должна мешать обработке результатов:
+    ошибки подписчиков и Redis только логируются
+    """
+    
+    def __init__(self, redis_client=None, config: Dict[str, Any] = None):
+        config = config or {}
+        self.redis = redis_client if config.get("redis_events", True) else None
+        self.channel = config.get("events_channel", DEFAULT_CHANNEL)
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+        
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> Callable[[], None]:
+        """Подписывает callback на все события, возвращает функцию отписки"""
+        with self._lock:
+            self._subscribers.append(callback)
+            
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+        
+    def publish(self, event_type: str, **payload):
+        event = dict(payload, type=event_type, time=time.time())
+        EVENTS_PUBLISHED.labels(event_type).inc()
+        
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Event subscriber failed on {event_type} event: {str(e)}")
+                
+        if self.redis is not None:
+            try:
+                self.redis.publish(self.channel, json.dumps(event, separators=(",", ":")))
+            except Exception as e:
+                logger.error(f"Failed to publish {event_type} event: {str(e)}")
+
+
+def finding_summaries(findings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Краткие записи находок для события, критические - первыми"""
+    ordered = sorted(findings, key=lambda f: f.get("severity") != "critical")
+    return [{
+        "finding_id": finding["finding_id"],
+        "url": finding["url"],
+        "status_code": finding["status_code"],
+        "severity": finding["severity"],
+        "change_type": finding.get("change_type")
+    } for finding in ordered[:MAX_EVENT_FINDINGS]]
+
+
+def listen_events(redis_client, channel: str = DEFAULT_CHANNEL,
+                  stop: Optional[threading.Event] = None) -> Iterator[Dict[str, Any]]:
+    """События мастера из Redis pub/sub для процессов вне мастера, до stop.set()"""
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(channel)
+    try:
+        while stop is None or not stop.is_set():
+            message = pubsub.get_message(timeout=1.0)
+            if not message:
+                continue
+            try:
+                yield json.loads(message["data"])
+            except (TypeError, ValueError) as e:
+                logger.error(f"Malformed event on {channel}: {str(e)}")
+    finally:
+        pubsub.close()
@@ -1,9 +1,13 @@
+import os
 import redis
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Callable
 from .task_manager import TaskManager
+from .async_runtime import AsyncMasterRuntime
 from models.database import DatabaseManager
 from .security_analyzer import SecurityAnalyzer
+from .tracing import TraceAnalyzer
+from utils.metrics import start_metrics_server
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +26,13 @@ class MasterCore:
                 password=config.get("redis_password"),
                 decode_responses=True
             )
+            # Отдельный клиент для очередей с бинарными сообщениями
+            self.queue_client = redis.Redis(
+                host=config["redis_host"],
+                port=config["redis_port"],
+                password=config.get("redis_password"),
+                decode_responses=False
+            )
             # Проверка подключения
             self.redis_client.ping()
         except redis.ConnectionError as e:
@@ -32,8 +43,14 @@ class MasterCore:
             raise
         
         # Инициализация менеджеров
-        self.task_manager = TaskManager(self.redis_client, self.db)
+        self.task_manager = TaskManager(self.redis_client, self.db, self.queue_client, config)
+        # По умолчанию результаты разбирает asyncio-рантайм, "threaded" - прежний поток с BLPOP
+        self.runtime = None
+        if config.get("runtime", "async") == "async":
+            self.runtime = AsyncMasterRuntime(self.task_manager, config)
         self.security_analyzer = SecurityAnalyzer(self.db)
+        self.trace_analyzer = TraceAnalyzer(self.db)
+        self.metrics_server = None
         
         # Available wordlists
         self.wordlists = {
@@ -47,7 +64,14 @@ class MasterCore:
         """Запускает мастер узел"""
         try:
             logger.info("Starting master core")
-            self.task_manager.start()
+            self.task_manager.start(consume_results=self.runtime is None)
+            if self.runtime:
+                self.runtime.start()
+            # Prometheus /metrics, 0 - отключено
+            self.metrics_server = start_metrics_server(
+                self.config.get("metrics_port", 0),
+                self.config.get("metrics_host", "127.0.0.1")
+            )
         except Exception as e:
             logger.error(f"Failed to start master core: {e}")
             raise
@@ -56,22 +80,30 @@ class MasterCore:
         """Останавливает мастер узел"""
         try:
             logger.info("Stopping master core")
+            if self.runtime:
+                self.runtime.stop()
             self.task_manager.stop()
+            if self.metrics_server:
+                self.metrics_server.stop()
+                self.metrics_server = None
         except Exception as e:
             logger.error(f"Error stopping master core: {e}")
             raise
     
     def create_scan_task(self, target: str, wordlist_name: str, 
-                        worker_ids: List[str], options: Dict[str, Any] = None) -> str:
-        """Создает задачу сканирования"""
+                        worker_ids: List[str], options: Dict[str, Any] = None,
+                        keywords: Dict[str, str] = None) -> str:
+        """
+        Создает задачу сканирования. keywords - дополнительные словари
+        {ключевое слово: имя словаря} к FUZZ, режим сочетания - options["mode"]
+        (clusterbomb или pitchfork)
+        """
         try:
-            if wordlist_name not in self.wordlists:
-                raise ValueError(f"Wordlist {wordlist_name} not found")
-            
             task_data = {
                 "target": target,
                 "wordlist_name": wordlist_name,
-                "wordlist_path": self.wordlists[wordlist_name],
+                "wordlist_path": self._wordlist_path(wordlist_name),
+                "wordlists": self._resolve_keywords(wordlist_name, keywords),
                 "worker_ids": worker_ids,
                 "options": options or {}
             }
@@ -81,6 +113,42 @@ class MasterCore:
             logger.error(f"Failed to create scan task: {e}")
             raise
     
+    def create_batch_task(self, targets_file: str, wordlist_name: str,
+                          worker_ids: List[str], options: Dict[str, Any] = None,
+                          keywords: Dict[str, str] = None) -> str:
+        """Создает пакетную задачу: одна задача на все цели из файла (по строке на цель)"""
+        try:
+            if not os.path.isfile(targets_file):
+                raise ValueError(f"Targets file {targets_file} not found")
+            
+            task_data = {
+                "targets_file": os.path.abspath(targets_file),
+                "wordlist_name": wordlist_name,
+                "wordlist_path": self._wordlist_path(wordlist_name),
+                "wordlists": self._resolve_keywords(wordlist_name, keywords),
+                "worker_ids": worker_ids,
+                "options": options or {}
+            }
+            
+            return self.task_manager.create_task(task_data)
+        except Exception as e:
+            logger.error(f"Failed to create batch task: {e}")
+            raise
+    
+    def _wordlist_path(self, wordlist_name: str) -> str:
+        if wordlist_name not in self.wordlists:
+            raise ValueError(f"Wordlist {wordlist_name} not found")
+        return self.wordlists[wordlist_name]
+    
+    def _resolve_keywords(self, wordlist_name: str, keywords: Dict[str, str] = None) -> Dict[str, str]:
+        """Словари задачи {ключевое слово: путь}, основной словарь - FUZZ"""
+        wordlists = {"FUZZ": self._wordlist_path(wordlist_name)}
+        for keyword, name in (keywords or {}).items():
+            if keyword in wordlists:
+                raise ValueError(f"Keyword {keyword} is used twice")
+            wordlists[keyword] = self._wordlist_path(name)
+        return wordlists
+    
     def get_workers(self) -> Dict[str, Any]:
         """Возвращает информацию о воркерах"""
         try:
@@ -89,6 +157,14 @@ class MasterCore:
             logger.error(f"Failed to get workers: {e}")
             return {}
     
+    def get_queue_metrics(self) -> Dict[str, Any]:
+        """Возвращает глубину очередей Redis"""
+        try:
+            return self.task_manager.get_queue_metrics()
+        except Exception as e:
+            logger.error(f"Failed to get queue metrics: {e}")
+            return {}
+    
     def update_worker_threads(self, worker_id: str, threads: int):
         """Обновляет количество потоков воркера"""
         try:
@@ -97,22 +173,92 @@ class MasterCore:
             logger.error(f"Failed to update worker threads: {e}")
             raise
     
-    def get_tasks(self) -> List[Dict[str, Any]]:
-        """Возвращает список задач"""
+    def get_schedule(self) -> Dict[str, Any]:
+        """Возвращает очередь планировщика шардов и последние решения"""
+        try:
+            return self.task_manager.get_schedule()
+        except Exception as e:
+            logger.error(f"Failed to get schedule: {e}")
+            return {"tasks": [], "worker_load": {}, "decisions": []}
+    
+    def get_tasks(self, limit: int = 100, changed_since: int = None) -> List[Dict[str, Any]]:
+        """Возвращает список задач (changed_since - только измененные, см. get_change_marks)"""
         try:
-            return self.db.get_tasks()
+            return self.db.get_tasks(limit=limit, changed_since=changed_since)
         except Exception as e:
             logger.error(f"Failed to get tasks: {e}")
             return []
     
-    def get_findings(self, task_id: str = None, checked: bool = None) -> List[Dict[str, Any]]:
-        """Возвращает список находок"""
+    def subscribe_events(self, callback: Callable[[Dict[str, Any]], None]) -> Callable[[], None]:
+        """
+        Подписка на события об изменениях (новые находки, прогресс задач,
+        состояние воркеров). callback вызывается в потоке, опубликовавшем
+        событие; возвращает функцию отписки
+        """
+        return self.task_manager.events.subscribe(callback)
+    
+    def get_change_marks(self) -> Dict[str, int]:
+        """Отметки изменений находок и задач для инкрементального обновления"""
+        try:
+            return self.db.get_change_marks()
+        except Exception as e:
+            logger.error(f"Failed to get change marks: {e}")
+            return {}
+    
+    def get_findings(self, task_id: str = None, checked: bool = None,
+                     host: str = None, severity: str = None,
+                     issue_code: int = None, fields: List[str] = None,
+                     search: str = None) -> List[Dict[str, Any]]:
+        """Возвращает список находок (fields - только нужные поля)"""
         try:
-            return self.db.get_findings(task_id=task_id, checked=checked)
+            return self.db.get_findings(task_id=task_id, checked=checked, host=host,
+                                        severity=severity, issue_code=issue_code, fields=fields,
+                                        search=search)
         except Exception as e:
             logger.error(f"Failed to get findings: {e}")
             return []
     
+    def get_findings_page(self, after: List[str] = None, page_size: int = 100,
+                          fields: List[str] = None, **filters) -> Dict[str, Any]:
+        """Страница находок, after - курсор "next" предыдущей страницы"""
+        try:
+            return self.db.get_findings_page(after=after, page_size=page_size, fields=fields, **filters)
+        except Exception as e:
+            logger.error(f"Failed to get findings page: {e}")
+            return {"findings": [], "next": None}
+    
+    def count_findings(self, **filters) -> int:
+        """Число находок под фильтрами"""
+        try:
+            return self.db.count_findings(**filters)
+        except Exception as e:
+            logger.error(f"Failed to count findings: {e}")
+            return 0
+    
+    def get_finding_counts(self, task_id: str = None, host: str = None) -> Dict[str, Any]:
+        """Счетчики находок по критичности и непроверенных - всего, задачи или хоста"""
+        try:
+            return self.db.get_finding_counts(task_id=task_id, host=host)
+        except Exception as e:
+            logger.error(f"Failed to get finding counts: {e}")
+            return {"severity": {}, "unchecked": 0, "total": 0}
+    
+    def get_finding(self, finding_id: str) -> Optional[Dict[str, Any]]:
+        """Возвращает находку со всеми полями, включая raw_response"""
+        try:
+            return self.db.get_finding(finding_id)
+        except Exception as e:
+            logger.error(f"Failed to get finding {finding_id}: {e}")
+            return None
+    
+    def get_issue_codes(self) -> Dict[int, str]:
+        """Возвращает справочник проблем находок"""
+        try:
+            return self.db.get_issue_codes()
+        except Exception as e:
+            logger.error(f"Failed to get issue codes: {e}")
+            return {}
+    
     def mark_finding_checked(self, finding_id: str, checked: bool = True):
         """Отмечает находку как проверенную"""
         try:
@@ -137,6 +283,88 @@ class MasterCore:
             logger.error(f"Failed to export findings: {e}")
             raise
     
+    def export_findings_to_file(self, filename: str, format_type: str, task_id: str = None,
+                                finding_ids: List[str] = None, progress=None, cancelled=None) -> int:
+        """Потоковый экспорт находок в файл (см. SecurityAnalyzer.export_findings_to_file)"""
+        try:
+            return self.security_analyzer.export_findings_to_file(filename, format_type, task_id=task_id,
+                                                                  finding_ids=finding_ids, progress=progress,
+                                                                  cancelled=cancelled)
+        except Exception as e:
+            logger.error(f"Failed to export findings to {filename}: {e}")
+            raise
+    
+    def get_task_waterfall(self, task_id: str) -> List[Dict[str, Any]]:
+        """Возвращает водопад задержек стадий задачи по шардам"""
+        try:
+            return self.trace_analyzer.get_waterfall(task_id)
+        except Exception as e:
+            logger.error(f"Failed to get task waterfall: {e}")
+            return []
+    
+    def get_trace_summary(self, task_id: str = None) -> Dict[str, Any]:
+        """Возвращает p50/p95 длительности стадий"""
+        try:
+            return self.trace_analyzer.get_summary(task_id)
+        except Exception as e:
+            logger.error(f"Failed to get trace summary: {e}")
+            return {"traces": 0, "task_id": task_id, "stages": {}, "error": str(e)}
+    
+    def export_trace_summary(self, format_type: str, task_id: str = None) -> str:
+        """Экспортирует сводку задержек стадий"""
+        try:
+            return self.trace_analyzer.export_summary(format_type, task_id)
+        except Exception as e:
+            logger.error(f"Failed to export trace summary: {e}")
+            raise
+    
+    def start_profile(self, target: str, kind: str = "sampling", duration: float = 30,
+                      interval: float = 0.01) -> str:
+        """Запускает профилирование мастера или воркера, возвращает profile_id"""
+        try:
+            return self.task_manager.start_profile(target, kind, duration, interval)
+        except Exception as e:
+            logger.error(f"Failed to start profile: {e}")
+            raise
+    
+    def stop_profile(self, target: str, profile_id: str = None):
+        """Досрочно завершает профилирование"""
+        try:
+            self.task_manager.stop_profile(target, profile_id)
+        except Exception as e:
+            logger.error(f"Failed to stop profile: {e}")
+            raise
+    
+    def get_profiles(self) -> List[Dict[str, Any]]:
+        """Возвращает профили, доступные для скачивания"""
+        return self.task_manager.list_profiles()
+    
+    def download_profile(self, profile_id: str, path: str = None) -> Optional[str]:
+        """
+        Сохраняет профиль в файл и возвращает путь к нему.
+        По умолчанию файл создается в каталоге profile_dir
+        """
+        try:
+            data = self.task_manager.load_profile(profile_id)
+            if data is None:
+                return None
+            
+            if path is None:
+                meta = next((p for p in self.get_profiles() if p["profile_id"] == profile_id), {})
+                profile_dir = self.config.get("profile_dir", "profiles")
+                os.makedirs(profile_dir, exist_ok=True)
+                name = f"{meta.get('source', 'unknown')}_{profile_id}{meta.get('extension', '.bin')}"
+                path = os.path.join(profile_dir, name)
+            
+            with open(path, 'wb') as f:
+                f.write(data)
+            
+            logger.info(f"Profile {profile_id} saved to {path}")
+            return path
+        except Exception as e:
+            logger.error(f"Failed to download profile: {e}")
+            raise
+    
     def add_wordlist(self, name: str, path: str):
         """Добавляет новый словарь"""
         try:
@@ -0,0 +1,143 @@
+import logging
+from typing import Dict, List, Any, Optional
+from urllib.parse import urljoin, urlparse, urlunparse
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+RECURSION_CHILDREN = metrics.counter(
+    "ffuf_master_recursion_tasks_total", "Child scans created for discovered directories"
+)
+RECURSION_DUPLICATES = metrics.counter(
+    "ffuf_master_recursion_duplicates_total", "Discovered directories skipped because they were already scanned"
+)
+
+FUZZ_KEYWORD = "FUZZ"
+REDIRECT_STATUSES = (301, 302, 307, 308)
+
+
+def visited_key(root_task_id: str) -> str:
+    return f"recursion:visited:{root_task_id}"
+
+
+def normalize_directory(url: str) -> str:
+    """Каноническая форма URL каталога: без query/fragment, со слэшем на конце"""
+    parsed = urlparse(url)
+    path = parsed.path if parsed.path.endswith("/") else parsed.path + "/"
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), path, "", "", ""))
+
+
+def directory_url(result: Dict[str, Any]) -> Optional[str]:
+    """
+    URL каталога для результата ffuf, похожего на каталог, иначе None:
+    редирект на тот же путь со слэшем на конце или 403 на путь без расширения
+    """
+    url = result.get("url", "")
+    status = result.get("status", 0)
+    if not url:
+        return None
+        
+    path = urlparse(url).path
+    if status in REDIRECT_STATUSES:
+        location = result.get("redirectlocation", "")
+        # Location часто относительный ("/admin/", "admin/") - разрешается от URL результата
+        location = location and urljoin(url, location)
+        if location and urlparse(location).path == path.rstrip("/") + "/":
+            return normalize_directory(location)
+    elif status == 403:
+        name = path.rstrip("/").rsplit("/", 1)[-1]
+        if name and "." not in name:
+            return normalize_directory(url)
+    return None
+
+
+class RecursionPlanner:
+    """
+    Рекурсивное сканирование на стороне мастера: каталоги, найденные шардом,
+    сразу становятся дочерними задачами (не дожидаясь завершения родителя),
+    поэтому кластер загружен на всех уровнях. Посещенные каталоги хранятся
+    в Redis-множестве корневой задачи - один путь не сканируется дважды,
+    даже если его нашли несколько воркеров или родителей
+    """
+    
+    def __init__(self, redis_client, config: Dict[str, Any]):
+        self.redis = redis_client
+        self.max_depth = config.get("max_recursion_depth", 2)
+        # Ограничение числа дочерних задач на корневую задачу (защита от wildcard-ответов)
+        self.max_children = config.get("recursion_max_children", 200)
+        self.visited_ttl = config.get("queue_ttl", 24 * 3600)
+        
+    def enabled(self, task_data: Dict[str, Any]) -> bool:
+        """Рекурсия возможна, если FUZZ стоит в последнем сегменте пути цели"""
+        if not task_data.get("options", {}).get("recursive") or "targets_file" in task_data:
+            return False
+        path = urlparse(task_data["target"]).path
+        return path.rsplit("/", 1)[-1].startswith(FUZZ_KEYWORD)
+        
+    def register_root(self, task_data: Dict[str, Any]):
+        """Помечает базовый каталог корневой задачи как посещенный"""
+        if not self.enabled(task_data):
+            return
+        base = self._base_directory(task_data["target"])
+        key = visited_key(task_data["task_id"])
+        pipe = self.redis.pipeline()
+        pipe.sadd(key, base)
+        pipe.expire(key, self.visited_ttl)
+        pipe.execute()
+        
+    def plan(self, task_data: Dict[str, Any], ffuf_results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Возвращает описания дочерних задач для новых каталогов из результата шарда"""
+        depth = task_data.get("depth", 0)
+        max_depth = task_data.get("options", {}).get("recursion_depth", self.max_depth)
+        if not self.enabled(task_data) or depth >= max_depth or not ffuf_results:
+            return []
+            
+        base = self._base_directory(task_data["target"])
+        directories = []
+        for result in ffuf_results.get("results", []):
+            directory = directory_url(result)
+            # Только подкаталоги текущего каталога (редирект может вести на другой хост)
+            if directory and directory != base and directory.startswith(base) and directory not in directories:
+                directories.append(directory)
+        if not directories:
+            return []
+            
+        root_task_id = task_data.get("root_task_id") or task_data["task_id"]
+        key = visited_key(root_task_id)
+        pipe = self.redis.pipeline()
+        for directory in directories:
+            pipe.sadd(key, directory)
+        pipe.expire(key, self.visited_ttl)
+        pipe.scard(key)
+        replies = pipe.execute()
+        
+        # Каталог, уже бывший в множестве, просканирован или стоит в очереди
+        new_directories = [d for d, added in zip(directories, replies) if added]
+        RECURSION_DUPLICATES.inc(len(directories) - len(new_directories))
+        # В множестве лежит и базовый каталог корневой задачи
+        existing = replies[-1] - 1 - len(new_directories)
+        allowed = max(0, self.max_children - existing)
+        if len(new_directories) > allowed:
+            logger.warning(f"Recursion limit of {self.max_children} directories reached for task {root_task_id}")
+            new_directories = new_directories[:allowed]
+            
+        suffix = task_data["target"].split(FUZZ_KEYWORD, 1)[1]
+        children = []
+        for directory in new_directories:
+            children.append({
+                "target": directory + FUZZ_KEYWORD + suffix,
+                "wordlist_name": task_data["wordlist_name"],
+                "wordlist_path": task_data["wordlist_path"],
+                "wordlists": task_data.get("wordlists"),
+                "options": dict(task_data.get("options", {})),
+                "worker_ids": task_data.get("worker_ids", []),
+                "parent_task_id": task_data["task_id"],
+                "root_task_id": root_task_id,
+                "depth": depth + 1
+            })
+        RECURSION_CHILDREN.inc(len(children))
+        return children
+        
+    @staticmethod
+    def _base_directory(target: str) -> str:
+        return normalize_directory(target.split(FUZZ_KEYWORD, 1)[0])
@@ -4,9 +4,13 @@ import hashlib
 from typing import Dict, List, Any, Optional
 from urllib.parse import urlparse
 import logging
+from utils import metrics
 
 logger = logging.getLogger(__name__)
 
+PARSE_SECONDS = metrics.histogram("ffuf_master_parse_seconds", "Time to parse one ffuf report")
+PARSED_RESULTS = metrics.counter("ffuf_master_parsed_results_total", "ffuf results analyzed by the parser")
+
 class ResultParser:
     def __init__(self):
         self.suspicious_patterns = [
@@ -36,10 +40,12 @@ class ResultParser:
             return findings
         
         try:
-            for result in ffuf_results["results"]:
-                finding = self._analyze_result(task_id, result)
-                if finding:
-                    findings.append(finding)
+            with PARSE_SECONDS.time():
+                for result in ffuf_results["results"]:
+                    finding = self._analyze_result(task_id, result)
+                    if finding:
+                        findings.append(finding)
+            PARSED_RESULTS.inc(len(ffuf_results["results"]))
             
             logger.info(f"Parsed {len(findings)} findings from task {task_id}")
             return findings
@@ -101,18 +107,25 @@ class ResultParser:
                 "finding_id": f"finding_{task_id}_{url_hash}",
                 "task_id": task_id,
                 "url": url,
+                "host": self._host(url),
                 "status_code": status,
                 "content_length": length,
                 "words": words,
                 "lines": lines,
                 "severity": severity,
                 "detected_issues": detected_issues,
-                "raw_response": json.dumps(result, indent=2)
+                "raw_response": json.dumps(result, separators=(",", ":"))
             }
         except Exception as e:
             logger.error(f"Error analyzing result for task {task_id}: {e}")
             return None
     
+    @staticmethod
+    def _host(url: str) -> str:
+        """Цель находки: scheme://host[:port]"""
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}".lower()
+    
     def _analyze_url(self, url: str) -> List[str]:
         """Анализирует URL на подозрительные паттерны"""
         issues = []
@@ -0,0 +1,111 @@
+import os
+import json
+import zlib
+import time
+import hashlib
+import threading
+import logging
+from typing import Dict, List, Any, Optional
+from urllib.parse import urlparse, urlunparse
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_HITS = metrics.counter("ffuf_master_scan_cache_hits_total", "Shards served from the scan cache")
+CACHE_MISSES = metrics.counter("ffuf_master_scan_cache_misses_total", "Shards not found in the scan cache")
+
+# Опции, которые влияют на планирование и скорость, но не на результат сканирования
+NON_RESULT_OPTIONS = {
+    "priority", "project", "weight", "host_limit", "threads", "rate", "timeout",
+    "engine", "recursive", "recursion_depth", "cache"
+}
+
+
+def normalize_target(target: str) -> str:
+    """Схема и хост в нижнем регистре, путь и query без изменений"""
+    parsed = urlparse(target)
+    return urlunparse(parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower()))
+
+
+def normalize_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in options.items() if key not in NON_RESULT_OPTIONS}
+
+
+class ScanCache:
+    """
+    Кэш результатов шардов с адресацией по содержимому.
+    
+    Ключ шарда - sha256 от нормализованной цели, хэшей содержимого словарей,
+    диапазона шарда и опций, влияющих на результат. Повторный запуск того же
+    сканирования берет результаты свежих шардов из кэша, воркерам уходят
+    только шарды без записи или с истекшей записью
+    """
+    
+    def __init__(self, db_manager, config: Dict[str, Any]):
+        self.db = db_manager
+        # 0 - кэш отключен
+        self.ttl = config.get("scan_cache_ttl", 6 * 3600)
+        self._digests = {}
+        self._lock = threading.Lock()
+        
+    def enabled(self, task_data: Dict[str, Any]) -> bool:
+        # Цели пакетной задачи читаются потоком, их шарды не перечисляются заранее
+        return bool(self.ttl) and task_data.get("options", {}).get("cache", True) and "targets_file" not in task_data
+        
+    def wordlist_digest(self, path: str) -> Optional[str]:
+        """sha256 содержимого словаря, кэшируется по размеру и времени изменения"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+            
+        key = (path, stat.st_size, stat.st_mtime)
+        with self._lock:
+            if key in self._digests:
+                return self._digests[key]
+                
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+                
+        with self._lock:
+            self._digests = {k: v for k, v in self._digests.items() if k[0] != path}
+            self._digests[key] = digest.hexdigest()
+        return self._digests[key]
+        
+    def task_signature(self, task_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Общая часть ключей шардов задачи, None - словарь недоступен мастеру"""
+        wordlists = {}
+        for keyword, path in (task_data.get("wordlists") or {"FUZZ": task_data["wordlist_path"]}).items():
+            digest = self.wordlist_digest(path)
+            if digest is None:
+                return None
+            wordlists[keyword] = digest
+            
+        return {
+            "target": normalize_target(task_data["target"]),
+            "wordlists": wordlists,
+            "options": normalize_options(task_data.get("options", {}))
+        }
+        
+    def shard_key(self, signature: Dict[str, Any], shard: Dict[str, Any]) -> str:
+        payload = dict(signature, range=shard.get("combination_range") or shard.get("wordlist_range"))
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+        
+    def lookup(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Свежие записи кэша: ключ -> отчет ffuf"""
+        entries = self.db.get_cached_results(keys, time.time())
+        CACHE_HITS.inc(len(entries))
+        CACHE_MISSES.inc(len(keys) - len(entries))
+        return {key: json.loads(zlib.decompress(data)) for key, data in entries.items()}
+        
+    def store(self, key: str, task_id: str, report: Dict[str, Any]):
+        # Отчет с ошибкой не кэшируется - шард нужно пересканировать
+        if report.get("error"):
+            return
+        data = zlib.compress(json.dumps(report, separators=(",", ":")).encode("utf-8"))
+        self.db.save_cached_result(key, task_id, data, time.time() + self.ttl)
+        
+    def purge_expired(self) -> int:
+        return self.db.delete_expired_cache(time.time())
@@ -0,0 +1,787 @@
+import os
+import time
+import statistics
+import threading
+import itertools
+import logging
+from collections import deque
+from typing import Dict, List, Any, Optional, Callable, Set
+from urllib.parse import urlparse
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_LAUNCHED = metrics.counter(
+    "ffuf_master_speculative_shards_total", "Speculative copies launched for straggler shards"
+)
+SPECULATIVE_WON = metrics.counter(
+    "ffuf_master_speculative_wins_total", "Shards completed first by the speculative copy"
+)
+DUPLICATE_RESULTS = metrics.counter(
+    "ffuf_master_duplicate_shard_results_total", "Shard results discarded because another copy finished first"
+)
+
+# Уровни приоритета задач (больше - раньше)
+PRIORITIES = {
+    "low": 0,
+    "normal": 1,
+    "high": 2,
+    "urgent": 3
+}
+DEFAULT_PRIORITY = "normal"
+
+# Шаг stride-планирования: проект с весом w продвигается на STRIDE / w за шард
+STRIDE = 1000.0
+
+
+def priority_value(priority: Any) -> int:
+    """Приводит приоритет из опций задачи (имя или число) к числу"""
+    if isinstance(priority, str):
+        if priority.isdigit():
+            return int(priority)
+        return PRIORITIES.get(priority.lower(), PRIORITIES[DEFAULT_PRIORITY])
+    if isinstance(priority, (int, float)):
+        return int(priority)
+    return PRIORITIES[DEFAULT_PRIORITY]
+
+
+def keyspace_size(sizes, mode: str) -> int:
+    """Число комбинаций словарей: clusterbomb - произведение размеров, pitchfork - минимум"""
+    sizes = list(sizes)
+    if not sizes:
+        return 0
+    if mode == "pitchfork":
+        return min(sizes)
+    total = 1
+    for size in sizes:
+        total *= size
+    return total
+
+
+def priority_name(value: int) -> str:
+    for name, level in PRIORITIES.items():
+        if level == value:
+            return name
+    return str(value)
+
+
+class WordlistIndex:
+    """
+    Разбивка словаря на диапазоны строк. Для каждой границы шарда
+    запоминается байтовое смещение, чтобы воркер читал только свой
+    диапазон, а не весь словарь с начала. Результат кэшируется
+    по размеру и времени изменения файла
+    """
+    
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+        
+    def get(self, path: str, shard_size: int) -> Optional[Dict[str, Any]]:
+        """Возвращает {"lines", "offsets"}, None - словарь недоступен мастеру"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+            
+        key = (path, stat.st_size, stat.st_mtime, shard_size)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+                
+        lines = 0
+        position = 0
+        offsets = []
+        with open(path, 'rb') as f:
+            for line in f:
+                if lines % shard_size == 0:
+                    offsets.append(position)
+                position += len(line)
+                lines += 1
+                
+        index = {"lines": lines, "offsets": offsets}
+        with self._lock:
+            self._cache = {k: v for k, v in self._cache.items() if k[0] != path}
+            self._cache[key] = index
+        return index
+
+
+class ScheduledTask:
+    """Задача в планировщике: шарды создаются лениво по мере отправки"""
+    
+    def __init__(self, task_data: Dict[str, Any], project: str, priority: int, seq: int,
+                 index: Optional[Dict[str, Any]], shard_size: int,
+                 keyspace: Optional[Dict[str, Any]] = None):
+        self.task_data = task_data
+        self.task_id = task_data["task_id"]
+        self.project = project
+        self.priority = priority
+        self.seq = seq
+        # Глубина рекурсии: при равных приоритете и доле проекта мелкие уровни идут первыми (обход в ширину)
+        self.depth = task_data.get("depth", 0)
+        self.workers = list(task_data.get("worker_ids") or [])
+        self.shard_size = shard_size
+        self.index = index
+        # Несколько словарей: {"sizes", "mode", "total"}, шарды - диапазоны номеров комбинаций
+        self.keyspace = keyspace
+        if keyspace:
+            self.keyspace_size = keyspace["total"]
+            self.total_shards = -(-keyspace["total"] // shard_size)
+        elif index:
+            self.keyspace_size = index["lines"]
+            self.total_shards = len(index["offsets"])
+        else:
+            # Словарь недоступен мастеру - задача уходит одним шардом на весь словарь
+            self.keyspace_size = 0
+            self.total_shards = 1
+        # Прогресс считается по числу перебранных слов (комбинаций), а не шардов
+        self.total_units = self.keyspace_size or 1
+        self.completed_units = 0
+        self.next_shard_index = 0
+        # Шарды, результат которых уже известен (кэш сканирования) - воркерам не выдаются
+        self.skipped: Set[int] = set()
+        self.completed = 0
+        self.running = set()
+        self.submitted_at = time.time()
+        self.started_at = None
+        # Длительности завершенных шардов - база для поиска отстающих
+        self.durations = deque(maxlen=50)
+        self.speculated = 0
+        
+    def has_pending(self) -> bool:
+        """Есть шард, который можно выдать прямо сейчас"""
+        return self.next_shard_index < self.total_shards
+        
+    def pending_shards(self) -> int:
+        skipped = sum(1 for shard_index in self.skipped if shard_index >= self.next_shard_index)
+        return self.total_shards - self.next_shard_index - skipped
+        
+    def is_done(self) -> bool:
+        return self.next_shard_index >= self.total_shards and not self.running
+        
+    def requeue(self, shard: Dict[str, Any]):
+        """Возвращает шард, который не удалось отправить"""
+        self.next_shard_index = shard["shard_index"]
+        
+    def skip(self, shard_indices: Set[int]):
+        """Засчитывает шарды без выдачи воркерам (до начала выдачи)"""
+        self.skipped.update(shard_indices)
+        self.completed += len(shard_indices)
+        self.completed_units += sum(self.shard_units(shard_index) for shard_index in shard_indices)
+        self._skip_ahead()
+        
+    def _skip_ahead(self):
+        while self.next_shard_index in self.skipped:
+            self.next_shard_index += 1
+            
+    def finish_shard(self, shard_id: str, shard_index: int):
+        self.running.discard(shard_id)
+        self.completed += 1
+        self.completed_units += self.shard_units(shard_index)
+        
+    def shard_units(self, shard_index: int) -> int:
+        """Число слов (комбинаций) в шарде"""
+        if not self.keyspace_size:
+            return 1
+        return min(self.shard_size, self.keyspace_size - shard_index * self.shard_size)
+        
+    def can_copy(self, flight: Dict[str, Any]) -> bool:
+        """Можно ли запустить спекулятивную копию выданного шарда"""
+        return True
+        
+    def copy_shard(self, flight: Dict[str, Any], worker_id: str) -> Dict[str, Any]:
+        """Повторное сообщение выданного шарда (спекулятивная копия)"""
+        return self.build_shard(flight["shard_index"], worker_id)
+        
+    def release_copy(self, flight: Dict[str, Any]):
+        """Освобождает ресурсы завершившейся или не отправленной копии шарда"""
+        
+    def next_shard(self, worker_id: str) -> Dict[str, Any]:
+        """Формирует сообщение следующего шарда для воркера"""
+        shard_index = self.next_shard_index
+        self.next_shard_index += 1
+        self._skip_ahead()
+        return self.build_shard(shard_index, worker_id)
+        
+    def build_shard(self, shard_index: int, worker_id: str) -> Dict[str, Any]:
+        """Сообщение шарда с заданным номером (повторно - для спекулятивной копии)"""
+        shard = dict(self.task_data)
+        shard["worker_id"] = worker_id
+        shard["shard_id"] = f"{self.task_id}_s{shard_index:05d}"
+        shard["shard_index"] = shard_index
+        shard["total_shards"] = self.total_shards
+        if self.keyspace:
+            start = shard_index * self.shard_size
+            shard["combination_range"] = [start, min(start + self.shard_size, self.keyspace["total"])]
+            shard["keyword_sizes"] = self.keyspace["sizes"]
+        elif self.index:
+            start = shard_index * self.shard_size
+            shard["wordlist_range"] = [start, min(start + self.shard_size, self.index["lines"])]
+            shard["wordlist_offset"] = self.index["offsets"][shard_index]
+        # У каждого шарда своя трассировка
+        if "trace" in self.task_data:
+            shard["trace"] = dict(self.task_data["trace"])
+        return shard
+
+
+class BatchScheduledTask(ScheduledTask):
+    """
+    Пакетная задача: список целей читается из файла потоком, единица работы -
+    (цель x шард словаря). В памяти держится только окно из window целей,
+    у которых остались невыданные шарды, поэтому размер списка не ограничен.
+    На один хост одновременно выдается не больше host_limit единиц
+    """
+    
+    def __init__(self, task_data: Dict[str, Any], project: str, priority: int, seq: int,
+                 index: Optional[Dict[str, Any]], shard_size: int, total_targets: int,
+                 window: int, host_limit: int, keyspace: Optional[Dict[str, Any]] = None):
+        super().__init__(task_data, project, priority, seq, index, shard_size, keyspace)
+        self.shards_per_target = self.total_shards
+        self.total_targets = total_targets
+        self.total_shards = total_targets * self.shards_per_target
+        self.total_units *= total_targets
+        self.window_size = max(1, window)
+        self.host_limit = max(1, host_limit)
+        
+        self.targets = iter_targets(task_data["targets_file"])
+        self.exhausted = False
+        # Цели с невыданными шардами: {"index", "target", "host", "next"}
+        self.window: List[Dict[str, Any]] = []
+        self.retry = deque()
+        self.host_running: Dict[str, int] = {}
+        # shard_id -> (номер цели, хост) для выданных единиц
+        self.units: Dict[str, Any] = {}
+        # Номер цели -> число незавершенных единиц
+        self.target_pending: Dict[int, int] = {}
+        self.targets_completed = 0
+        
+    def _fill_window(self):
+        while not self.exhausted and len(self.window) < self.window_size:
+            try:
+                target_index, target = next(self.targets)
+            except StopIteration:
+                self.exhausted = True
+                self.targets.close()
+                break
+            self.window.append({
+                "index": target_index,
+                "target": target,
+                "host": urlparse(target).hostname or target,
+                "next": 0
+            })
+            self.target_pending[target_index] = self.shards_per_target
+            
+    def _host_free(self, host: str) -> bool:
+        return self.host_running.get(host, 0) < self.host_limit
+        
+    def has_pending(self) -> bool:
+        self._fill_window()
+        return (any(self._host_free(unit[2]) for unit in self.retry) or
+                any(self._host_free(entry["host"]) for entry in self.window))
+                
+    def next_shard(self, worker_id: str) -> Dict[str, Any]:
+        unit = None
+        for candidate in self.retry:
+            if self._host_free(candidate[2]):
+                unit = candidate
+                self.retry.remove(candidate)
+                break
+                
+        if unit is None:
+            entry = next(e for e in self.window if self._host_free(e["host"]))
+            unit = (entry["index"], entry["target"], entry["host"], entry["next"])
+            entry["next"] += 1
+            if entry["next"] >= self.shards_per_target:
+                self.window.remove(entry)
+                self._fill_window()
+                
+        target_index, target, host, shard_index = unit
+        self.next_shard_index += 1
+        self.host_running[host] = self.host_running.get(host, 0) + 1
+        shard = self.build_target_shard(target_index, target, shard_index, worker_id)
+        self.units[shard["shard_id"]] = unit
+        return shard
+        
+    def build_target_shard(self, target_index: int, target: str, shard_index: int,
+                           worker_id: str) -> Dict[str, Any]:
+        shard = self.build_shard(shard_index, worker_id)
+        shard.pop("targets_file", None)
+        shard["target"] = target
+        shard["target_index"] = target_index
+        shard["shard_id"] = f"{self.task_id}_t{target_index:06d}_s{shard_index:05d}"
+        return shard
+        
+    def can_copy(self, flight: Dict[str, Any]) -> bool:
+        # Копия - еще одно одновременное сканирование хоста
+        return self._host_free(self.units[flight["shard_id"]][2])
+        
+    def copy_shard(self, flight: Dict[str, Any], worker_id: str) -> Dict[str, Any]:
+        target_index, target, host, shard_index = self.units[flight["shard_id"]]
+        self.host_running[host] = self.host_running.get(host, 0) + 1
+        return self.build_target_shard(target_index, target, shard_index, worker_id)
+        
+    def release_copy(self, flight: Dict[str, Any]):
+        unit = self.units.get(flight["shard_id"])
+        if unit is not None:
+            self._release_host(unit[2])
+            
+    def _release_host(self, host: str):
+        self.host_running[host] -= 1
+        if not self.host_running[host]:
+            del self.host_running[host]
+            
+    def requeue(self, shard: Dict[str, Any]):
+        unit = self.units.pop(shard["shard_id"])
+        self.next_shard_index -= 1
+        self._release_host(unit[2])
+        self.retry.appendleft(unit)
+        
+    def finish_shard(self, shard_id: str, shard_index: int):
+        super().finish_shard(shard_id, shard_index)
+        unit = self.units.pop(shard_id, None)
+        if unit is None:
+            return
+        target_index, _, host, _ = unit
+        self._release_host(host)
+        self.target_pending[target_index] -= 1
+        if not self.target_pending[target_index]:
+            del self.target_pending[target_index]
+            self.targets_completed += 1
+
+
+def iter_targets(path: str):
+    """
+    Потоково читает файл целей: (номер, URL) для каждой непустой строки
+    без комментария. Строка без FUZZ считается хостом или базовым URL
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        target_index = 0
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if "://" not in line:
+                line = "http://" + line
+            if "FUZZ" not in line:
+                line = line.rstrip("/") + "/FUZZ"
+            yield target_index, line
+            target_index += 1
+
+
+class _Project:
+    """Проект (цель) со своей долей ресурсов кластера"""
+    
+    def __init__(self, name: str, weight: float, pass_value: float):
+        self.name = name
+        self.weight = max(weight, 0.01)
+        self.pass_value = pass_value
+        self.dispatched = 0
+
+
+class TaskScheduler:
+    """
+    Планировщик шардов задач по воркерам.
+    
+    Задача делится на шарды - диапазоны строк словаря. Шарды не складываются
+    в очереди воркеров заранее: воркер получает новый шард, только когда у него
+    есть свободный слот (max_concurrent_tasks из health-check плюс prefetch).
+    Поэтому срочная задача обгоняет большую уже на границе текущего шарда.
+    
+    Порядок выбора: приоритет задачи, затем справедливое разделение между
+    проектами (stride scheduling с весами), затем порядок поступления.
+    
+    Отстающий шард (выполняется дольше speculation_factor медиан завершенных
+    шардов той же задачи) дублируется на простаивающем воркере. Засчитывается
+    первый результат, вторую копию отменяет cancel(worker_id, task_id, shard_id).
+    """
+    
+    def __init__(self, config: Dict[str, Any], enqueue: Callable[[Dict[str, Any]], None],
+                 get_workers: Callable[[], Dict[str, Any]],
+                 cancel: Callable[[str, str, str], None] = None):
+        self.enqueue = enqueue
+        self.get_workers = get_workers
+        self.cancel = cancel
+        self.shard_size = max(1, config.get("shard_size", 2000))
+        self.prefetch = max(0, config.get("scheduler_prefetch", 1))
+        # Жесткий предел шардов, одновременно выданных одному воркеру
+        self.max_per_worker = max(1, config.get("task_queue_high_water", 10))
+        # Пакетные задачи: окно целей в памяти и предел параллельных шардов на хост
+        self.batch_window = config.get("batch_window", 100)
+        self.batch_host_limit = config.get("batch_host_limit", 2)
+        self.project_weights = config.get("project_weights", {})
+        # Спекулятивное выполнение отстающих шардов
+        self.speculation = config.get("speculation", True)
+        self.speculation_factor = config.get("speculation_factor", 2.0)
+        self.speculation_min_completed = config.get("speculation_min_completed", 3)
+        self.speculation_min_seconds = config.get("speculation_min_seconds", 10)
+        # Доля слотов кластера, которую могут занять спекулятивные копии
+        self.speculation_max_fraction = config.get("speculation_max_fraction", 0.1)
+        
+        self.tasks: Dict[str, ScheduledTask] = {}
+        self.projects: Dict[str, _Project] = {}
+        # shard_id -> выданный шард
+        self.in_flight: Dict[str, Dict[str, Any]] = {}
+        self.worker_load: Dict[str, int] = {}
+        self.decisions = deque(maxlen=200)
+        
+        self.index = WordlistIndex()
+        self.lock = threading.RLock()
+        self._seq = itertools.count()
+        
+    def submit(self, task_data: Dict[str, Any],
+               cached: Callable[[List[Dict[str, Any]]], Set[int]] = None) -> int:
+        """
+        Ставит задачу в очередь планировщика, возвращает число шардов.
+        
+        cached(shards) получает сообщения всех шардов (без воркера) и
+        возвращает номера шардов, результат которых уже получен из кэша -
+        они не выдаются воркерам. Для пакетных задач не вызывается
+        """
+        options = task_data.get("options", {})
+        batch = "targets_file" in task_data
+        if batch:
+            default_project = os.path.basename(task_data["targets_file"])
+        else:
+            default_project = urlparse(task_data["target"]).hostname or task_data["target"]
+        project = options.get("project") or default_project
+        priority = priority_value(options.get("priority", DEFAULT_PRIORITY))
+        
+        index = None
+        keyspace = None
+        if len(task_data.get("wordlists") or {}) > 1:
+            keyspace = self._keyspace(task_data)
+        else:
+            try:
+                index = self.index.get(task_data["wordlist_path"], self.shard_size)
+            except Exception as e:
+                logger.error(f"Failed to index wordlist {task_data['wordlist_path']}: {str(e)}")
+            if index is not None and index["lines"] == 0:
+                index = None
+            
+        if batch:
+            # Первый проход по файлу только считает цели - для прогресса задачи
+            total_targets = sum(1 for _ in iter_targets(task_data["targets_file"]))
+            task = BatchScheduledTask(task_data, project, priority, next(self._seq), index, self.shard_size,
+                                      total_targets, self.batch_window,
+                                      options.get("host_limit", self.batch_host_limit), keyspace)
+        else:
+            task = ScheduledTask(task_data, project, priority, next(self._seq), index, self.shard_size, keyspace)
+            if cached is not None:
+                task.skip(cached([task.build_shard(i, None) for i in range(task.total_shards)]))
+                if task.is_done():
+                    logger.info(f"Task {task.task_id}: all {task.total_shards} shards served from cache")
+                    return task.total_shards
+        
+        with self.lock:
+            if project not in self.projects:
+                weight = float(options.get("weight") or self.project_weights.get(project, 1.0))
+                self.projects[project] = _Project(project, weight, 0.0)
+            self._activate_project(self.projects[project])
+            self.tasks[task.task_id] = task
+            
+        logger.info(f"Scheduled task {task.task_id}: {task.total_shards} shards "
+                    f"({len(task.skipped)} cached), priority {priority_name(priority)}, project {project}")
+        return task.total_shards
+        
+    def _keyspace(self, task_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Пространство комбинаций нескольких словарей. Комбинации не
+        перечисляются заранее - шард получает только диапазон их номеров
+        """
+        sizes = {}
+        for keyword, path in task_data["wordlists"].items():
+            try:
+                index = self.index.get(path, self.shard_size)
+            except Exception as e:
+                logger.error(f"Failed to index wordlist {path}: {str(e)}")
+                index = None
+            if index is None:
+                return None
+            sizes[keyword] = index["lines"]
+            
+        mode = task_data.get("options", {}).get("mode", "clusterbomb")
+        total = keyspace_size(sizes.values(), mode)
+        if not total:
+            return None
+        return {"sizes": sizes, "mode": mode, "total": total}
+        
+    def progress(self, task_id: str) -> Optional[float]:
+        """Прогресс задачи в процентах по числу перебранных слов (комбинаций)"""
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return None
+            return task.completed_units / task.total_units * 100
+            
+    def _activate_project(self, project: _Project):
+        """
+        Проект, у которого не было работы, начинает с текущего минимального
+        pass - иначе он получил бы весь кластер за время простоя
+        """
+        active = [self.projects[t.project].pass_value for t in self.tasks.values()
+                  if t.has_pending() and t.project != project.name]
+        if active and not any(t.project == project.name and t.has_pending() for t in self.tasks.values()):
+            project.pass_value = max(project.pass_value, min(active))
+            
+    def dispatch(self) -> int:
+        """Выдает шарды воркерам со свободными слотами, возвращает число выданных"""
+        with self.lock:
+            if not any(task.has_pending() for task in self.tasks.values()):
+                return 0
+                
+            capacity = self._worker_capacity()[0]
+            dispatched = 0
+            
+            while True:
+                choice = self._select(capacity)
+                if choice is None:
+                    break
+                    
+                task, worker_id = choice
+                shard = task.next_shard(worker_id)
+                try:
+                    self.enqueue(shard)
+                except Exception as e:
+                    # Шард вернется в очередь планировщика
+                    task.requeue(shard)
+                    logger.error(f"Failed to dispatch shard {shard['shard_id']}: {str(e)}")
+                    break
+                    
+                self._record_dispatch(task, shard, worker_id)
+                capacity[worker_id] -= 1
+                dispatched += 1
+                
+            return dispatched
+            
+    def _worker_capacity(self):
+        """Свободные слоты активных воркеров и число их рабочих слотов"""
+        capacity = {}
+        slots = {}
+        for worker_id, info in self.get_workers().items():
+            if info.get("status") != "active":
+                continue
+            health = info.get("health") or {}
+            slots[worker_id] = health.get("max_concurrent_tasks") or 1
+            limit = min(slots[worker_id] + self.prefetch, self.max_per_worker)
+            capacity[worker_id] = limit - self.worker_load.get(worker_id, 0)
+        return capacity, slots
+        
+    def _select(self, capacity: Dict[str, int]):
+        """Выбирает следующую задачу и воркера для ее шарда"""
+        candidates = sorted(
+            (task for task in self.tasks.values() if task.has_pending()),
+            key=lambda task: (-task.priority, self.projects[task.project].pass_value, task.depth, task.seq)
+        )
+        
+        for task in candidates:
+            eligible = [w for w in (task.workers or capacity) if capacity.get(w, 0) > 0]
+            if eligible:
+                # Самый свободный воркер
+                return task, max(eligible, key=lambda w: capacity[w])
+        return None
+        
+    def _record_dispatch(self, task: ScheduledTask, shard: Dict[str, Any], worker_id: str):
+        project = self.projects[task.project]
+        
+        # Сколько шардов менее приоритетных задач пропущено вперед
+        overtaken = sum(t.pending_shards() for t in self.tasks.values()
+                        if t.priority < task.priority and t.has_pending())
+        reason = f"priority {priority_name(task.priority)}, {project.name} pass {project.pass_value:.0f}"
+        if overtaken:
+            reason += f", ahead of {overtaken} lower-priority shards"
+            
+        project.pass_value += STRIDE / project.weight
+        project.dispatched += 1
+        
+        task.running.add(shard["shard_id"])
+        if task.started_at is None:
+            task.started_at = time.time()
+            
+        self.in_flight[shard["shard_id"]] = {
+            "task_id": task.task_id,
+            "shard_id": shard["shard_id"],
+            "shard_index": shard["shard_index"],
+            "worker_id": worker_id,
+            "dispatched_at": time.time(),
+            # Спекулятивная копия: {"worker_id", "dispatched_at"}
+            "copy": None
+        }
+        self.worker_load[worker_id] = self.worker_load.get(worker_id, 0) + 1
+        
+        self.decisions.append({
+            "time": time.time(),
+            "task_id": task.task_id,
+            "shard_id": shard["shard_id"],
+            "worker_id": worker_id,
+            "project": project.name,
+            "priority": priority_name(task.priority),
+            "reason": reason
+        })
+        
+    def shard_finished(self, shard_id: str, worker_id: str = None, failed: bool = False) -> bool:
+        """
+        Учитывает результат шарда и освобождает слоты воркеров.
+        Возвращает True, если результат нужно засчитать. False - шард
+        неизвестен (старый формат), уже завершен другой копией, или эта
+        копия упала, а другая еще выполняется
+        """
+        with self.lock:
+            shard = self.in_flight.get(shard_id)
+            if shard is None:
+                DUPLICATE_RESULTS.inc()
+                return False
+                
+            copy = shard["copy"]
+            attempts = {shard["worker_id"]: shard["dispatched_at"]}
+            if copy:
+                attempts[copy["worker_id"]] = copy["dispatched_at"]
+            winner = worker_id if worker_id in attempts else shard["worker_id"]
+            
+            task = self.tasks.get(shard["task_id"])
+            if copy and task:
+                # Одна из двух попыток закончилась
+                task.release_copy(shard)
+                
+            if failed and copy:
+                # Ждем результата второй копии
+                self._release(winner)
+                if winner == shard["worker_id"]:
+                    shard["worker_id"], shard["dispatched_at"] = copy["worker_id"], copy["dispatched_at"]
+                shard["copy"] = None
+                logger.warning(f"Copy of shard {shard_id} on {winner} failed, waiting for the other copy")
+                return False
+                
+            del self.in_flight[shard_id]
+            for attempt_worker in attempts:
+                self._release(attempt_worker)
+                if attempt_worker != winner and self.cancel:
+                    # Проигравшая копия больше не нужна
+                    try:
+                        self.cancel(attempt_worker, shard["task_id"], shard_id)
+                    except Exception as e:
+                        logger.error(f"Failed to cancel shard {shard_id} on {attempt_worker}: {str(e)}")
+                        
+            if copy and winner == copy["worker_id"]:
+                SPECULATIVE_WON.inc()
+                
+            if task:
+                task.finish_shard(shard_id, shard["shard_index"])
+                if not failed:
+                    task.durations.append(time.time() - attempts[winner])
+                if task.is_done():
+                    del self.tasks[task.task_id]
+                    # Простаивающий проект заново получит pass при появлении работы
+                    if not any(t.project == task.project for t in self.tasks.values()):
+                        self.projects.pop(task.project, None)
+            return True
+            
+    def _release(self, worker_id: str):
+        self.worker_load[worker_id] = max(0, self.worker_load.get(worker_id, 0) - 1)
+        
+    def speculate(self) -> int:
+        """
+        Запускает копии отстающих шардов на простаивающих воркерах,
+        возвращает число запущенных копий
+        """
+        if not self.speculation:
+            return 0
+            
+        with self.lock:
+            if not self.in_flight:
+                return 0
+                
+            capacity, slots = self._worker_capacity()
+            # Простаивающий воркер - без выданных шардов
+            idle = {w for w in capacity if self.worker_load.get(w, 0) == 0}
+            running_copies = sum(1 for shard in self.in_flight.values() if shard["copy"])
+            budget = max(1, int(sum(slots.values()) * self.speculation_max_fraction)) - running_copies
+            if not idle or budget <= 0:
+                return 0
+                
+            now = time.time()
+            launched = 0
+            
+            for shard_id, shard in sorted(self.in_flight.items(), key=lambda item: item[1]["dispatched_at"]):
+                if launched >= budget or not idle:
+                    break
+                if shard["copy"]:
+                    continue
+                    
+                task = self.tasks.get(shard["task_id"])
+                if not task or len(task.durations) < self.speculation_min_completed:
+                    continue
+                    
+                elapsed = now - shard["dispatched_at"]
+                median = statistics.median(task.durations)
+                if elapsed < self.speculation_min_seconds or elapsed < median * self.speculation_factor:
+                    continue
+                    
+                eligible = [w for w in idle if w != shard["worker_id"] and (not task.workers or w in task.workers)]
+                if not eligible or not task.can_copy(shard):
+                    continue
+                    
+                worker_id = eligible[0]
+                copy = task.copy_shard(shard, worker_id)
+                copy["speculative"] = True
+                try:
+                    self.enqueue(copy)
+                except Exception as e:
+                    logger.error(f"Failed to launch speculative copy of {shard_id}: {str(e)}")
+                    task.release_copy(shard)
+                    break
+                    
+                shard["copy"] = {"worker_id": worker_id, "dispatched_at": now}
+                self.worker_load[worker_id] = self.worker_load.get(worker_id, 0) + 1
+                idle.discard(worker_id)
+                task.speculated += 1
+                launched += 1
+                SPECULATIVE_LAUNCHED.inc()
+                
+                reason = (f"speculative copy: running {elapsed:.0f}s on {shard['worker_id']}, "
+                          f"task median {median:.1f}s")
+                logger.info(f"Shard {shard_id} is a straggler, {reason}")
+                self.decisions.append({
+                    "time": now,
+                    "task_id": task.task_id,
+                    "shard_id": shard_id,
+                    "worker_id": worker_id,
+                    "project": task.project,
+                    "priority": priority_name(task.priority),
+                    "reason": reason
+                })
+                
+            return launched
+            
+    def pending_count(self) -> int:
+        """Шарды, ожидающие отправки"""
+        with self.lock:
+            return sum(task.pending_shards() for task in self.tasks.values())
+            
+    def get_state(self) -> Dict[str, Any]:
+        """Очередь планировщика и последние решения для GUI/CLI"""
+        with self.lock:
+            tasks = sorted(
+                self.tasks.values(),
+                key=lambda task: (-task.priority, self.projects[task.project].pass_value, task.depth, task.seq)
+            )
+            return {
+                "tasks": [{
+                    "task_id": task.task_id,
+                    "project": task.project,
+                    "priority": priority_name(task.priority),
+                    "depth": task.depth,
+                    "total_shards": task.total_shards,
+                    "completed_shards": task.completed,
+                    "running_shards": len(task.running),
+                    "pending_shards": task.pending_shards(),
+                    "targets": (f"{task.targets_completed}/{task.total_targets}"
+                                if isinstance(task, BatchScheduledTask) else None),
+                    "speculative_shards": task.speculated,
+                    "keyspace": task.total_units,
+                    "pass": round(self.projects[task.project].pass_value, 1),
+                    "wait_seconds": round((task.started_at or time.time()) - task.submitted_at, 3)
+                } for task in tasks],
+                "worker_load": dict(self.worker_load),
+                "speculative_running": sum(1 for shard in self.in_flight.values() if shard["copy"]),
+                "decisions": list(reversed(self.decisions))
+            }
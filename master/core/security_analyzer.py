@@ -1,9 +1,19 @@
+import os
+import csv
+import json
 import sqlite3
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Находок на страницу потокового экспорта
+EXPORT_PAGE_SIZE = 1000
+CSV_HEADERS = [
+    'URL', 'Status Code', 'Content Length', 'Severity',
+    'Detected Issues', 'Checked', 'Created At'
+]
+
 class SecurityAnalyzer:
     def __init__(self, db_manager):
         self.db = db_manager
@@ -11,35 +21,18 @@ class SecurityAnalyzer:
     def get_security_summary(self) -> Dict[str, Any]:
         """Возвращает сводку по безопасности"""
         try:
-            with sqlite3.connect(self.db.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                
-                # Статистика по критичности
-                severity_stats = conn.execute('''
-                    SELECT severity, COUNT(*) as count 
-                    FROM findings 
-                    GROUP BY severity
-                ''').fetchall()
-                
-                # Непроверенные находки
-                unchecked_count = conn.execute(
-                    'SELECT COUNT(*) FROM findings WHERE checked = FALSE'
-                ).fetchone()[0]
-                
-                # Последние критические находки
-                critical_findings = conn.execute('''
-                    SELECT * FROM findings 
-                    WHERE severity = 'critical' 
-                    ORDER BY created_at DESC 
-                    LIMIT 10
-                ''').fetchall()
-                
-                return {
-                    "severity_stats": {row["severity"]: row["count"] for row in severity_stats},
-                    "unchecked_count": unchecked_count,
-                    "total_findings": sum(row["count"] for row in severity_stats),
-                    "recent_critical": [dict(row) for row in critical_findings]
-                }
+            # Счетчики и кольцо критических находок ведутся при записи находок
+            counts = self.db.get_finding_counts()
+            critical_findings = self.db.get_recent_critical(
+                fields=["finding_id", "url", "status_code", "created_at"]
+            )
+            
+            return {
+                "severity_stats": counts["severity"],
+                "unchecked_count": counts["unchecked"],
+                "total_findings": counts["total"],
+                "recent_critical": critical_findings
+            }
         except sqlite3.Error as e:
             logger.error(f"Database error in get_security_summary: {e}")
             return {
@@ -74,10 +67,63 @@ class SecurityAnalyzer:
             logger.error(f"Error exporting findings: {e}")
             raise
     
+    def export_findings_to_file(self, filename: str, format_type: str = "json", task_id: str = None,
+                                finding_ids: List[str] = None,
+                                progress: Callable[[int, int], None] = None,
+                                cancelled: Callable[[], bool] = None) -> int:
+        """
+        Потоковый экспорт находок в файл: находки читаются страницами и сразу
+        пишутся, весь экспорт в памяти не собирается. progress(done, total)
+        вызывается после каждой страницы, cancelled() == True прерывает экспорт
+        и удаляет недописанный файл. Возвращает число записанных находок
+        """
+        if format_type not in ("json", "csv"):
+            raise ValueError(f"Unsupported format: {format_type}")
+        
+        filters = {"task_id": task_id, "finding_ids": finding_ids}
+        total = self.db.count_findings(**filters)
+        done = 0
+        try:
+            with open(filename, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f) if format_type == "csv" else None
+                if writer:
+                    writer.writerow(CSV_HEADERS)
+                else:
+                    f.write('[')
+                
+                after = None
+                while True:
+                    if cancelled and cancelled():
+                        break
+                    page = self.db.get_findings_page(after=after, page_size=EXPORT_PAGE_SIZE, **filters)
+                    for finding in page["findings"]:
+                        if writer:
+                            writer.writerow(self._csv_row(finding))
+                        else:
+                            # Тот же вид, что json.dumps(findings, indent=2)
+                            item = json.dumps(finding, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+                            f.write(('\n  ' if done == 0 else ',\n  ') + item)
+                        done += 1
+                    if progress:
+                        progress(done, total)
+                    after = page["next"]
+                    if not after:
+                        break
+                
+                if not writer:
+                    f.write('\n]' if done else ']')
+        except Exception as e:
+            logger.error(f"Error exporting findings to {filename}: {e}")
+            raise
+        
+        if cancelled and cancelled():
+            os.remove(filename)
+            logger.info(f"Export to {filename} cancelled after {done} findings")
+        return done
+    
     def _export_json(self, findings: List[Dict[str, Any]]) -> str:
         """Экспортирует в JSON"""
         try:
-            import json
             return json.dumps(findings, indent=2, ensure_ascii=False)
         except Exception as e:
             logger.error(f"Error exporting to JSON: {e}")
@@ -86,31 +132,31 @@ class SecurityAnalyzer:
     def _export_csv(self, findings: List[Dict[str, Any]]) -> str:
         """Экспортирует в CSV"""
         try:
-            import csv
             import io
             
             output = io.StringIO()
             writer = csv.writer(output)
             
             # Заголовки
-            writer.writerow([
-                'URL', 'Status Code', 'Content Length', 'Severity', 
-                'Detected Issues', 'Checked', 'Created At'
-            ])
+            writer.writerow(CSV_HEADERS)
             
             # Данные
             for finding in findings:
-                writer.writerow([
-                    finding['url'],
-                    finding['status_code'],
-                    finding['content_length'],
-                    finding['severity'],
-                    '; '.join(finding['detected_issues']),
-                    'Yes' if finding['checked'] else 'No',
-                    finding['created_at']
-                ])
+                writer.writerow(self._csv_row(finding))
             
             return output.getvalue()
         except Exception as e:
             logger.error(f"Error exporting to CSV: {e}")
             raise
+    
+    @staticmethod
+    def _csv_row(finding: Dict[str, Any]) -> List[Any]:
+        return [
+            finding['url'],
+            finding['status_code'],
+            finding['content_length'],
+            finding['severity'],
+            '; '.join(finding['detected_issues']),
+            'Yes' if finding['checked'] else 'No',
+            finding['created_at']
+        ]
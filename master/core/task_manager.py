@@ -6,28 +6,109 @@ import threading
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 import logging
+from utils.message_codec import MessageCodec, supported_codecs, negotiate_codec
+from utils import metrics
+from utils.profiling import ProfilerController, PROFILE_KINDS, DEFAULT_PROFILE_TTL, store_profile, list_profiles, load_profile
+from .tracing import mark
+from .scheduler import TaskScheduler, iter_targets
+from .recursion import RecursionPlanner
+from .scan_cache import ScanCache
+from .baseline import (baseline_scope, task_scopes, normalize_url, disappeared_finding, BASELINE_CHANGES,
+                       CHANGE_UNCHANGED, CHANGE_DISAPPEARED)
+from .result_parser import ResultParser
+from .events import EventBus, EVENT_FINDINGS, EVENT_TASK, EVENT_WORKER, finding_summaries
 
 logger = logging.getLogger(__name__)
 
+TASKS_CREATED = metrics.counter("ffuf_master_tasks_created_total", "Scan tasks created")
+WORKER_TASKS_SENT = metrics.counter("ffuf_master_worker_tasks_sent_total", "Shards pushed to worker queues")
+DISTRIBUTE_SECONDS = metrics.histogram("ffuf_master_distribute_seconds", "Time to schedule a task and dispatch its shards")
+RESULTS_RECEIVED = metrics.counter(
+    "ffuf_master_results_total", "Worker results processed", ["status"]
+)
+RESULT_ERRORS = metrics.counter("ffuf_master_result_errors_total", "Worker results that failed to process")
+RESULT_SECONDS = metrics.histogram(
+    "ffuf_master_result_processing_seconds", "Time to parse and persist one worker result"
+)
+FINDINGS_INGESTED = metrics.counter("ffuf_master_findings_total", "Findings extracted from worker results")
+
 class TaskManager:
-    def __init__(self, redis_client, db_manager):
+    def __init__(self, redis_client, db_manager, queue_client=None, config: Dict[str, Any] = None):
         self.redis = redis_client
         self.db = db_manager
+        # Очереди передают бинарные кадры, поэтому используют клиент без decode_responses
+        self.queue_redis = queue_client or redis_client
+        self.config = config or {}
+        self.codec = MessageCodec(
+            compress_threshold=self.config.get("codec_compress_threshold", 4096),
+            chunk_size=self.config.get("codec_chunk_size", 1024 * 1024)
+        )
+        # Ограничения очередей (backpressure)
+        self.task_queue_high_water = self.config.get("task_queue_high_water", 10)
+        self.results_high_water = self.config.get("results_high_water", 1000)
+        self.queue_ttl = self.config.get("queue_ttl", 24 * 3600)
+        self.maintenance_interval = self.config.get("maintenance_interval", 2)
+        self.last_maintenance = 0
+        # Шарды задач выдаются воркерам по мере освобождения слотов
+        self.scheduler = TaskScheduler(self.config, self._enqueue_worker_task, self.get_workers_status,
+                                       self._cancel_shard)
+        # Каталоги, найденные рекурсивной задачей, становятся дочерними задачами
+        self.recursion = RecursionPlanner(self.redis, self.config)
+        # Результаты шардов повторного сканирования той же цели берутся из кэша
+        self.scan_cache = ScanCache(self.db, self.config)
+        self.cache_purge_interval = self.config.get("scan_cache_purge_interval", 600)
+        self.last_cache_purge = 0
+        # Повторное сканирование цели сохраняет только изменения относительно базовой линии
+        self.incremental = self.config.get("incremental_rescans", True)
+        # Профили мастера и воркеров хранятся в Redis profile_ttl секунд
+        self.profile_ttl = self.config.get("profile_ttl", DEFAULT_PROFILE_TTL)
+        self.profiler = ProfilerController("master", self._store_profile)
+        # События об изменениях для GUI/CLI: подписчики в процессе и Redis pub/sub
+        self.events = EventBus(self.redis, self.config)
+        # Последнее опубликованное состояние воркеров: worker_id -> status
+        self.worker_states = {}
+        
         self.active_tasks = {}
+        # Результаты могут обрабатываться параллельно несколькими потоками
+        self.lock = threading.RLock()
         self.is_running = False
         self.result_thread = None
+        self._register_metrics()
     
-    def start(self):
-        """Запускает менеджер задач"""
+    def _register_metrics(self):
+        """Метрики состояния очередей считаются только при запросе /metrics"""
+        metrics.gauge("ffuf_master_active_tasks", "Tasks waiting for worker results").set_function(
+            lambda: len(self.active_tasks)
+        )
+        metrics.gauge("ffuf_master_pending_shards", "Shards waiting in the scheduler for a free worker slot").set_function(
+            self.scheduler.pending_count
+        )
+        metrics.gauge("ffuf_master_results_queue_depth", "Messages in the results queue").set_function(
+            lambda: self.queue_redis.llen("results")
+        )
+        metrics.gauge("ffuf_master_worker_queue_depth", "Messages in worker task queues", ["worker_id"]).set_function(
+            lambda: self.get_queue_metrics()["tasks"]
+        )
+    
+    def start(self, consume_results: bool = True):
+        """
+        Запускает менеджер задач.
+        
+        consume_results=False - очередь результатов разбирает внешний
+        runtime (см. AsyncMasterRuntime), собственный поток не создается
+        """
         self.is_running = True
-        self.result_thread = threading.Thread(target=self._result_processor)
-        self.result_thread.daemon = True
-        self.result_thread.start()
+        self._publish_capabilities()
+        if consume_results:
+            self.result_thread = threading.Thread(target=self._result_processor)
+            self.result_thread.daemon = True
+            self.result_thread.start()
         logger.info("Task manager started")
     
     def stop(self):
         """Останавливает менеджер задач"""
         self.is_running = False
+        self.profiler.stop()
         if self.result_thread:
             self.result_thread.join(timeout=5)
         logger.info("Task manager stopped")
@@ -36,46 +117,217 @@ class TaskManager:
         """Создает новую задачу"""
         task_id = f"task_{uuid.uuid4().hex[:8]}"
         
+        # Пакетная задача: цели читаются планировщиком из файла по мере выдачи шардов
+        targets_file = task_data.get("targets_file")
+        if targets_file and next(iter_targets(targets_file), None) is None:
+            raise ValueError(f"Targets file {targets_file} has no targets")
+        
         # Подготавливаем данные задачи
         full_task_data = {
             "task_id": task_id,
-            "target": task_data["target"],
+            "target": f"batch:{targets_file}" if targets_file else task_data["target"],
             "wordlist_name": task_data["wordlist_name"],
             "wordlist_path": task_data["wordlist_path"],
             "options": task_data.get("options", {}),
+            # Несколько словарей: {ключевое слово: путь}, режим - options["mode"]
+            "wordlists": task_data.get("wordlists") or {"FUZZ": task_data["wordlist_path"]},
             "worker_ids": task_data.get("worker_ids", []),
             "created_at": time.time()
         }
+        if targets_file:
+            full_task_data["targets_file"] = targets_file
+        # Дочерняя задача рекурсивного сканирования
+        if task_data.get("parent_task_id"):
+            full_task_data["parent_task_id"] = task_data["parent_task_id"]
+            full_task_data["root_task_id"] = task_data["root_task_id"]
+            full_task_data["depth"] = task_data["depth"]
+        else:
+            self.recursion.register_root(full_task_data)
+        # Отметки стадий передаются в сообщениях задачи и результата
+        full_task_data["trace"] = {"created": full_task_data["created_at"]}
         
         # Сохраняем в БД
         self.db.save_task(full_task_data)
+        self.events.publish(EVENT_TASK, task_id=task_id, target=full_task_data["target"],
+                            wordlist_name=full_task_data["wordlist_name"], status="pending", progress=0)
         
-        # Распределяем по воркерам
-        self._distribute_task(full_task_data)
-        
-        self.active_tasks[task_id] = {
-            "status": "distributed",
-            "workers": task_data.get("worker_ids", []),
-            "results_received": 0,
-            "total_workers": len(task_data.get("worker_ids", []))
-        }
+        # Распределяем шарды по воркерам
+        with DISTRIBUTE_SECONDS.time():
+            self._distribute_task(full_task_data)
+        TASKS_CREATED.inc()
         
         logger.info(f"Created task {task_id} for {len(task_data['worker_ids'])} workers")
         return task_id
     
     def _distribute_task(self, task_data: Dict[str, Any]):
-        """Распределяет задачу между воркерами"""
-        for worker_id in task_data["worker_ids"]:
-            worker_task = task_data.copy()
-            worker_task["worker_id"] = worker_id
+        """Ставит задачу в планировщик и раздает шарды свободным воркерам"""
+        with self.lock:
+            self.active_tasks[task_data["task_id"]] = {
+                "status": "distributed",
+                "workers": task_data.get("worker_ids", []),
+                "results_received": 0,
+                "findings_count": 0,
+                "failed_shards": 0,
+                "total_shards": 1,
+                "task_data": task_data
+            }
+        
+        cached_reports = []
+        cached = None
+        if self.scan_cache.enabled(task_data):
+            cached = lambda shards: self._lookup_cache(task_data, shards, cached_reports)
+        
+        total_shards = self.scheduler.submit(task_data, cached)
+        with self.lock:
+            self.active_tasks[task_data["task_id"]]["total_shards"] = total_shards
+        
+        if cached_reports:
+            self._serve_cached(task_data, cached_reports)
+        self.scheduler.dispatch()
+    
+    def _lookup_cache(self, task_data: Dict[str, Any], shards: List[Dict[str, Any]],
+                      cached_reports: List[Dict[str, Any]]) -> set:
+        """
+        Ищет шарды задачи в кэше сканирования. Отчеты найденных шардов
+        добавляются в cached_reports, ключи остальных запоминаются, чтобы
+        сохранить их результаты. Возвращает номера найденных шардов
+        """
+        try:
+            signature = self.scan_cache.task_signature(task_data)
+            if signature is None:
+                return set()
+            keys = {shard["shard_id"]: self.scan_cache.shard_key(signature, shard) for shard in shards}
+            entries = self.scan_cache.lookup(list(keys.values()))
+        except Exception as e:
+            logger.error(f"Scan cache lookup failed for task {task_data['task_id']}: {str(e)}")
+            return set()
+        
+        hits = set()
+        for shard in shards:
+            key = keys[shard["shard_id"]]
+            if key in entries:
+                hits.add(shard["shard_index"])
+                cached_reports.append(entries[key])
+        
+        with self.lock:
+            self.active_tasks[task_data["task_id"]]["cache_keys"] = {
+                shard_id: key for shard_id, key in keys.items() if key not in entries
+            }
+        if hits:
+            logger.info(f"Task {task_data['task_id']}: {len(hits)} of {len(shards)} shards found in scan cache")
+        return hits
+    
+    def _serve_cached(self, task_data: Dict[str, Any], reports: List[Dict[str, Any]]):
+        """Сохраняет находки шардов из кэша и засчитывает шарды одним обновлением прогресса"""
+        task_id = task_data["task_id"]
+        parser = ResultParser()
+        findings = []
+        for report in reports:
+            findings.extend(parser.parse_ffuf_results(task_id, report))
+        
+        saved = self._save_findings(task_id, findings)
+        for report in reports:
+            self._expand_recursion({"task_id": task_id, "results": report})
+        self._shard_done(task_id, saved, len(reports))
+    
+    def _enqueue_worker_task(self, worker_task: Dict[str, Any]):
+        """Кладет задачу в очередь воркера и продлевает TTL очереди"""
+        worker_id = worker_task["worker_id"]
+        queue = f"tasks:{worker_id}"
+        mark(worker_task.get("trace"), "enqueued")
+        frames = self.codec.encode(worker_task, self._get_worker_codec(worker_id))
+        
+        pipe = self.queue_redis.pipeline()
+        pipe.rpush(queue, *frames)
+        # Очередь пропавшего воркера будет удалена по TTL
+        pipe.expire(queue, self.queue_ttl)
+        pipe.execute()
+        WORKER_TASKS_SENT.inc()
+        
+        logger.debug(f"Sent shard {worker_task.get('shard_id')} of task {worker_task['task_id']} to worker {worker_id}")
+    
+    def maintenance_tick(self):
+        """Периодическое обслуживание: шарды для новых воркеров, копии отстающих шардов, недособранные сообщения"""
+        self.last_maintenance = time.time()
+        
+        try:
+            self.scheduler.dispatch()
+            self.scheduler.speculate()
+            self.codec.expire_partials()
+            self._watch_workers()
             
-            # Отправляем задачу в очередь воркера
-            self.redis.rpush(
-                f"tasks:{worker_id}",
-                json.dumps(worker_task)
-            )
+            if self.last_maintenance - self.last_cache_purge >= self.cache_purge_interval:
+                self.last_cache_purge = self.last_maintenance
+                purged = self.scan_cache.purge_expired()
+                if purged:
+                    logger.info(f"Purged {purged} expired scan cache entries")
+        except Exception as e:
+            logger.error(f"Maintenance error: {str(e)}")
+    
+    def _watch_workers(self):
+        """Публикует события о воркерах, которые появились, ушли в offline или удалены"""
+        workers = self.get_workers_status()
+        states = {worker_id: info["status"] for worker_id, info in workers.items()}
+        for worker_id, status in states.items():
+            if self.worker_states.get(worker_id) != status:
+                info = workers[worker_id]
+                self.events.publish(EVENT_WORKER, worker_id=worker_id, status=status,
+                                    hostname=info.get("hostname", "unknown"), threads=info.get("threads", 0))
+        for worker_id in self.worker_states.keys() - states.keys():
+            self.events.publish(EVENT_WORKER, worker_id=worker_id, status="removed")
+        self.worker_states = states
+    
+    def get_queue_metrics(self) -> Dict[str, Any]:
+        """Возвращает глубину очередей Redis"""
+        metrics = {
+            "results": 0,
+            "tasks": {},
+            "control": {},
+            # Шарды, ожидающие свободного слота воркера
+            "deferred": self.scheduler.pending_count(),
+            "results_high_water": self.results_high_water,
+            "task_queue_high_water": self.task_queue_high_water
+        }
+        
+        try:
+            worker_ids = list(self.redis.hkeys("workers:active"))
             
-            logger.debug(f"Sent task {task_data['task_id']} to worker {worker_id}")
+            pipe = self.queue_redis.pipeline()
+            pipe.llen("results")
+            for worker_id in worker_ids:
+                pipe.llen(f"tasks:{worker_id}")
+                pipe.llen(f"control:{worker_id}")
+            depths = pipe.execute()
+            
+            metrics["results"] = depths[0]
+            for i, worker_id in enumerate(worker_ids):
+                metrics["tasks"][worker_id] = depths[1 + i * 2]
+                metrics["control"][worker_id] = depths[2 + i * 2]
+        except Exception as e:
+            logger.error(f"Failed to get queue metrics: {str(e)}")
+        
+        return metrics
+    
+    def _publish_capabilities(self):
+        """Публикует поддерживаемые мастером кодеки для согласования с воркерами"""
+        try:
+            self.redis.hset("master:capabilities", mapping={
+                "codecs": json.dumps(supported_codecs()),
+                "results_high_water": self.results_high_water,
+                "updated_at": time.time()
+            })
+        except Exception as e:
+            logger.error(f"Failed to publish master capabilities: {str(e)}")
+    
+    def _get_worker_codec(self, worker_id: str) -> str:
+        """Определяет кодек для сообщений конкретному воркеру"""
+        try:
+            worker_json = self.redis.hget("workers:active", worker_id)
+            if worker_json:
+                return negotiate_codec(json.loads(worker_json).get("codecs"))
+        except Exception as e:
+            logger.error(f"Failed to negotiate codec for worker {worker_id}: {str(e)}")
+        return negotiate_codec(None)
     
     def get_workers_status(self) -> Dict[str, Any]:
         """Возвращает статус всех воркеров"""
@@ -101,76 +353,289 @@ class TaskManager:
         
         return workers
     
+    def send_control_command(self, worker_id: str, command: Dict[str, Any]):
+        """Отправляет управляющую команду в очередь воркера"""
+        command.setdefault("timestamp", time.time())
+        frames = self.codec.encode(command, self._get_worker_codec(worker_id))
+        
+        pipe = self.queue_redis.pipeline()
+        pipe.rpush(f"control:{worker_id}", *frames)
+        pipe.expire(f"control:{worker_id}", self.queue_ttl)
+        pipe.execute()
+    
+    def _cancel_shard(self, worker_id: str, task_id: str, shard_id: str):
+        """Отменяет копию шарда, проигравшую спекулятивному выполнению"""
+        self.send_control_command(worker_id, {
+            "type": "cancel_task",
+            "task_id": task_id,
+            "shard_id": shard_id
+        })
+        logger.info(f"Cancelled duplicate shard {shard_id} on worker {worker_id}")
+    
     def update_worker_threads(self, worker_id: str, threads: int):
         """Обновляет количество потоков воркера"""
         try:
-            command = {
+            self.send_control_command(worker_id, {
                 "type": "update_threads",
-                "threads": threads,
-                "timestamp": time.time()
-            }
-            
-            self.redis.rpush(
-                f"control:{worker_id}",
-                json.dumps(command)
-            )
+                "threads": threads
+            })
             
             logger.info(f"Updated worker {worker_id} threads to {threads}")
             
         except Exception as e:
             logger.error(f"Failed to update worker threads: {str(e)}")
     
+    def start_profile(self, target: str, kind: str = "sampling", duration: float = 30,
+                      interval: float = 0.01) -> str:
+        """
+        Запускает профилирование мастера (target="master") или воркера.
+        Профиль появится в list_profiles после окончания сеанса
+        """
+        if kind not in PROFILE_KINDS:
+            raise ValueError(f"Unsupported profile kind: {kind}")
+        
+        profile_id = f"profile_{uuid.uuid4().hex[:8]}"
+        
+        if target == "master":
+            if not self.profiler.start(profile_id, kind, duration, interval):
+                raise RuntimeError("Master profile could not be started (another profile is running?)")
+        else:
+            command = {"type": "start_profile", "profile_id": profile_id, "kind": kind,
+                       "duration": duration, "interval": interval}
+            if kind == "tracemalloc":
+                command = {"type": "tracemalloc_snapshot", "profile_id": profile_id, "duration": duration}
+            self.send_control_command(target, command)
+        
+        logger.info(f"Requested {kind} profile {profile_id} from {target} for {duration}s")
+        return profile_id
+    
+    def stop_profile(self, target: str, profile_id: str = None):
+        """Досрочно завершает профилирование мастера или воркера"""
+        if target == "master":
+            self.profiler.stop(profile_id)
+        else:
+            self.send_control_command(target, {"type": "stop_profile", "profile_id": profile_id})
+    
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Возвращает метаданные профилей, загруженных в Redis"""
+        try:
+            return list_profiles(self.queue_redis)
+        except Exception as e:
+            logger.error(f"Failed to list profiles: {str(e)}")
+            return []
+    
+    def load_profile(self, profile_id: str) -> Optional[bytes]:
+        """Возвращает содержимое профиля или None, если он истек"""
+        return load_profile(self.queue_redis, profile_id)
+    
+    def _store_profile(self, meta: Dict[str, Any], data: bytes):
+        """Профили мастера хранятся там же, где профили воркеров"""
+        store_profile(self.queue_redis, meta, data, self.profile_ttl)
+    
     def _result_processor(self):
         """Обрабатывает результаты от воркеров"""
         while self.is_running:
             try:
                 # Блокирующее получение результата
-                result_data = self.redis.blpop("results", 1)
+                result_data = self.queue_redis.blpop("results", 1)
                 
                 if result_data:
-                    _, result_json = result_data
-                    result = json.loads(result_json)
-                    self._process_worker_result(result)
+                    _, raw_result = result_data
+                    result = self.codec.decode(raw_result)
+                    
+                    # None - получен не последний чанк большого сообщения
+                    if result is not None:
+                        mark(result.get("trace"), "result_popped")
+                        self.process_result(result)
+                
+                if time.time() - self.last_maintenance >= self.maintenance_interval:
+                    self.maintenance_tick()
                     
             except Exception as e:
                 logger.error(f"Result processor error: {str(e)}")
                 time.sleep(5)
     
+    def process_result(self, result: Dict[str, Any]):
+        """Обрабатывает декодированный результат (безопасно вызывать из нескольких потоков)"""
+        try:
+            with RESULT_SECONDS.time(), self.profiler.profiled():
+                self._process_worker_result(result)
+            RESULTS_RECEIVED.labels(result.get("status", "unknown")).inc()
+        except Exception as e:
+            RESULT_ERRORS.inc()
+            logger.error(f"Failed to process result for task {result.get('task_id')}: {str(e)}")
+    
     def _process_worker_result(self, result: Dict[str, Any]):
         """Обрабатывает результат от воркера"""
         task_id = result["task_id"]
         worker_id = result["worker_id"]
         status = result["status"]
+        trace = result.get("trace")
         
         logger.info(f"Processing result from worker {worker_id} for task {task_id}")
         
+        # Засчитывается первый результат шарда, остальные копии отбрасываются
+        if result.get("shard_id") and not self.scheduler.shard_finished(
+                result["shard_id"], worker_id, failed=status == "failed"):
+            logger.info(f"Discarded result of shard {result['shard_id']} from worker {worker_id}")
+            self.scheduler.dispatch()
+            return
+        
         if status == "completed":
             # Парсим результаты
-            from .result_parser import ResultParser
             parser = ResultParser()
             findings = parser.parse_ffuf_results(task_id, result["results"])
+            mark(trace, "parsed")
             
-            # Сохраняем находки
-            for finding in findings:
-                self.db.save_finding(finding)
+            # Сохраняем находки одной транзакцией
+            saved = self._save_findings(task_id, findings, result.get("target"))
+            mark(trace, "persisted")
             
-            # Обновляем прогресс задачи
-            if task_id in self.active_tasks:
-                self.active_tasks[task_id]["results_received"] += 1
-                
-                progress = (
-                    self.active_tasks[task_id]["results_received"] / 
-                    self.active_tasks[task_id]["total_workers"] * 100
-                )
-                
-                self.db.update_task_progress(task_id, progress)
-                
-                # Если все воркеры завершили
-                if self.active_tasks[task_id]["results_received"] >= self.active_tasks[task_id]["total_workers"]:
-                    self.db.complete_task(task_id, len(findings))
-                    del self.active_tasks[task_id]
-                    logger.info(f"Task {task_id} completed with {len(findings)} findings")
+            # ffuf завершился по таймауту или с ошибкой - результаты шарда неполные
+            error = result.get("error") or result["results"].get("error")
+            if error:
+                logger.error(f"Worker {worker_id} returned incomplete shard of task {task_id}: {error}")
+                with self.lock:
+                    if task_id in self.active_tasks:
+                        self.active_tasks[task_id]["failed_shards"] += 1
+            self._save_trace(result)
+            self._store_cached(result)
+            self._expand_recursion(result)
+            self._shard_done(task_id, saved)
         
         elif status == "failed":
             logger.error(f"Worker {worker_id} failed task {task_id}: {result.get('error')}")
-            # TODO: Реализовать перераспределение задачи
+            self._save_trace(result)
+            # TODO: Реализовать перераспределение шарда
+            with self.lock:
+                if task_id in self.active_tasks:
+                    self.active_tasks[task_id]["failed_shards"] += 1
+            self._shard_done(task_id, 0)
+    
+    def _save_findings(self, task_id: str, findings: List[Dict[str, Any]], target: str = None) -> int:
+        """
+        Сохраняет находки шарда, возвращает число сохраненных. При
+        повторном сканировании цели сохраняются только новые и измененные
+        находки - неизмененные лишь продлевают базовую линию
+        """
+        with self.lock:
+            task_state = self.active_tasks.get(task_id)
+        task_data = task_state["task_data"] if task_state else None
+        parsed = len(findings)
+        
+        # Результат шарда пакетной задачи от старого воркера не содержит цели
+        if self.incremental and findings and task_data and (target or "targets_file" not in task_data):
+            scope, normalized = baseline_scope(task_data, target or task_data["target"])
+            for finding in findings:
+                finding["url_key"] = normalize_url(finding["url"])
+            try:
+                findings = self.db.diff_baseline(scope, normalized, task_id, findings)
+                BASELINE_CHANGES.labels(CHANGE_UNCHANGED).inc(parsed - len(findings))
+                for finding in findings:
+                    BASELINE_CHANGES.labels(finding["change_type"]).inc()
+            except Exception as e:
+                logger.error(f"Baseline comparison failed for task {task_id}: {str(e)}")
+        
+        self.db.save_findings(findings)
+        FINDINGS_INGESTED.inc(parsed)
+        self._publish_findings(task_id, findings)
+        return len(findings)
+    
+    def _publish_findings(self, task_id: str, findings: List[Dict[str, Any]]):
+        if findings:
+            self.events.publish(EVENT_FINDINGS, task_id=task_id, count=len(findings),
+                                critical=sum(1 for f in findings if f["severity"] == "critical"),
+                                findings=finding_summaries(findings))
+    
+    def _close_baselines(self, task_id: str, task_state: Dict[str, Any]) -> int:
+        """
+        Отмечает исчезнувшие с прошлого сканирования URL завершенной задачи,
+        возвращает число сохраненных находок об исчезновении
+        """
+        if not self.incremental or task_state.get("failed_shards"):
+            # Результаты упавших шардов неизвестны - исчезновение не определить
+            return 0
+        
+        findings = []
+        try:
+            for scope, _ in task_scopes(task_state["task_data"]):
+                for previous in self.db.mark_disappeared(scope, task_id):
+                    findings.append(disappeared_finding(task_id, previous))
+        except Exception as e:
+            logger.error(f"Failed to close baselines of task {task_id}: {str(e)}")
+        
+        self.db.save_findings(findings)
+        BASELINE_CHANGES.labels(CHANGE_DISAPPEARED).inc(len(findings))
+        self._publish_findings(task_id, findings)
+        return len(findings)
+    
+    def _expand_recursion(self, result: Dict[str, Any]):
+        """Создает дочерние задачи для каталогов, найденных шардом"""
+        with self.lock:
+            task_state = self.active_tasks.get(result["task_id"])
+        if not task_state:
+            return
+        
+        try:
+            for child in self.recursion.plan(task_state["task_data"], result["results"]):
+                child_id = self.create_task(child)
+                logger.info(f"Recursing into {child['target']} (depth {child['depth']}) as {child_id}")
+        except Exception as e:
+            logger.error(f"Failed to expand recursion for task {result['task_id']}: {str(e)}")
+    
+    def _store_cached(self, result: Dict[str, Any]):
+        """Сохраняет отчет шарда в кэш сканирования"""
+        with self.lock:
+            task_state = self.active_tasks.get(result["task_id"])
+            key = task_state and task_state.get("cache_keys", {}).pop(result.get("shard_id"), None)
+        if not key:
+            return
+        
+        try:
+            self.scan_cache.store(key, result["task_id"], result["results"])
+        except Exception as e:
+            logger.error(f"Failed to cache shard {result['shard_id']}: {str(e)}")
+    
+    def _shard_done(self, task_id: str, findings_count: int, shards: int = 1):
+        """Учитывает завершенные шарды в прогрессе задачи и выдает воркеру следующий"""
+        with self.lock:
+            task_state = self.active_tasks.get(task_id)
+            if task_state:
+                task_state["results_received"] += shards
+                task_state["findings_count"] += findings_count
+                
+                # Прогресс по перебранным словам (комбинациям) - последний шард бывает неполным
+                progress = self.scheduler.progress(task_id)
+                if progress is None:
+                    progress = task_state["results_received"] / task_state["total_shards"] * 100
+                completed = task_state["results_received"] >= task_state["total_shards"]
+                if completed:
+                    del self.active_tasks[task_id]
+        
+        if task_state:
+            # Если все шарды завершены
+            if completed:
+                task_state["findings_count"] += self._close_baselines(task_id, task_state)
+                self.db.complete_task(task_id, task_state["findings_count"])
+                self.events.publish(EVENT_TASK, task_id=task_id, status="completed", progress=100,
+                                    findings_count=task_state["findings_count"])
+                logger.info(f"Task {task_id} completed with {task_state['findings_count']} findings")
+            else:
+                self.db.update_task_progress(task_id, progress)
+                self.events.publish(EVENT_TASK, task_id=task_id, progress=progress)
+        
+        # Слот воркера освободился
+        self.scheduler.dispatch()
+    
+    def get_schedule(self) -> Dict[str, Any]:
+        """Возвращает очередь планировщика и последние решения"""
+        return self.scheduler.get_state()
+    
+    def _save_trace(self, result: Dict[str, Any]):
+        """Сохраняет трассировку результата (старые воркеры ее не присылают)"""
+        trace = result.get("trace")
+        if not trace:
+            return
+        
+        shard_id = result.get("shard_id") or result["worker_id"]
+        self.db.save_task_trace(result["task_id"], shard_id, result["worker_id"], trace)
@@ -0,0 +1,137 @@
+import csv
+import io
+import json
+import time
+import logging
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Отметки жизненного цикла задачи в порядке прохождения
+STAGES = [
+    "created",        # мастер создал задачу
+    "enqueued",       # задача положена в очередь воркера
+    "dequeued",       # воркер забрал задачу из очереди
+    "ffuf_start",     # запущен движок фаззинга
+    "ffuf_end",       # движок завершил работу
+    "result_pushed",  # результат отправлен в очередь results
+    "result_popped",  # мастер забрал результат из очереди
+    "parsed",         # результат разобран ResultParser
+    "persisted"       # находки записаны в БД
+]
+
+# Интервалы между соседними отметками
+SEGMENTS = [
+    ("dispatch", "created", "enqueued"),
+    ("queue_wait", "enqueued", "dequeued"),
+    ("worker_setup", "dequeued", "ffuf_start"),
+    ("ffuf", "ffuf_start", "ffuf_end"),
+    ("result_wait", "ffuf_end", "result_pushed"),
+    ("transfer", "result_pushed", "result_popped"),
+    ("parse", "result_popped", "parsed"),
+    ("persist", "parsed", "persisted")
+]
+
+
+def mark(trace: Optional[Dict[str, float]], stage: str, timestamp: float = None):
+    """Ставит отметку стадии, если сообщение несет трассировку"""
+    if trace is not None:
+        trace[stage] = timestamp or time.time()
+
+
+def segment_durations(stages: Dict[str, float]) -> Dict[str, float]:
+    """
+    Длительности интервалов трассировки в секундах.
+    Отметки ставятся на разных машинах, поэтому интервалы между мастером
+    и воркером (queue_wait, transfer) включают рассинхронизацию часов
+    """
+    durations = {}
+    for name, start, end in SEGMENTS:
+        if start in stages and end in stages:
+            durations[name] = max(0.0, stages[end] - stages[start])
+            
+    if "created" in stages:
+        last = max(stages.values())
+        durations["total"] = max(0.0, last - stages["created"])
+    return durations
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class TraceAnalyzer:
+    """Водопад задержек по задаче и сводка p50/p95 по стадиям"""
+    
+    def __init__(self, db_manager):
+        self.db = db_manager
+        
+    def get_waterfall(self, task_id: str) -> List[Dict[str, Any]]:
+        """
+        Водопад по шардам задачи: для каждого интервала - смещение
+        от создания задачи и длительность
+        """
+        waterfall = []
+        for trace in self.db.get_task_traces(task_id=task_id):
+            stages = trace["stages"]
+            origin = stages.get("created") or min(stages.values())
+            
+            segments = []
+            for name, start, end in SEGMENTS:
+                if start in stages and end in stages:
+                    segments.append({
+                        "stage": name,
+                        "offset": max(0.0, stages[start] - origin),
+                        "duration": max(0.0, stages[end] - stages[start])
+                    })
+                    
+            waterfall.append({
+                "shard_id": trace["shard_id"],
+                "worker_id": trace["worker_id"],
+                "segments": segments,
+                "total": segment_durations(stages).get("total", 0.0)
+            })
+        return waterfall
+        
+    def get_summary(self, task_id: str = None, limit: int = 1000) -> Dict[str, Any]:
+        """Перцентили длительности стадий по последним трассировкам"""
+        traces = self.db.get_task_traces(task_id=task_id, limit=limit)
+        
+        samples = {name: [] for name, _, _ in SEGMENTS}
+        samples["total"] = []
+        for trace in traces:
+            for name, duration in segment_durations(trace["stages"]).items():
+                samples[name].append(duration)
+                
+        stages = {}
+        for name, values in samples.items():
+            if not values:
+                continue
+            stages[name] = {
+                "count": len(values),
+                "p50": round(percentile(values, 50), 4),
+                "p95": round(percentile(values, 95), 4),
+                "max": round(max(values), 4)
+            }
+            
+        return {"traces": len(traces), "task_id": task_id, "stages": stages}
+        
+    def export_summary(self, format_type: str = "json", task_id: str = None) -> str:
+        """Экспортирует сводку по стадиям в JSON или CSV"""
+        summary = self.get_summary(task_id)
+        
+        if format_type == "json":
+            return json.dumps(summary, indent=2)
+        elif format_type == "csv":
+            output = io.StringIO()
+            writer = csv.writer(output)
+            writer.writerow(["Stage", "Count", "P50 (s)", "P95 (s)", "Max (s)"])
+            for name, stats in summary["stages"].items():
+                writer.writerow([name, stats["count"], stats["p50"], stats["p95"], stats["max"]])
+            return output.getvalue()
+        else:
+            raise ValueError(f"Unsupported format: {format_type}")
@@ -0,0 +1,113 @@
+import threading
+import logging
+import types
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundExecutor:
+    """
+    Фоновое выполнение запросов к БД и Redis для Tk-интерфейса.
+    
+    fetch выполняется в рабочем потоке, apply - в главном потоке Tk через
+    root.after. Если apply - генератор, он продвигается на один шаг за проход
+    цикла событий, и окно остается отзывчивым между пачками строк.
+    
+    Задания с одним ключом схлопываются: новое задание заменяет ожидающее
+    и отменяет применение уже выполняющегося, устаревший результат
+    отбрасывается. Задания без ключа (запись в БД) выполняются все
+    """
+    
+    def __init__(self, root, workers: int = 1, name: str = "gui-data"):
+        self.root = root
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._generations: Dict[str, int] = {}
+        # Задания, еще не выполненные или не примененные до конца
+        self.pending = 0
+        self._lock = threading.Lock()
+        
+    def submit(self, key: Optional[str], fetch: Callable[[], Any],
+               apply: Callable[[Any], Any] = None, error: Callable[[Exception], Any] = None):
+        with self._lock:
+            generation = self._generations.get(key, 0) + 1
+            if key is not None:
+                self._generations[key] = generation
+            self.pending += 1
+        self.pool.submit(self._run, key, generation, fetch, apply, error)
+        
+    def cancel(self, key: str):
+        """Отбрасывает ожидающее и выполняющееся задание с ключом"""
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            
+    def current(self, key: Optional[str], generation: int) -> bool:
+        return key is None or self._generations.get(key) == generation
+        
+    def call_soon(self, callback: Callable, *args):
+        """Вызывает callback в главном потоке Tk"""
+        try:
+            self.root.after(0, callback, *args)
+        except RuntimeError:
+            # Главный цикл уже завершен
+            pass
+            
+    def _done(self):
+        with self._lock:
+            self.pending -= 1
+            
+    def shutdown(self):
+        with self._lock:
+            for key in self._generations:
+                self._generations[key] += 1
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        
+    def _run(self, key: Optional[str], generation: int, fetch: Callable, apply: Callable, error: Callable):
+        if not self.current(key, generation):
+            self._done()
+            return
+        try:
+            result = fetch()
+        except Exception as e:
+            logger.error(f"Background task {key or 'write'} failed: {str(e)}")
+            if error:
+                self.call_soon(error, e)
+            self._done()
+            return
+        if apply and self.current(key, generation):
+            self.call_soon(self._apply, key, generation, apply, result)
+        else:
+            self._done()
+            
+    def _apply(self, key: Optional[str], generation: int, apply: Callable, result: Any):
+        if not self.current(key, generation):
+            self._done()
+            return
+        try:
+            steps = apply(result)
+        except Exception as e:
+            logger.error(f"Applying {key or 'write'} result failed: {str(e)}")
+            self._done()
+            return
+        if isinstance(steps, types.GeneratorType):
+            self._step(key, generation, steps)
+        else:
+            self._done()
+            
+    def _step(self, key: Optional[str], generation: int, steps):
+        # Более новое задание с тем же ключом само приведет таблицу в порядок
+        if not self.current(key, generation):
+            steps.close()
+            self._done()
+            return
+        try:
+            next(steps)
+        except StopIteration:
+            self._done()
+            return
+        except Exception as e:
+            logger.error(f"Applying {key or 'write'} result failed: {str(e)}")
+            self._done()
+            return
+        self.root.after(1, self._step, key, generation, steps)
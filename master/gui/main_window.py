@@ -7,15 +7,43 @@ import uuid
 import json
 import os
 import sys
+from typing import Dict, List, Any, Optional, Tuple
 
 # Добавляем родительскую директорию в путь Python
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Теперь импортируем абсолютным путем
 from core.master_core import MasterCore
+from core.scheduler import PRIORITIES, DEFAULT_PRIORITY
+from models.database import FINDING_LIST_FIELDS
+from core.events import EVENT_FINDINGS, EVENT_TASK, EVENT_WORKER
+from gui.background import BackgroundExecutor
 
 logger = logging.getLogger(__name__)
 
+# Строк находок на странице таблицы
+FINDINGS_PAGE_SIZE = 200
+# Задач в таблице задач
+TASKS_LIMIT = 100
+# Строк таблицы, вставляемых за один проход цикла событий Tk
+TREE_BATCH_SIZE = 50
+# Изменения приходят событиями, полное обновление - запасной путь (секунды)
+FALLBACK_REFRESH_INTERVAL = 120
+# Задержка обновления вкладки после события: пачка событий дает одно обновление
+EVENT_REFRESH_DELAY_MS = 300
+
+# Цвета стадий в водопаде задержек
+STAGE_COLORS = {
+    "dispatch": "#9e9e9e",
+    "queue_wait": "#ffb74d",
+    "worker_setup": "#fff176",
+    "ffuf": "#64b5f6",
+    "result_wait": "#f06292",
+    "transfer": "#ba68c8",
+    "parse": "#81c784",
+    "persist": "#4db6ac"
+}
+
 class MainWindow:
     def __init__(self, master_core: MasterCore):
         self.master_core = master_core
@@ -26,6 +54,22 @@ class MainWindow:
         # Стили
         self.setup_styles()
         
+        # Отметки изменений (get_change_marks), на которых построены таблицы
+        self.dashboard_marks = None
+        self.findings_marks = None
+        self.findings_view = None
+        self.findings_rows = {}
+        self.tasks_mark = None
+        self.task_rows = {}
+        # Показанные строки таблиц: имя виджета -> {iid: values}
+        self.tree_rows = {}
+        # Вкладки, обновление которых уже запланировано по событиям
+        self.pending_refreshes = set()
+        
+        # Запросы к БД и Redis - в фоне, экспорт - в отдельном потоке, чтобы не задерживать обновления
+        self.executor = BackgroundExecutor(self.root)
+        self.export_executor = BackgroundExecutor(self.root, name="gui-export")
+        
         # Основной интерфейс
         self.setup_ui()
         
@@ -83,7 +127,8 @@ class MainWindow:
             ("Active Workers", "active_workers"),
             ("Total Findings", "total_findings"),
             ("Critical Findings", "critical_findings"),
-            ("Unchecked Findings", "unchecked_findings")
+            ("Unchecked Findings", "unchecked_findings"),
+            ("Results Queue", "results_queue")
         ]
         
         for i, (label, key) in enumerate(stats_data):
@@ -146,19 +191,27 @@ class MainWindow:
         target_entry = ttk.Entry(config_frame, textvariable=self.target_var, width=60)
         target_entry.grid(row=0, column=1, columnspan=2, sticky=tk.W, pady=5, padx=5)
         
+        # Пакетное сканирование: файл со списком целей заменяет Target URL
+        ttk.Label(config_frame, text="Targets File:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.targets_file_var = tk.StringVar()
+        ttk.Entry(config_frame, textvariable=self.targets_file_var, 
+                 width=48).grid(row=1, column=1, sticky=tk.W, pady=5, padx=5)
+        ttk.Button(config_frame, text="Browse...", 
+                  command=self.browse_targets_file).grid(row=1, column=2, sticky=tk.W, pady=5)
+        
         # Словарь
-        ttk.Label(config_frame, text="Wordlist:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        ttk.Label(config_frame, text="Wordlist:").grid(row=2, column=0, sticky=tk.W, pady=5)
         self.wordlist_var = tk.StringVar()
         wordlists = list(self.master_core.get_wordlists().keys())
         self.wordlist_combo = ttk.Combobox(config_frame, textvariable=self.wordlist_var, 
                                           values=wordlists, state="readonly", width=57)
-        self.wordlist_combo.grid(row=1, column=1, columnspan=2, sticky=tk.W, pady=5, padx=5)
+        self.wordlist_combo.grid(row=2, column=1, columnspan=2, sticky=tk.W, pady=5, padx=5)
         if wordlists:
             self.wordlist_combo.set(wordlists[0])
         
         # Дополнительные опции
         options_frame = ttk.LabelFrame(config_frame, text="Advanced Options", padding=10)
-        options_frame.grid(row=2, column=0, columnspan=3, sticky=tk.W+tk.E, pady=10)
+        options_frame.grid(row=3, column=0, columnspan=3, sticky=tk.W+tk.E, pady=10)
         
         # Метод HTTP
         ttk.Label(options_frame, text="HTTP Method:").grid(row=0, column=0, sticky=tk.W, pady=2)
@@ -177,11 +230,53 @@ class MainWindow:
         ttk.Checkbutton(options_frame, text="Follow Redirects", 
                        variable=self.follow_redirects_var).grid(row=0, column=3, sticky=tk.W)
         
+        # Результаты неизменившихся шардов повторного сканирования берутся из кэша мастера
+        self.use_cache_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(options_frame, text="Use Scan Cache", 
+                       variable=self.use_cache_var).grid(row=0, column=4, sticky=tk.W, padx=20)
+        
         # Заголовки
         ttk.Label(options_frame, text="Custom Headers:").grid(row=1, column=0, sticky=tk.W, pady=2)
         self.headers_text = tk.Text(options_frame, width=50, height=3)
         self.headers_text.grid(row=1, column=1, columnspan=3, sticky=tk.W, pady=2, padx=5)
         
+        # Движок фаззинга ("default" - настройка воркера)
+        ttk.Label(options_frame, text="Engine:").grid(row=2, column=0, sticky=tk.W, pady=2)
+        self.engine_var = tk.StringVar(value="default")
+        ttk.Combobox(options_frame, textvariable=self.engine_var,
+                     values=["default", "ffuf", "native"], state="readonly",
+                     width=10).grid(row=2, column=1, sticky=tk.W, pady=2, padx=5)
+        
+        # Глубина рекурсии (используется при включенном Recursive)
+        ttk.Label(options_frame, text="Max Depth:").grid(row=2, column=2, sticky=tk.W, padx=20)
+        self.recursion_depth_var = tk.IntVar(value=2)
+        ttk.Spinbox(options_frame, from_=1, to=10, textvariable=self.recursion_depth_var,
+                    width=5).grid(row=2, column=3, sticky=tk.W)
+        
+        # Приоритет и проект для планировщика (проект по умолчанию - хост цели)
+        ttk.Label(options_frame, text="Priority:").grid(row=3, column=0, sticky=tk.W, pady=2)
+        self.priority_var = tk.StringVar(value=DEFAULT_PRIORITY)
+        ttk.Combobox(options_frame, textvariable=self.priority_var,
+                     values=list(PRIORITIES), state="readonly",
+                     width=10).grid(row=3, column=1, sticky=tk.W, pady=2, padx=5)
+        
+        ttk.Label(options_frame, text="Project:").grid(row=3, column=2, sticky=tk.W, padx=20)
+        self.project_var = tk.StringVar()
+        ttk.Entry(options_frame, textvariable=self.project_var, 
+                 width=20).grid(row=3, column=3, sticky=tk.W, pady=2)
+        
+        # Дополнительные словари для других ключевых слов: W2=api-wordlist.txt, W3=custom.txt
+        ttk.Label(options_frame, text="Extra Wordlists:").grid(row=4, column=0, sticky=tk.W, pady=2)
+        self.keywords_var = tk.StringVar()
+        ttk.Entry(options_frame, textvariable=self.keywords_var, 
+                 width=30).grid(row=4, column=1, sticky=tk.W, pady=2, padx=5)
+        
+        ttk.Label(options_frame, text="Mode:").grid(row=4, column=2, sticky=tk.W, padx=20)
+        self.mode_var = tk.StringVar(value="clusterbomb")
+        ttk.Combobox(options_frame, textvariable=self.mode_var,
+                     values=["clusterbomb", "pitchfork"], state="readonly",
+                     width=12).grid(row=4, column=3, sticky=tk.W, pady=2)
+        
         # Выбор воркеров
         workers_frame = ttk.LabelFrame(scan_frame, text="Worker Selection", padding=15)
         workers_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -245,6 +340,18 @@ class MainWindow:
                                     state="readonly", width=10)
         checked_combo.pack(side=tk.LEFT, padx=5)
         
+        ttk.Label(control_frame, text="Host:").pack(side=tk.LEFT, padx=5)
+        self.host_filter_var = tk.StringVar()
+        ttk.Entry(control_frame, textvariable=self.host_filter_var, width=25).pack(side=tk.LEFT)
+        
+        ttk.Label(control_frame, text="Task:").pack(side=tk.LEFT, padx=5)
+        self.task_filter_var = tk.StringVar()
+        ttk.Entry(control_frame, textvariable=self.task_filter_var, width=15).pack(side=tk.LEFT)
+        
+        ttk.Label(control_frame, text="URL contains:").pack(side=tk.LEFT, padx=5)
+        self.search_filter_var = tk.StringVar()
+        ttk.Entry(control_frame, textvariable=self.search_filter_var, width=20).pack(side=tk.LEFT)
+        
         # Кнопки
         ttk.Button(control_frame, text="Apply Filters", 
                   command=self.apply_findings_filters).pack(side=tk.LEFT, padx=10)
@@ -255,7 +362,7 @@ class MainWindow:
         
         # Таблица находок
         columns = ("finding_id", "url", "status_code", "content_length", "severity", 
-                  "checked", "created_at", "task_id")
+                  "change", "checked", "created_at", "task_id")
         
         self.findings_tree = ttk.Treeview(findings_frame, columns=columns, show="headings", height=20)
         
@@ -266,6 +373,7 @@ class MainWindow:
             "status_code": "Status",
             "content_length": "Size",
             "severity": "Severity",
+            "change": "Change",
             "checked": "Checked",
             "created_at": "Found At",
             "task_id": "Task ID"
@@ -280,10 +388,26 @@ class MainWindow:
         self.findings_tree.column("status_code", width=60)
         self.findings_tree.column("content_length", width=80)
         self.findings_tree.column("severity", width=80)
+        self.findings_tree.column("change", width=80)
         self.findings_tree.column("checked", width=60)
         self.findings_tree.column("created_at", width=120)
         self.findings_tree.column("task_id", width=100)
         
+        # Постраничная навигация: в таблице только текущая страница
+        self.findings_page_cursors = [None]
+        self.findings_next_cursor = None
+        pager_frame = ttk.Frame(findings_frame)
+        pager_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+        
+        self.findings_prev_button = ttk.Button(pager_frame, text="< Prev", command=self.prev_findings_page,
+                                               state=tk.DISABLED)
+        self.findings_prev_button.pack(side=tk.LEFT, padx=5)
+        self.findings_next_button = ttk.Button(pager_frame, text="Next >", command=self.next_findings_page,
+                                               state=tk.DISABLED)
+        self.findings_next_button.pack(side=tk.LEFT, padx=5)
+        self.findings_page_label = ttk.Label(pager_frame, text="")
+        self.findings_page_label.pack(side=tk.LEFT, padx=10)
+        
         # Scrollbar
         scrollbar = ttk.Scrollbar(findings_frame, orient=tk.VERTICAL, command=self.findings_tree.yview)
         self.findings_tree.configure(yscrollcommand=scrollbar.set)
@@ -300,7 +424,7 @@ class MainWindow:
         self.notebook.add(workers_frame, text="Workers")
         
         # Таблица воркеров
-        columns = ("worker_id", "status", "hostname", "threads", "current_task", "last_seen", "tasks_completed")
+        columns = ("worker_id", "status", "hostname", "threads", "current_task", "queued", "last_seen", "tasks_completed")
         self.workers_tree = ttk.Treeview(workers_frame, columns=columns, show="headings", height=15)
         
         headings = {
@@ -309,6 +433,7 @@ class MainWindow:
             "hostname": "Hostname",
             "threads": "Threads",
             "current_task": "Current Task",
+            "queued": "Queued",
             "last_seen": "Last Seen",
             "tasks_completed": "Tasks Completed"
         }
@@ -322,6 +447,7 @@ class MainWindow:
         self.workers_tree.column("hostname", width=150)
         self.workers_tree.column("threads", width=80)
         self.workers_tree.column("current_task", width=120)
+        self.workers_tree.column("queued", width=70)
         self.workers_tree.column("last_seen", width=120)
         self.workers_tree.column("tasks_completed", width=100)
         
@@ -340,6 +466,27 @@ class MainWindow:
         ttk.Button(control_frame, text="Refresh Workers", 
                   command=self.refresh_workers).pack(side=tk.LEFT, padx=5)
         
+        # Профилирование воркеров и мастера
+        profile_frame = ttk.LabelFrame(workers_frame, text="Profiling", padding="5")
+        profile_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Label(profile_frame, text="Profiler:").pack(side=tk.LEFT, padx=5)
+        self.profile_kind_var = tk.StringVar(value="sampling")
+        ttk.Combobox(profile_frame, textvariable=self.profile_kind_var, width=12, state="readonly",
+                     values=["sampling", "cprofile", "tracemalloc"]).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(profile_frame, text="Duration (s):").pack(side=tk.LEFT, padx=5)
+        self.profile_duration_var = tk.IntVar(value=30)
+        ttk.Spinbox(profile_frame, from_=1, to=600, 
+                   textvariable=self.profile_duration_var, width=5).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(profile_frame, text="Profile Selected Worker", 
+                  command=self.profile_selected_worker).pack(side=tk.LEFT, padx=10)
+        ttk.Button(profile_frame, text="Profile Master", 
+                  command=lambda: self.start_profile("master")).pack(side=tk.LEFT, padx=5)
+        ttk.Button(profile_frame, text="Profiles...", 
+                  command=self.show_profiles).pack(side=tk.LEFT, padx=5)
+        
         self.workers_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
     
     def setup_tasks_tab(self):
@@ -347,6 +494,16 @@ class MainWindow:
         tasks_frame = ttk.Frame(self.notebook)
         self.notebook.add(tasks_frame, text="Tasks")
         
+        # Панель управления
+        control_frame = ttk.Frame(tasks_frame)
+        control_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Button(control_frame, text="Latency Summary", 
+                  command=self.show_trace_summary).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Export Latency Summary", 
+                  command=self.export_trace_summary).pack(side=tk.LEFT, padx=5)
+        ttk.Label(control_frame, text="Double-click a task for its latency waterfall").pack(side=tk.LEFT, padx=10)
+        
         # Таблица задач
         columns = ("task_id", "target", "wordlist_name", "status", "progress", 
                   "findings_count", "created_at", "completed_at")
@@ -378,6 +535,40 @@ class MainWindow:
         self.tasks_tree.column("completed_at", width=120)
         
         self.tasks_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # Двойной клик - водопад задержек задачи
+        self.tasks_tree.bind("<Double-1>", self.show_task_waterfall)
+        
+        # Планировщик: очередь задач и последние решения
+        scheduler_frame = ttk.LabelFrame(tasks_frame, text="Scheduler", padding=5)
+        scheduler_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        queue_columns = ("task_id", "project", "priority", "shards", "running", "pending", "speculative", "pass", "wait")
+        self.schedule_tree = ttk.Treeview(scheduler_frame, columns=queue_columns, show="headings", height=6)
+        queue_headings = {
+            "task_id": "Task ID",
+            "project": "Project",
+            "priority": "Priority",
+            "shards": "Shards Done",
+            "running": "Running",
+            "pending": "Pending",
+            "speculative": "Speculative",
+            "pass": "Fair-Share Pass",
+            "wait": "Start Wait (s)"
+        }
+        for col, text in queue_headings.items():
+            self.schedule_tree.heading(col, text=text)
+            self.schedule_tree.column(col, width=100)
+        self.schedule_tree.column("project", width=200)
+        self.schedule_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
+        
+        decision_columns = ("time", "shard_id", "worker_id", "reason")
+        self.decisions_tree = ttk.Treeview(scheduler_frame, columns=decision_columns, show="headings", height=6)
+        for col, text, width in (("time", "Time", 70), ("shard_id", "Shard", 150),
+                                 ("worker_id", "Worker", 100), ("reason", "Decision", 350)):
+            self.decisions_tree.heading(col, text=text)
+            self.decisions_tree.column(col, width=width)
+        self.decisions_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
     
     def setup_status_bar(self):
         """Настройка статус бара"""
@@ -389,14 +580,21 @@ class MainWindow:
         status_label.pack(fill=tk.X, padx=2, pady=2)
     
     def setup_data_refresh(self):
-        """Настройка автоматического обновления данных"""
+        """
+        Изменения приходят событиями мастера и применяются сразу,
+        периодическое полное обновление остается медленным запасным путем
+        """
+        self.unsubscribe_events = self.master_core.subscribe_events(
+            lambda event: self.executor.call_soon(self.apply_event, event)
+        )
+        
         def refresh_loop():
             while True:
                 try:
                     self.root.after(0, self.refresh_all_data)
                 except Exception as e:
                     logger.error(f"Refresh error: {str(e)}")
-                time.sleep(30)  # Ждем 30 секунд
+                time.sleep(FALLBACK_REFRESH_INTERVAL)
         
         refresh_thread = threading.Thread(target=refresh_loop, daemon=True)
         refresh_thread.start()
@@ -406,10 +604,11 @@ class MainWindow:
         """Запускает новое сканирование"""
         try:
             target = self.target_var.get().strip()
+            targets_file = self.targets_file_var.get().strip()
             wordlist = self.wordlist_var.get()
             
-            if not target:
-                messagebox.showerror("Error", "Please enter target URL")
+            if not target and not targets_file:
+                messagebox.showerror("Error", "Please enter target URL or targets file")
                 return
             
             if not wordlist:
@@ -429,19 +628,52 @@ class MainWindow:
                 "recursive": self.recursive_var.get(),
                 "follow_redirects": self.follow_redirects_var.get(),
             }
+            if options["recursive"]:
+                options["recursion_depth"] = self.recursion_depth_var.get()
             
             # Заголовки
             headers_text = self.headers_text.get("1.0", tk.END).strip()
             if headers_text:
                 options["headers"] = [h.strip() for h in headers_text.split('\n') if h.strip()]
             
+            if self.engine_var.get() != "default":
+                options["engine"] = self.engine_var.get()
+            
+            options["priority"] = self.priority_var.get()
+            if self.project_var.get().strip():
+                options["project"] = self.project_var.get().strip()
+            
+            keywords = {}
+            for item in self.keywords_var.get().split(","):
+                if not item.strip():
+                    continue
+                keyword, _, name = item.partition("=")
+                if not name.strip():
+                    messagebox.showerror("Error", f"Extra wordlist must be KEYWORD=wordlist: {item.strip()}")
+                    return
+                keywords[keyword.strip()] = name.strip()
+            if keywords:
+                options["mode"] = self.mode_var.get()
+            if not self.use_cache_var.get():
+                options["cache"] = False
+            
             # Создаем задачу
-            task_id = self.master_core.create_scan_task(
-                target=target,
-                wordlist_name=wordlist,
-                worker_ids=selected_workers,
-                options=options
-            )
+            if targets_file:
+                task_id = self.master_core.create_batch_task(
+                    targets_file=targets_file,
+                    wordlist_name=wordlist,
+                    worker_ids=selected_workers,
+                    options=options,
+                    keywords=keywords
+                )
+            else:
+                task_id = self.master_core.create_scan_task(
+                    target=target,
+                    wordlist_name=wordlist,
+                    worker_ids=selected_workers,
+                    options=options,
+                    keywords=keywords
+                )
             
             messagebox.showinfo("Success", f"Scan started with task ID: {task_id}")
             self.status_var.set(f"Scan started: {task_id}")
@@ -450,129 +682,383 @@ class MainWindow:
             messagebox.showerror("Error", f"Failed to start scan: {str(e)}")
             logger.error(f"Scan start error: {str(e)}")
     
+    def browse_targets_file(self):
+        """Выбор файла целей для пакетного сканирования"""
+        filename = filedialog.askopenfilename(
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if filename:
+            self.targets_file_var.set(filename)
+    
+    def apply_event(self, event: Dict[str, Any]):
+        """
+        Применяет событие мастера (главный поток): строки задач и воркеров
+        правятся сразу, находки и сводка догружаются по отметкам изменений
+        """
+        try:
+            if event["type"] == EVENT_FINDINGS:
+                if event.get("critical"):
+                    self.status_var.set(f"{event['critical']} new critical findings in task {event['task_id']}")
+                self.schedule_refresh("findings")
+                self.schedule_refresh("dashboard")
+            elif event["type"] == EVENT_TASK:
+                task = self.task_rows.get(event["task_id"])
+                if task is None or "status" in event:
+                    # Новая или завершенная задача: created_at и completed_at берем из БД
+                    self.schedule_refresh("tasks")
+                    return
+                task["progress"] = event["progress"]
+                self.drain(self.sync_tree(self.tasks_tree, self.task_tree_rows(self.task_rows.values())))
+            elif event["type"] == EVENT_WORKER:
+                shown = self.tree_rows.get(str(self.workers_tree), {})
+                if event["status"] == "active" or event["worker_id"] not in shown:
+                    # Новый или вернувшийся воркер: текущая задача и очередь есть только в Redis
+                    if event["status"] != "removed":
+                        self.schedule_refresh("workers")
+                    return
+                rows = []
+                for worker_id, values in shown.items():
+                    if worker_id == event["worker_id"]:
+                        if event["status"] == "removed":
+                            continue
+                        values = values[:1] + (event["status"],) + values[2:]
+                    rows.append((worker_id, values))
+                self.drain(self.sync_tree(self.workers_tree, rows))
+        except Exception as e:
+            logger.error(f"Failed to apply {event.get('type')} event: {str(e)}")
+    
+    def schedule_refresh(self, view: str):
+        """Обновляет вкладку после пачки событий - не чаще раза в EVENT_REFRESH_DELAY_MS"""
+        if view in self.pending_refreshes:
+            return
+        self.pending_refreshes.add(view)
+        
+        def refresh():
+            self.pending_refreshes.discard(view)
+            getattr(self, f"refresh_{view}")()
+            
+        self.root.after(EVENT_REFRESH_DELAY_MS, refresh)
+    
+    @staticmethod
+    def drain(steps):
+        """Выполняет генератор синхронизации таблицы до конца (правка нескольких строк)"""
+        for _ in steps:
+            pass
+    
     def refresh_all_data(self):
-        """Обновляет все данные в интерфейсе"""
+        """
+        Ставит обновление всех вкладок в фоновую очередь. Запросы выполняются
+        вне главного потока, еще не выполненное обновление вкладки заменяется новым
+        """
         try:
             self.refresh_dashboard()
             self.refresh_findings()
             self.refresh_workers()
             self.refresh_tasks()
-            self.status_var.set("Data refreshed")
+            # Очередь одна - статус применяется после всех обновлений
+            self.executor.submit("status", lambda: None, lambda _: self.status_var.set("Data refreshed"))
         except Exception as e:
             logger.error(f"Refresh error: {str(e)}")
             self.status_var.set("Refresh failed")
     
+    def sync_tree(self, tree, rows: List[Tuple[str, tuple]]):
+        """
+        Генератор: приводит таблицу к списку строк (iid, values) - удаляет
+        пропавшие строки, вставляет новые и правит только изменившиеся.
+        Уступает цикл событий после каждых TREE_BATCH_SIZE строк
+        """
+        shown = self.tree_rows.setdefault(str(tree), {})
+        wanted = {iid for iid, _ in rows}
+        stale = [iid for iid in shown if iid not in wanted]
+        if stale:
+            tree.delete(*stale)
+            for iid in stale:
+                del shown[iid]
+            
+        children = list(tree.get_children())
+        for index, (iid, values) in enumerate(rows):
+            if iid not in shown:
+                tree.insert("", index, iid=iid, values=values)
+                children.insert(index, iid)
+            else:
+                if shown[iid] != values:
+                    tree.item(iid, values=values)
+                if children[index] != iid:
+                    tree.move(iid, "", index)
+                    children.remove(iid)
+                    children.insert(index, iid)
+            # Прерванная синхронизация оставляет shown согласованным с таблицей
+            shown[iid] = values
+            if (index + 1) % TREE_BATCH_SIZE == 0:
+                yield
+    
     def refresh_dashboard(self):
-        """Обновляет дашборд"""
-        try:
-            summary = self.master_core.get_security_summary()
+        """Обновляет дашборд, сводка пересчитывается только после изменения находок"""
+        dashboard_marks = self.dashboard_marks
+        
+        def fetch():
+            queue_metrics = self.master_core.get_queue_metrics()
+            marks = self.master_core.get_change_marks()
+            findings_marks = (marks.get("findings"), marks.get("checked"))
+            if marks and findings_marks == dashboard_marks:
+                return queue_metrics, findings_marks, None
+            return queue_metrics, findings_marks if marks else None, self.master_core.get_security_summary()
             
-            # Общая статистика
-            self.stats_labels["total_findings"].config(text=summary["total_findings"])
-            self.stats_labels["critical_findings"].config(
-                text=summary["severity_stats"].get("critical", 0)
-            )
-            self.stats_labels["unchecked_findings"].config(text=summary["unchecked_count"])
-            
-            # Распределение по критичности
-            self.severity_tree.delete(*self.severity_tree.get_children())
-            for severity, count in summary["severity_stats"].items():
-                self.severity_tree.insert("", tk.END, text=severity.upper(), values=(count,))
-            
-            # Критические находки
-            self.critical_tree.delete(*self.critical_tree.get_children())
-            for finding in summary["recent_critical"]:
-                self.critical_tree.insert("", tk.END, values=(
-                    finding["url"],
-                    finding["status_code"],
-                    finding["created_at"]
-                ))
-                
-        except Exception as e:
-            logger.error(f"Dashboard refresh error: {str(e)}")
+        self.executor.submit("dashboard", fetch, self.show_dashboard)
+    
+    def show_dashboard(self, result):
+        queue_metrics, findings_marks, summary = result
+        self.stats_labels["results_queue"].config(text=queue_metrics.get("results", 0))
+        if summary is None:
+            return
+        
+        # Общая статистика
+        self.stats_labels["total_findings"].config(text=summary["total_findings"])
+        self.stats_labels["critical_findings"].config(
+            text=summary["severity_stats"].get("critical", 0)
+        )
+        self.stats_labels["unchecked_findings"].config(text=summary["unchecked_count"])
+        
+        # Распределение по критичности
+        self.severity_tree.delete(*self.severity_tree.get_children())
+        for severity, count in summary["severity_stats"].items():
+            self.severity_tree.insert("", tk.END, text=severity.upper(), values=(count,))
+        
+        # Критические находки
+        self.critical_tree.delete(*self.critical_tree.get_children())
+        for finding in summary["recent_critical"]:
+            self.critical_tree.insert("", tk.END, values=(
+                finding["url"],
+                finding["status_code"],
+                finding["created_at"]
+            ))
+        
+        self.dashboard_marks = findings_marks
+    
+    def findings_filters(self):
+        """Фильтры вкладки находок в аргументах get_findings"""
+        severity = self.severity_filter_var.get()
+        checked = self.checked_filter_var.get()
+        return {
+            "severity": None if severity == "all" else severity,
+            "checked": None if checked == "all" else checked == "checked",
+            "host": self.host_filter_var.get().strip() or None,
+            "task_id": self.task_filter_var.get().strip() or None,
+            "search": self.search_filter_var.get().strip() or None
+        }
     
     def refresh_findings(self):
-        """Обновляет список находок"""
-        try:
-            # Применяем фильтры
-            severity = self.severity_filter_var.get()
-            checked = self.checked_filter_var.get()
-            
-            findings = self.master_core.get_findings()
+        """
+        Обновляет текущую страницу находок. Пока фильтры и страница те же,
+        из БД забираются только находки, добавленные или отмеченные после
+        прошлого обновления, и вливаются в показанную страницу
+        """
+        # Состояние вкладки читается в главном потоке, запросы идут в фоне
+        filters = self.findings_filters()
+        after = self.findings_page_cursors[-1]
+        shown = (self.findings_view, self.findings_marks, dict(self.findings_rows), self.findings_next_cursor)
+        self.executor.submit("findings", lambda: self.fetch_findings_page(filters, after, *shown),
+                             self.show_findings_page)
+    
+    def fetch_findings_page(self, filters: Dict[str, Any], after: Optional[List[str]], view, findings_marks,
+                            rows: Dict[str, Dict[str, Any]], next_cursor) -> Optional[Dict[str, Any]]:
+        """Фоновая часть refresh_findings, None - страница не изменилась"""
+        marks = self.master_core.get_change_marks()
+        if not marks or findings_marks is None or view != (filters, after):
+            return self.load_findings_page(filters, after, marks)
+        if (marks["findings"], marks["checked"]) == findings_marks:
+            return None
+        return self.patch_findings_page(filters, after, marks, findings_marks, rows, next_cursor)
+    
+    def load_findings_page(self, filters: Dict[str, Any], after: Optional[List[str]],
+                           marks: Dict[str, int]) -> Dict[str, Any]:
+        """Загружает страницу находок целиком"""
+        # Все фильтры применяются в БД, загружается только текущая страница
+        page = self.master_core.get_findings_page(after=after, page_size=FINDINGS_PAGE_SIZE,
+                                                  fields=FINDING_LIST_FIELDS, **filters)
+        return self.findings_page_result(filters, after, marks, page["findings"], page["next"])
+    
+    def patch_findings_page(self, filters: Dict[str, Any], after: Optional[List[str]], marks: Dict[str, int],
+                            findings_marks, rows: Dict[str, Dict[str, Any]], next_cursor) -> Dict[str, Any]:
+        """Вливает в показанную страницу находки, добавленные или отмеченные после прошлых отметок"""
+        added_since, checked_since = findings_marks
+        added = self.master_core.get_findings_page(after=after, page_size=FINDINGS_PAGE_SIZE,
+                                                   fields=FINDING_LIST_FIELDS, added_since=added_since,
+                                                   **filters)
+        # Сменившие checked ищутся без фильтра checked: они могли как войти в выборку, так и выйти из нее
+        changed = self.master_core.get_findings_page(after=after, page_size=FINDINGS_PAGE_SIZE,
+                                                     fields=FINDING_LIST_FIELDS, checked_since=checked_since,
+                                                     **dict(filters, checked=None))
+        if added["next"] or changed["next"]:
+            # Изменилось больше страницы - дешевле загрузить ее заново
+            return self.load_findings_page(filters, after, marks)
             
-            # Фильтрация
-            filtered_findings = []
-            for finding in findings:
-                if severity != "all" and finding["severity"] != severity:
-                    continue
-                if checked == "checked" and not finding["checked"]:
-                    continue
-                if checked == "unchecked" and finding["checked"]:
-                    continue
-                filtered_findings.append(finding)
-            
-            # Обновление таблицы
-            self.findings_tree.delete(*self.findings_tree.get_children())
-            for finding in filtered_findings:
-                self.findings_tree.insert("", tk.END, values=(
-                    finding["finding_id"],
-                    finding["url"],
-                    finding["status_code"],
-                    finding["content_length"],
-                    finding["severity"],
-                    "Yes" if finding["checked"] else "No",
-                    finding["created_at"],
-                    finding["task_id"]
-                ))
+        for finding in added["findings"]:
+            rows[finding["finding_id"]] = finding
+        for finding in changed["findings"]:
+            if filters["checked"] is None or bool(finding["checked"]) == filters["checked"]:
+                rows[finding["finding_id"]] = finding
+            else:
+                rows.pop(finding["finding_id"], None)
                 
-        except Exception as e:
-            logger.error(f"Findings refresh error: {str(e)}")
+        ordered = sorted(rows.values(), key=lambda f: (f["created_at"], f["finding_id"]), reverse=True)
+        if len(ordered) < FINDINGS_PAGE_SIZE and next_cursor:
+            # Строки ушли со страницы - ее нужно дополнить следующими
+            return self.load_findings_page(filters, after, marks)
+        if len(ordered) > FINDINGS_PAGE_SIZE:
+            ordered = ordered[:FINDINGS_PAGE_SIZE]
+            next_cursor = [ordered[-1]["created_at"], ordered[-1]["finding_id"]]
+        return self.findings_page_result(filters, after, marks, ordered, next_cursor)
+    
+    def findings_page_result(self, filters: Dict[str, Any], after: Optional[List[str]], marks: Dict[str, int],
+                             findings: List[Dict[str, Any]], next_cursor) -> Dict[str, Any]:
+        return {
+            "view": (filters, after),
+            "marks": (marks["findings"], marks["checked"]) if marks else None,
+            "findings": findings,
+            "next": next_cursor,
+            "total": self.master_core.count_findings(**filters)
+        }
+    
+    def show_findings_page(self, page: Optional[Dict[str, Any]]):
+        """Переносит страницу в таблицу и обновляет навигацию (главный поток)"""
+        if page is None:
+            return
+        filters, after = page["view"]
+        if after != self.findings_page_cursors[-1]:
+            # Пока шел запрос, пользователь перешел на другую страницу
+            return
+        
+        findings = page["findings"]
+        self.findings_rows = {finding["finding_id"]: finding for finding in findings}
+        self.findings_next_cursor = page["next"]
+        self.findings_view = page["view"]
+        self.findings_marks = page["marks"]
+        
+        first = (len(self.findings_page_cursors) - 1) * FINDINGS_PAGE_SIZE
+        if findings:
+            self.findings_page_label.config(text=f"{first + 1}-{first + len(findings)} of {page['total']}")
+        else:
+            self.findings_page_label.config(text=f"0 of {page['total']}")
+        self.findings_prev_button.config(state=tk.NORMAL if len(self.findings_page_cursors) > 1 else tk.DISABLED)
+        self.findings_next_button.config(state=tk.NORMAL if self.findings_next_cursor else tk.DISABLED)
+        
+        yield from self.sync_tree(self.findings_tree, [(finding["finding_id"], (
+            finding["finding_id"],
+            finding["url"],
+            finding["status_code"],
+            finding["content_length"],
+            finding["severity"],
+            finding.get("change_type") or "",
+            "Yes" if finding["checked"] else "No",
+            finding["created_at"],
+            finding["task_id"]
+        )) for finding in findings])
     
     def refresh_workers(self):
         """Обновляет список воркеров"""
-        try:
-            workers = self.master_core.get_workers()
-            
-            self.workers_tree.delete(*self.workers_tree.get_children())
-            for worker_id, info in workers.items():
-                self.workers_tree.insert("", tk.END, values=(
-                    worker_id,
-                    info.get("status", "unknown"),
-                    info.get("hostname", "unknown"),
-                    info.get("threads", 0),
-                    info.get("current_task", ""),
-                    info.get("last_seen", ""),
-                    info.get("tasks_completed", 0)
-                ))
-                
-        except Exception as e:
-            logger.error(f"Workers refresh error: {str(e)}")
+        def fetch():
+            return self.master_core.get_workers(), self.master_core.get_queue_metrics().get("tasks", {})
+            
+        self.executor.submit("workers", fetch, self.show_workers)
+    
+    def show_workers(self, result):
+        workers, queued = result
+        yield from self.sync_tree(self.workers_tree, [(worker_id, (
+            worker_id,
+            info.get("status", "unknown"),
+            info.get("hostname", "unknown"),
+            info.get("threads", 0),
+            info.get("current_task", ""),
+            queued.get(worker_id, 0),
+            info.get("last_seen", ""),
+            info.get("tasks_completed", 0)
+        )) for worker_id, info in workers.items()])
     
     def refresh_tasks(self):
-        """Обновляет список задач"""
-        try:
-            tasks = self.master_core.get_tasks()
-            
-            self.tasks_tree.delete(*self.tasks_tree.get_children())
-            for task in tasks:
-                self.tasks_tree.insert("", tk.END, values=(
-                    task["task_id"],
-                    task["target"],
-                    task["wordlist_name"],
-                    task["status"],
-                    f"{task['progress']}%",
-                    task["findings_count"],
-                    task["created_at"],
-                    task.get("completed_at", "")
-                ))
-                
-        except Exception as e:
-            logger.error(f"Tasks refresh error: {str(e)}")
+        """Обновляет список задач: после первой загрузки - только измененные задачи"""
+        tasks_mark = self.tasks_mark
+        task_rows = dict(self.task_rows)
+        
+        def fetch():
+            marks = self.master_core.get_change_marks()
+            changed = []
+            if marks and tasks_mark is not None and marks["tasks"] != tasks_mark:
+                changed = self.master_core.get_tasks(limit=TASKS_LIMIT, changed_since=tasks_mark)
+            
+            rows = task_rows
+            if not marks or tasks_mark is None or len(changed) == TASKS_LIMIT:
+                # Первая загрузка или изменилось не меньше всей таблицы
+                rows = {task["task_id"]: task for task in self.master_core.get_tasks(limit=TASKS_LIMIT)}
+            for task in changed:
+                rows[task["task_id"]] = task
+            tasks = sorted(rows.values(), key=lambda t: t["created_at"], reverse=True)[:TASKS_LIMIT]
+            return marks.get("tasks"), tasks, self.master_core.get_schedule()
+            
+        self.executor.submit("tasks", fetch, self.show_tasks)
+    
+    def show_tasks(self, result):
+        tasks_mark, tasks, schedule = result
+        self.tasks_mark = tasks_mark
+        self.task_rows = {task["task_id"]: task for task in tasks}
+        
+        yield from self.sync_tree(self.tasks_tree, self.task_tree_rows(tasks))
+        yield from self.show_schedule(schedule)
+    
+    @staticmethod
+    def task_tree_rows(tasks) -> List[Tuple[str, tuple]]:
+        """Строки таблицы задач, от новых к старым"""
+        return [(task["task_id"], (
+            task["task_id"],
+            task["target"],
+            task["wordlist_name"],
+            task["status"],
+            f"{task['progress']}%",
+            task["findings_count"],
+            task["created_at"],
+            task.get("completed_at", "")
+        )) for task in sorted(tasks, key=lambda t: t["created_at"], reverse=True)]
+    
+    def show_schedule(self, schedule: Dict[str, Any]):
+        """Обновляет очередь планировщика и журнал решений"""
+        yield from self.sync_tree(self.schedule_tree, [(task["task_id"], (
+            task["task_id"],
+            task["project"],
+            task["priority"],
+            f"{task['completed_shards']}/{task['total_shards']}" +
+            (f" ({task['targets']} targets)" if task["targets"] else ""),
+            task["running_shards"],
+            task["pending_shards"],
+            task["speculative_shards"],
+            task["pass"],
+            task["wait_seconds"]
+        )) for task in schedule["tasks"]])
+        
+        decisions = []
+        for decision in schedule["decisions"]:
+            decisions.append((f"{decision['time']}:{decision['shard_id']}:{decision['worker_id']}", (
+                time.strftime("%H:%M:%S", time.localtime(decision["time"])),
+                decision["shard_id"],
+                decision["worker_id"],
+                decision["reason"]
+            )))
+        yield from self.sync_tree(self.decisions_tree, decisions)
     
     def apply_findings_filters(self):
-        """Применяет фильтры к находкам"""
+        """Применяет фильтры к находкам и возвращает к первой странице"""
+        self.findings_page_cursors = [None]
         self.refresh_findings()
     
+    def next_findings_page(self):
+        if self.findings_next_cursor:
+            self.findings_page_cursors.append(self.findings_next_cursor)
+            self.refresh_findings()
+    
+    def prev_findings_page(self):
+        if len(self.findings_page_cursors) > 1:
+            self.findings_page_cursors.pop()
+            self.refresh_findings()
+    
     def export_selected_findings(self):
         """Экспортирует выбранные находки"""
         try:
@@ -586,9 +1072,6 @@ class MainWindow:
                                                icon='question')
             format_type = "json" if format_type == "yes" else "csv"
             
-            # В реальной реализации здесь должна быть логика экспорта выбранных записей
-            export_data = self.master_core.export_findings(format_type)
-            
             # Сохраняем в файл
             filename = filedialog.asksaveasfilename(
                 defaultextension=f".{format_type}",
@@ -596,14 +1079,52 @@ class MainWindow:
             )
             
             if filename:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(export_data)
-                
-                messagebox.showinfo("Success", f"Findings exported to {filename}")
+                # iid строки таблицы - finding_id
+                self.export_with_progress(filename, format_type, finding_ids=list(selected))
                 
         except Exception as e:
             messagebox.showerror("Error", f"Export failed: {str(e)}")
     
+    def export_with_progress(self, filename: str, format_type: str, finding_ids: List[str] = None):
+        """Экспорт в фоновом потоке с окном прогресса и отменой"""
+        window = tk.Toplevel(self.root)
+        window.title("Exporting Findings")
+        window.transient(self.root)
+        window.resizable(False, False)
+        
+        progress_var = tk.DoubleVar(value=0)
+        status_var = tk.StringVar(value="Counting findings...")
+        ttk.Label(window, textvariable=status_var).pack(padx=10, pady=(10, 5))
+        ttk.Progressbar(window, variable=progress_var, maximum=100, length=350).pack(padx=10, pady=5)
+        
+        cancelled = threading.Event()
+        ttk.Button(window, text="Cancel", command=cancelled.set).pack(pady=(5, 10))
+        window.protocol("WM_DELETE_WINDOW", cancelled.set)
+        
+        def show_progress(done: int, total: int):
+            progress_var.set(100.0 * done / total if total else 100)
+            status_var.set(f"Exported {done} of {total} findings")
+            
+        def export():
+            return self.master_core.export_findings_to_file(
+                filename, format_type, finding_ids=finding_ids, cancelled=cancelled.is_set,
+                progress=lambda done, total: self.export_executor.call_soon(show_progress, done, total)
+            )
+            
+        def finished(count: int):
+            window.destroy()
+            if cancelled.is_set():
+                self.status_var.set("Export cancelled")
+            else:
+                self.status_var.set(f"Exported {count} findings")
+                messagebox.showinfo("Success", f"{count} findings exported to {filename}")
+                
+        def failed(error: Exception):
+            window.destroy()
+            messagebox.showerror("Error", f"Export failed: {str(error)}")
+            
+        self.export_executor.submit(None, export, finished, failed)
+    
     def mark_selected_checked(self):
         """Отмечает выбранные находки как проверенные"""
         try:
@@ -612,12 +1133,19 @@ class MainWindow:
                 messagebox.showwarning("Warning", "Please select findings to mark")
                 return
             
-            for item in selected:
-                finding_id = self.findings_tree.item(item)["values"][0]
-                self.master_core.mark_finding_checked(finding_id, True)
+            finding_ids = list(selected)
             
-            messagebox.showinfo("Success", f"Marked {len(selected)} findings as checked")
-            self.refresh_findings()
+            def mark():
+                for finding_id in finding_ids:
+                    self.master_core.mark_finding_checked(finding_id, True)
+                    
+            def marked(_):
+                messagebox.showinfo("Success", f"Marked {len(finding_ids)} findings as checked")
+                self.refresh_findings()
+                
+            # Запись не схлопывается с другими заданиями (ключ None)
+            self.executor.submit(None, mark, marked,
+                                 lambda e: messagebox.showerror("Error", f"Marking failed: {str(e)}"))
             
         except Exception as e:
             messagebox.showerror("Error", f"Marking failed: {str(e)}")
@@ -640,6 +1168,90 @@ class MainWindow:
         except Exception as e:
             messagebox.showerror("Error", f"Update failed: {str(e)}")
     
+    def profile_selected_worker(self):
+        """Запускает профилирование выбранного воркера"""
+        selected = self.workers_tree.selection()
+        if not selected:
+            messagebox.showwarning("Warning", "Please select a worker")
+            return
+        
+        self.start_profile(self.workers_tree.item(selected[0])["values"][0])
+    
+    def start_profile(self, target: str):
+        """Запускает профилирование мастера или воркера"""
+        try:
+            kind = self.profile_kind_var.get()
+            duration = self.profile_duration_var.get()
+            
+            profile_id = self.master_core.start_profile(target, kind, duration)
+            messagebox.showinfo("Success", 
+                               f"Started {kind} profile {profile_id} on {target} for {duration}s.\n"
+                               f"It will appear in Profiles when finished.")
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Profiling failed: {str(e)}")
+    
+    def show_profiles(self):
+        """Список загруженных профилей с сохранением в файл"""
+        try:
+            window = tk.Toplevel(self.root)
+            window.title("Profiles")
+            window.geometry("800x400")
+            
+            main_frame = ttk.Frame(window, padding="10")
+            main_frame.pack(fill=tk.BOTH, expand=True)
+            
+            columns = ("profile_id", "source", "kind", "started", "duration", "size")
+            tree = ttk.Treeview(main_frame, columns=columns, show="headings", height=12)
+            for col, text in zip(columns, ("Profile ID", "Source", "Kind", "Started", "Duration (s)", "Size")):
+                tree.heading(col, text=text)
+            tree.pack(fill=tk.BOTH, expand=True)
+            
+            def refresh():
+                for item in tree.get_children():
+                    tree.delete(item)
+                for profile in self.master_core.get_profiles():
+                    tree.insert("", tk.END, values=(
+                        profile["profile_id"],
+                        profile["source"],
+                        profile["kind"] if not profile.get("error") else f"{profile['kind']} (failed)",
+                        time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(profile["started_at"])),
+                        profile["duration"],
+                        f"{profile['size'] / 1024:.1f} KB"
+                    ))
+            
+            def save():
+                selected = tree.selection()
+                if not selected:
+                    messagebox.showwarning("Warning", "Please select a profile", parent=window)
+                    return
+                
+                values = tree.item(selected[0])["values"]
+                profile = next((p for p in self.master_core.get_profiles() if p["profile_id"] == values[0]), None)
+                if not profile:
+                    messagebox.showerror("Error", "Profile has expired", parent=window)
+                    return
+                
+                filename = filedialog.asksaveasfilename(
+                    parent=window,
+                    initialfile=f"{profile['source']}_{profile['profile_id']}{profile['extension']}",
+                    defaultextension=profile["extension"]
+                )
+                if filename and self.master_core.download_profile(profile["profile_id"], filename):
+                    messagebox.showinfo("Success", f"Profile saved to {filename}", parent=window)
+            
+            button_frame = ttk.Frame(main_frame)
+            button_frame.pack(fill=tk.X, pady=5)
+            ttk.Button(button_frame, text="Save As...", command=save).pack(side=tk.LEFT, padx=5)
+            ttk.Button(button_frame, text="Refresh", command=refresh).pack(side=tk.LEFT, padx=5)
+            ttk.Button(button_frame, text="Close", command=window.destroy).pack(side=tk.RIGHT, padx=5)
+            
+            refresh()
+            
+        except Exception as e:
+            logger.error(f"Error showing profiles: {str(e)}")
+            messagebox.showerror("Error", f"Failed to show profiles: {str(e)}")
+    
     def show_finding_details(self, event):
         """Показывает детали находки"""
         try:
@@ -648,8 +1260,13 @@ class MainWindow:
                 return
             
             item = selected[0]
-            values = self.findings_tree.item(item)["values"]
-            finding_id = values[0]
+            finding_id = self.findings_tree.item(item)["values"][0]
+            
+            # Список содержит только отображаемые поля - полная находка загружается по требованию
+            finding = self.master_core.get_finding(finding_id)
+            if finding is None:
+                messagebox.showerror("Error", f"Finding {finding_id} not found")
+                return
             
             # Создаем окно с деталями
             details_window = tk.Toplevel(self.root)
@@ -664,11 +1281,17 @@ class MainWindow:
             info_frame = ttk.LabelFrame(main_frame, text="Finding Information", padding="10")
             info_frame.pack(fill=tk.X, pady=5)
             
-            ttk.Label(info_frame, text=f"URL: {values[1]}").pack(anchor=tk.W)
-            ttk.Label(info_frame, text=f"Status Code: {values[2]}").pack(anchor=tk.W)
-            ttk.Label(info_frame, text=f"Content Length: {values[3]}").pack(anchor=tk.W)
-            ttk.Label(info_frame, text=f"Severity: {values[4]}").pack(anchor=tk.W)
-            ttk.Label(info_frame, text=f"Checked: {values[5]}").pack(anchor=tk.W)
+            ttk.Label(info_frame, text=f"URL: {finding['url']}").pack(anchor=tk.W)
+            ttk.Label(info_frame, text=f"Status Code: {finding['status_code']}").pack(anchor=tk.W)
+            ttk.Label(info_frame, text=f"Content Length: {finding['content_length']} "
+                                       f"({finding['words']} words, {finding['lines']} lines)").pack(anchor=tk.W)
+            ttk.Label(info_frame, text=f"Severity: {finding['severity']}").pack(anchor=tk.W)
+            if finding["change_type"]:
+                ttk.Label(info_frame, text=f"Change Since Last Scan: {finding['change_type']}").pack(anchor=tk.W)
+            ttk.Label(info_frame, text=f"Checked: {'Yes' if finding['checked'] else 'No'}").pack(anchor=tk.W)
+            ttk.Label(info_frame, text=f"Task: {finding['task_id']} ({finding['target']})").pack(anchor=tk.W)
+            for issue in json.loads(finding["detected_issues"] or "[]"):
+                ttk.Label(info_frame, text=f"  • {issue}").pack(anchor=tk.W)
             
             # Детальный просмотр
             details_frame = ttk.LabelFrame(main_frame, text="Raw Response", padding="10")
@@ -678,8 +1301,15 @@ class MainWindow:
             scrollbar = ttk.Scrollbar(details_frame, orient=tk.VERTICAL, command=details_text.yview)
             details_text.configure(yscrollcommand=scrollbar.set)
             
-            # Здесь можно добавить логику для получения полного ответа
-            details_text.insert(tk.END, "Full HTTP response would be displayed here...")
+            # Результат ffuf, сохраненный при разборе
+            raw_response = finding["raw_response"]
+            if raw_response:
+                try:
+                    raw_response = json.dumps(json.loads(raw_response), indent=2, ensure_ascii=False)
+                except ValueError:
+                    pass
+            details_text.insert(tk.END, raw_response or "No response stored for this finding")
+            details_text.configure(state=tk.DISABLED)
             
             details_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
             scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -707,6 +1337,131 @@ class MainWindow:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to mark finding: {str(e)}")
     
+    def show_task_waterfall(self, event):
+        """Показывает водопад задержек стадий выбранной задачи"""
+        try:
+            selection = self.tasks_tree.selection()
+            if not selection:
+                return
+            
+            task_id = self.tasks_tree.item(selection[0])["values"][0]
+            waterfall = self.master_core.get_task_waterfall(task_id)
+            
+            if not waterfall:
+                messagebox.showinfo("Task Latency", f"No trace data for task {task_id}")
+                return
+            
+            window = tk.Toplevel(self.root)
+            window.title(f"Task Latency - {task_id}")
+            window.geometry("1000x600")
+            
+            main_frame = ttk.Frame(window, padding="10")
+            main_frame.pack(fill=tk.BOTH, expand=True)
+            
+            # Водопад: строка на шард, отрезок на стадию
+            label_width, row_height, width = 180, 26, 960
+            height = row_height * len(waterfall) + 60
+            canvas = tk.Canvas(main_frame, width=width, height=min(height, 360), bg="white",
+                               scrollregion=(0, 0, width, height))
+            scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=canvas.yview)
+            canvas.configure(yscrollcommand=scrollbar.set)
+            
+            span = max((seg["offset"] + seg["duration"] for shard in waterfall for seg in shard["segments"]),
+                       default=0) or 1
+            scale = (width - label_width - 20) / span
+            
+            for row, shard in enumerate(waterfall):
+                y = 10 + row * row_height
+                canvas.create_text(5, y + row_height / 2, anchor=tk.W,
+                                   text=f"{shard['shard_id']} ({shard['total']:.2f}s)")
+                for segment in shard["segments"]:
+                    x0 = label_width + segment["offset"] * scale
+                    x1 = max(x0 + 1, x0 + segment["duration"] * scale)
+                    canvas.create_rectangle(x0, y + 4, x1, y + row_height - 4,
+                                            fill=STAGE_COLORS.get(segment["stage"], "gray"), outline="")
+            
+            # Легенда
+            x = label_width
+            y = 20 + len(waterfall) * row_height
+            for stage, color in STAGE_COLORS.items():
+                canvas.create_rectangle(x, y, x + 12, y + 12, fill=color, outline="")
+                canvas.create_text(x + 16, y + 6, anchor=tk.W, text=stage)
+                x += 95
+            
+            canvas.pack(side=tk.TOP, fill=tk.X)
+            
+            # Длительности стадий задачи
+            summary_frame = ttk.LabelFrame(main_frame, text="Stage Durations", padding="10")
+            summary_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+            self._fill_trace_summary(summary_frame, self.master_core.get_trace_summary(task_id))
+            
+            ttk.Button(main_frame, text="Close", command=window.destroy).pack(side=tk.RIGHT, pady=5)
+            
+        except Exception as e:
+            logger.error(f"Error showing task latency: {str(e)}")
+            messagebox.showerror("Error", f"Failed to show task latency: {str(e)}")
+    
+    def show_trace_summary(self):
+        """Показывает p50/p95 длительности стадий по последним задачам"""
+        try:
+            summary = self.master_core.get_trace_summary()
+            
+            window = tk.Toplevel(self.root)
+            window.title("Latency Summary")
+            window.geometry("600x400")
+            
+            main_frame = ttk.Frame(window, padding="10")
+            main_frame.pack(fill=tk.BOTH, expand=True)
+            
+            ttk.Label(main_frame, text=f"Traces: {summary['traces']}").pack(anchor=tk.W)
+            self._fill_trace_summary(main_frame, summary)
+            ttk.Button(main_frame, text="Close", command=window.destroy).pack(side=tk.RIGHT, pady=5)
+            
+        except Exception as e:
+            logger.error(f"Error showing latency summary: {str(e)}")
+            messagebox.showerror("Error", f"Failed to show latency summary: {str(e)}")
+    
+    def _fill_trace_summary(self, parent, summary: dict):
+        """Таблица перцентилей стадий"""
+        columns = ("count", "p50", "p95", "max")
+        tree = ttk.Treeview(parent, columns=columns, height=10)
+        tree.heading("#0", text="Stage")
+        tree.heading("count", text="Count")
+        tree.heading("p50", text="P50 (s)")
+        tree.heading("p95", text="P95 (s)")
+        tree.heading("max", text="Max (s)")
+        
+        for stage, stats in summary.get("stages", {}).items():
+            tree.insert("", tk.END, text=stage, values=(
+                stats["count"], stats["p50"], stats["p95"], stats["max"]
+            ))
+        
+        tree.pack(fill=tk.BOTH, expand=True)
+    
+    def export_trace_summary(self):
+        """Экспортирует сводку задержек стадий"""
+        try:
+            format_type = messagebox.askquestion("Export Format", 
+                                               "Export as JSON?", 
+                                               icon='question')
+            format_type = "json" if format_type == "yes" else "csv"
+            
+            export_data = self.master_core.export_trace_summary(format_type)
+            
+            filename = filedialog.asksaveasfilename(
+                defaultextension=f".{format_type}",
+                filetypes=[(f"{format_type.upper()} files", f"*.{format_type}")]
+            )
+            
+            if filename:
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write(export_data)
+                
+                messagebox.showinfo("Success", f"Latency summary exported to {filename}")
+                
+        except Exception as e:
+            messagebox.showerror("Error", f"Export failed: {str(e)}")
+    
     def select_all_workers(self):
         """Выбирает всех воркеров"""
         for var in self.worker_vars.values():
@@ -729,18 +1484,14 @@ class MainWindow:
                                                icon='question')
             format_type = "json" if format_type == "yes" else "csv"
             
-            export_data = self.master_core.export_findings(format_type)
-            
             filename = filedialog.asksaveasfilename(
                 defaultextension=f".{format_type}",
                 filetypes=[(f"{format_type.upper()} files", f"*.{format_type}")]
             )
             
             if filename:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(export_data)
-                
-                messagebox.showinfo("Success", f"All findings exported to {filename}")
+                # Файл пишется потоково в фоне, окно остается отзывчивым
+                self.export_with_progress(filename, format_type)
                 
         except Exception as e:
             messagebox.showerror("Error", f"Export failed: {str(e)}")
@@ -756,3 +1507,7 @@ class MainWindow:
         except Exception as e:
             logger.error(f"GUI error: {str(e)}")
             self.master_core.stop()
+        finally:
+            self.unsubscribe_events()
+            self.executor.shutdown()
+            self.export_executor.shutdown()
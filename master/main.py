@@ -3,12 +3,13 @@ import argparse
 import logging
 import sys
 import os
+import redis
 
 # Добавляем текущую директорию в путь Python
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from core.master_core import MasterCore
-from cli_controller import CLIController
+from cli_controller import CLIController, watch_remote
 
 def setup_logging(level=logging.INFO):
     """Настройка логирования"""
@@ -27,10 +28,40 @@ def main():
     parser.add_argument('--redis-port', type=int, default=6379, help='Redis port')
     parser.add_argument('--redis-password', help='Redis password')
     parser.add_argument('--db-path', default='ffuf_master.db', help='Database path')
+    parser.add_argument('--task-queue-limit', type=int, default=10,
+                       help='Max shards outstanding on one worker')
+    parser.add_argument('--shard-size', type=int, default=2000,
+                       help='Wordlist lines per task shard')
+    parser.add_argument('--scheduler-prefetch', type=int, default=1,
+                       help='Shards queued on a worker beyond its running slots')
+    parser.add_argument('--speculation-factor', type=float, default=2.0,
+                       help='Re-run a shard on an idle worker after this many task-median durations')
+    parser.add_argument('--no-speculation', action='store_true',
+                       help='Disable speculative re-execution of straggler shards')
+    parser.add_argument('--max-recursion-depth', type=int, default=2,
+                       help='Default depth limit for recursive scans')
+    parser.add_argument('--batch-host-limit', type=int, default=2,
+                       help='Max shards of a batch scan running against one host')
+    parser.add_argument('--scan-cache-ttl', type=int, default=21600,
+                       help='Seconds a cached shard result stays valid for identical rescans (0 disables)')
+    parser.add_argument('--no-baselines', action='store_true',
+                       help='Store every finding of a rescan instead of only changes against the target baseline')
+    parser.add_argument('--results-queue-limit', type=int, default=1000,
+                       help='Results backlog at which workers pause pushing')
+    parser.add_argument('--queue-ttl', type=int, default=86400,
+                       help='TTL in seconds for per-worker queues')
+    parser.add_argument('--runtime', default='async', choices=['async', 'threaded'],
+                       help='Result processing runtime')
+    parser.add_argument('--result-consumers', type=int, default=4,
+                       help='Concurrent result consumers (async runtime)')
+    parser.add_argument('--metrics-port', type=int, default=0,
+                       help='Serve Prometheus metrics on this port (0 disables)')
     parser.add_argument('--log-level', default='INFO', 
                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
                        help='Log level')
     parser.add_argument('--cli', action='store_true', help='Use CLI interface instead of GUI')
+    parser.add_argument('--watch', action='store_true',
+                       help='Only print live events of a running master (Redis pub/sub), do not start a master')
     
     args = parser.parse_args()
     
@@ -38,13 +69,32 @@ def main():
     setup_logging(getattr(logging, args.log_level))
     logger = logging.getLogger(__name__)
     
+    if args.watch:
+        watch_remote(redis.Redis(host=args.redis_host, port=args.redis_port,
+                                 password=args.redis_password, decode_responses=True))
+        return
+    
     try:
         # Конфигурация
         config = {
             "redis_host": args.redis_host,
             "redis_port": args.redis_port,
             "redis_password": args.redis_password,
-            "db_path": args.db_path
+            "db_path": args.db_path,
+            "task_queue_high_water": args.task_queue_limit,
+            "results_high_water": args.results_queue_limit,
+            "queue_ttl": args.queue_ttl,
+            "runtime": args.runtime,
+            "result_consumers": args.result_consumers,
+            "metrics_port": args.metrics_port,
+            "shard_size": args.shard_size,
+            "scheduler_prefetch": args.scheduler_prefetch,
+            "speculation": not args.no_speculation,
+            "speculation_factor": args.speculation_factor,
+            "max_recursion_depth": args.max_recursion_depth,
+            "batch_host_limit": args.batch_host_limit,
+            "scan_cache_ttl": args.scan_cache_ttl,
+            "incremental_rescans": not args.no_baselines
         }
         
         # Создаем мастер core
@@ -1,11 +1,122 @@
 import sqlite3
 import json
+import zlib
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import logging
+from utils import metrics
 
 logger = logging.getLogger(__name__)
 
+DB_WRITE_SECONDS = metrics.histogram(
+    "ffuf_master_db_write_seconds", "Time to write and commit findings", ["operation"]
+)
+FINDINGS_SAVED = metrics.counter("ffuf_master_findings_saved_total", "Findings written to the database")
+
+# Критичность хранится числом: сравнение и фильтрация без строк
+SEVERITY_LEVELS = {
+    "info": 0,
+    "low": 1,
+    "medium": 2,
+    "high": 3,
+    "critical": 4
+}
+SEVERITY_NAMES = {level: name for name, level in SEVERITY_LEVELS.items()}
+
+# Счетчики сводки: (таблица, колонка ключа, тип ключа, выражение ключа для строки {row})
+FINDING_COUNTERS = [
+    ("finding_counts", None, None, None),
+    ("task_finding_counts", "task_id", "TEXT", "{row}.task_id"),
+    # Находка без хоста (URL без схемы) учитывается под host_id 0
+    ("host_finding_counts", "host_id", "INTEGER", "COALESCE({row}.host_id, 0)")
+]
+# Размер кольца последних критических находок для дашборда
+RECENT_CRITICAL_SIZE = 10
+
+# raw_response хранится сжатым zlib со словарем типичных ключей отчета ffuf -
+# короткие JSON без словаря почти не сжимаются. Первый байт - версия словаря
+RAW_RESPONSE_VERSION = 1
+RAW_RESPONSE_ZDICT = (
+    b'"content-type":"application/json","content-type":"text/plain","status":200,"status":403,"status":404,'
+    b'"redirectlocation":"http://","url":"http://'
+    # Ключи в порядке вывода ffuf - ближе к концу словаря совпадения короче
+    b'{"input":{"FUZZ":"'
+    b'"},"position":,"status":30,"length":,"words":,"lines":,"content-type":"text/html",'
+    b'"redirectlocation":"","scraper":{},"duration":,"resultfile":"","url":"https://","host":"'
+)
+
+# Поля находки в прежнем формате -> выражения над finding_rows и справочниками
+FINDING_FIELDS = {
+    "finding_id": "r.finding_id",
+    "task_id": "r.task_id",
+    "url": "COALESCE(h.host, '') || p.path",
+    "status_code": "r.status_code",
+    "content_length": "r.content_length",
+    "words": "r.words",
+    "lines": "r.lines",
+    "severity": """CASE r.severity WHEN 4 THEN 'critical' WHEN 3 THEN 'high' WHEN 2 THEN 'medium'
+                    WHEN 1 THEN 'low' ELSE 'info' END""",
+    "detected_issues": """(SELECT json_group_array(description) FROM (
+        SELECT ic.description FROM finding_issues fi JOIN issue_codes ic ON ic.code = fi.code
+        WHERE fi.finding_row = r.id ORDER BY fi.position
+    ))""",
+    # Сжатый BLOB, распаковывается в _finding_from_row
+    "raw_response": "r.raw_response",
+    "checked": "r.checked",
+    "created_at": "r.created_at",
+    "host": "lower(h.host)",
+    "change_type": "r.change_type",
+    "previous_finding_id": "r.previous_finding_id",
+    "target": "t.target",
+    "wordlist_name": "t.wordlist_name"
+}
+# Поля списков находок (GUI, CLI): без detected_issues и raw_response
+FINDING_LIST_FIELDS = [
+    "finding_id", "task_id", "url", "status_code", "content_length", "severity",
+    "change_type", "checked", "created_at"
+]
+# Неиспользуемые LEFT JOIN по уникальному ключу SQLite исключает из запроса
+FINDING_JOINS = '''
+    LEFT JOIN paths p ON p.path_id = r.path_id
+    LEFT JOIN hosts h ON h.host_id = r.host_id
+    LEFT JOIN tasks t ON t.task_id = r.task_id
+'''
+
+
+def finding_columns(fields: List[str]) -> str:
+    """SELECT-список для выбранных полей находки"""
+    unknown = [field for field in fields if field not in FINDING_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown finding fields: {', '.join(unknown)}")
+    return ', '.join(f'{FINDING_FIELDS[field]} AS {field}' for field in fields)
+
+
+def compress_response(raw_response: Optional[str]) -> Optional[bytes]:
+    if raw_response is None:
+        return None
+    compressor = zlib.compressobj(6, zdict=RAW_RESPONSE_ZDICT)
+    data = compressor.compress(raw_response.encode('utf-8')) + compressor.flush()
+    return bytes([RAW_RESPONSE_VERSION]) + data
+
+
+def decompress_response(data: Optional[bytes]) -> Optional[str]:
+    if data is None:
+        return None
+    decompressor = zlib.decompressobj(zdict=RAW_RESPONSE_ZDICT)
+    return (decompressor.decompress(data[1:]) + decompressor.flush()).decode('utf-8')
+
+
+def split_url(url: str):
+    """URL -> (scheme://host[:port], путь с query); хост и путь хранятся в справочниках"""
+    start = url.find('://')
+    if start < 0:
+        return None, url
+    slash = url.find('/', start + 3)
+    if slash < 0:
+        return url, ''
+    return url[:slash], url[slash:]
+
+
 class DatabaseManager:
     def __init__(self, db_path: str = "ffuf_master.db"):
         self.db_path = db_path
@@ -14,6 +125,9 @@ class DatabaseManager:
     def _init_database(self):
         """Инициализирует таблицы БД"""
         with sqlite3.connect(self.db_path) as conn:
+            # WAL позволяет читать БД из GUI, пока результаты пишутся в фоне
+            conn.execute('PRAGMA journal_mode=WAL')
+            
             # Таблица задач
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS tasks (
@@ -31,25 +145,6 @@ class DatabaseManager:
                 )
             ''')
             
-            # Таблица находок
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS findings (
-                    finding_id TEXT PRIMARY KEY,
-                    task_id TEXT NOT NULL,
-                    url TEXT NOT NULL,
-                    status_code INTEGER NOT NULL,
-                    content_length INTEGER NOT NULL,
-                    words INTEGER NOT NULL,
-                    lines INTEGER NOT NULL,
-                    severity TEXT NOT NULL,
-                    detected_issues TEXT NOT NULL,
-                    raw_response TEXT,
-                    checked BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (task_id) REFERENCES tasks (task_id)
-                )
-            ''')
-            
             # Таблица воркеров
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS workers (
@@ -64,6 +159,48 @@ class DatabaseManager:
                 )
             ''')
             
+            # Трассировки жизненного цикла задач (по шарду или воркеру)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS task_traces (
+                    task_id TEXT NOT NULL,
+                    shard_id TEXT NOT NULL,
+                    worker_id TEXT,
+                    stages TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (task_id, shard_id)
+                )
+            ''')
+            
+            # Базовые линии целей: последнее известное состояние каждого URL для повторных сканирований
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS baselines (
+                    scope TEXT NOT NULL,
+                    url_key TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    status_code INTEGER NOT NULL,
+                    content_length INTEGER NOT NULL,
+                    words INTEGER NOT NULL,
+                    finding_id TEXT NOT NULL,
+                    last_task_id TEXT NOT NULL,
+                    disappeared BOOLEAN DEFAULT FALSE,
+                    first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (scope, url_key)
+                )
+            ''')
+            
+            # Кэш результатов шардов (ключ - хэш цели, словаря, диапазона и опций)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS scan_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    task_id TEXT,
+                    results BLOB NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_scan_cache_expires ON scan_cache (expires_at)')
+            
             # Таблица конфигураций сканирования
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS scan_configs (
@@ -81,16 +218,322 @@ class DatabaseManager:
                 )
             ''')
             
+            # Колонки, добавленные после первой версии схемы
+            self._ensure_column(conn, 'tasks', 'parent_task_id', 'TEXT')
+            self._ensure_column(conn, 'tasks', 'depth', 'INTEGER DEFAULT 0')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_parent ON tasks (parent_task_id)')
+            # Версия строки задачи растет при каждом изменении: клиенты забирают только новее своей отметки
+            self._ensure_column(conn, 'tasks', 'version', 'INTEGER DEFAULT 0')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_version ON tasks (version)')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS tasks_version_insert AFTER INSERT ON tasks
+                BEGIN
+                    UPDATE tasks SET version = (SELECT MAX(version) FROM tasks) + 1 WHERE task_id = NEW.task_id;
+                END
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS tasks_version_update
+                AFTER UPDATE OF status, progress, findings_count, completed_at ON tasks
+                BEGIN
+                    UPDATE tasks SET version = (SELECT MAX(version) FROM tasks) + 1 WHERE task_id = NEW.task_id;
+                END
+            ''')
+            # Находки: хосты, пути и описания проблем вынесены в справочники,
+            # критичность - число, raw_response - сжатый BLOB
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS hosts (
+                    host_id INTEGER PRIMARY KEY,
+                    host TEXT NOT NULL UNIQUE
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS paths (
+                    path_id INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL UNIQUE
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS issue_codes (
+                    code INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL UNIQUE
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS finding_rows (
+                    id INTEGER PRIMARY KEY,
+                    finding_id TEXT NOT NULL UNIQUE,
+                    task_id TEXT NOT NULL,
+                    host_id INTEGER,
+                    path_id INTEGER NOT NULL,
+                    status_code INTEGER NOT NULL,
+                    content_length INTEGER NOT NULL,
+                    words INTEGER NOT NULL,
+                    lines INTEGER NOT NULL,
+                    severity INTEGER NOT NULL,
+                    raw_response BLOB,
+                    checked BOOLEAN DEFAULT FALSE,
+                    change_type TEXT,
+                    previous_finding_id TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (task_id) REFERENCES tasks (task_id),
+                    FOREIGN KEY (host_id) REFERENCES hosts (host_id),
+                    FOREIGN KEY (path_id) REFERENCES paths (path_id)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS finding_issues (
+                    code INTEGER NOT NULL,
+                    finding_row INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    PRIMARY KEY (code, finding_row)
+                ) WITHOUT ROWID
+            ''')
+            # Составные индексы отдают страницу в порядке (created_at, finding_id) без сортировки
+            conn.execute('DROP INDEX IF EXISTS idx_finding_rows_task')
+            conn.execute('DROP INDEX IF EXISTS idx_finding_rows_severity')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_finding_rows_created ON finding_rows (created_at, finding_id)')
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_finding_rows_task_created ON finding_rows (task_id, created_at, finding_id)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_finding_rows_host ON finding_rows (host_id)')
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_finding_rows_severity_created '
+                'ON finding_rows (severity, created_at, finding_id)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_finding_issues_row ON finding_issues (finding_row, position)')
+            # Новые находки отслеживаются по id, изменение отметки checked - по checked_version
+            self._ensure_column(conn, 'finding_rows', 'checked_version', 'INTEGER DEFAULT 0')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_finding_rows_checked_version ON finding_rows (checked_version)')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS finding_rows_checked_version
+                AFTER UPDATE OF checked ON finding_rows WHEN OLD.checked IS NOT NEW.checked
+                BEGIN
+                    UPDATE finding_rows SET checked_version = (SELECT MAX(checked_version) FROM finding_rows) + 1
+                    WHERE id = NEW.id;
+                END
+            ''')
+            self._setup_counters(conn)
+            
+            # Старая таблица findings переносится в новую схему, findings становится представлением
+            legacy = conn.execute(
+                "SELECT type FROM sqlite_master WHERE name = 'findings'"
+            ).fetchone()
+            if legacy and legacy[0] == 'table':
+                self._migrate_findings(conn)
+            view_fields = [field for field in FINDING_FIELDS if field not in ('target', 'wordlist_name')]
+            view_columns = finding_columns(view_fields).replace('AS raw_response', 'AS raw_response_z')
+            conn.execute(f'CREATE VIEW IF NOT EXISTS findings AS SELECT r.id, {view_columns} FROM finding_rows r {FINDING_JOINS}')
+            
             conn.commit()
     
+    def _setup_counters(self, conn):
+        """
+        Счетчики находок по критичности и отметке checked: всего, по задаче и
+        по хосту цели, плюс кольцо recent_critical из RECENT_CRITICAL_SIZE
+        последних записанных критических находок. Новые находки учитывает
+        _insert_findings одним запросом на пачку, изменения и удаление строк -
+        триггеры finding_rows, поэтому чтение сводки не зависит от числа находок
+        """
+        existed = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'finding_counts_update'"
+        ).fetchone()
+        
+        for table, key_column, key_type, _ in FINDING_COUNTERS:
+            key = f'{key_column} {key_type} NOT NULL, ' if key_column else ''
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {key}severity INTEGER NOT NULL,
+                    checked INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY ({key_column + ', ' if key_column else ''}severity, checked)
+                ) WITHOUT ROWID
+            ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS recent_critical (
+                seq INTEGER PRIMARY KEY,
+                finding_row INTEGER NOT NULL
+            )
+        ''')
+        
+        def change(row: str, delta: str) -> str:
+            """Операторы триггера: счетчики строки row (NEW/OLD) меняются на delta"""
+            statements = []
+            for table, key_column, _, key_value in FINDING_COUNTERS:
+                columns = (key_column + ', ' if key_column else '') + 'severity, checked'
+                values = (key_value.format(row=row) + ', ' if key_column else '') + f'{row}.severity, {row}.checked'
+                statements.append(f'''
+                    INSERT INTO {table} ({columns}, count) VALUES ({values}, {delta})
+                    ON CONFLICT ({columns}) DO UPDATE SET count = count + {delta};''')
+            return ''.join(statements)
+        
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS finding_counts_delete AFTER DELETE ON finding_rows
+            BEGIN {change('OLD', '-1')}
+                DELETE FROM recent_critical WHERE finding_row = OLD.id;
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS finding_counts_update
+            AFTER UPDATE OF severity, checked, task_id, host_id ON finding_rows
+            WHEN OLD.severity IS NOT NEW.severity OR OLD.checked IS NOT NEW.checked
+                OR OLD.task_id IS NOT NEW.task_id OR OLD.host_id IS NOT NEW.host_id
+            BEGIN {change('OLD', '-1')} {change('NEW', '1')}
+            END
+        ''')
+        
+        if not existed:
+            # Находки, записанные до появления счетчиков, учитываются один раз
+            for table, _, _, _ in FINDING_COUNTERS:
+                conn.execute(f'DELETE FROM {table}')
+            conn.execute('DELETE FROM recent_critical')
+            last = conn.execute('SELECT MAX(id) FROM finding_rows').fetchone()[0]
+            if last is not None:
+                self._count_findings(conn, 1, last)
+            logger.info("Built finding summary counters")
+    
+    def _count_findings(self, conn, first: int, last: int):
+        """Добавляет в счетчики и кольцо критических находки finding_rows с id от first до last"""
+        for table, key_column, _, key_value in FINDING_COUNTERS:
+            key = key_value.format(row='r') + ', ' if key_column else ''
+            columns = (key_column + ', ' if key_column else '') + 'severity, checked'
+            conn.execute(f'''
+                INSERT INTO {table} ({columns}, count)
+                SELECT {key}r.severity, r.checked, COUNT(*) FROM finding_rows r
+                WHERE r.id BETWEEN ? AND ?
+                GROUP BY {key}r.severity, r.checked
+                ON CONFLICT ({columns}) DO UPDATE SET count = count + excluded.count
+            ''', (first, last))
+        cursor = conn.execute('''
+            INSERT INTO recent_critical (finding_row)
+            SELECT id FROM finding_rows WHERE id BETWEEN ? AND ? AND severity = ?
+            ORDER BY id
+        ''', (first, last, SEVERITY_LEVELS["critical"]))
+        if cursor.rowcount:
+            conn.execute(
+                'DELETE FROM recent_critical WHERE seq <= (SELECT MAX(seq) FROM recent_critical) - ?',
+                (RECENT_CRITICAL_SIZE,)
+            )
+    
+    def _ensure_column(self, conn, table: str, column: str, definition: str):
+        """Добавляет колонку в существующую таблицу, если ее еще нет"""
+        columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+        if column not in columns:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+            logger.info(f"Added column {table}.{column}")
+    
+    def _migrate_findings(self, conn):
+        """Переносит находки из старой таблицы findings (текстовые поля) в finding_rows"""
+        total = conn.execute('SELECT COUNT(*) FROM findings').fetchone()[0]
+        logger.info(f"Migrating {total} findings to normalized storage")
+        conn.row_factory = sqlite3.Row
+        
+        last_rowid = 0
+        while True:
+            rows = conn.execute(
+                'SELECT rowid, * FROM findings WHERE rowid > ? ORDER BY rowid LIMIT 10000', (last_rowid,)
+            ).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1]['rowid']
+            findings = []
+            for row in rows:
+                finding = dict(row)
+                finding['detected_issues'] = json.loads(finding['detected_issues'] or '[]')
+                findings.append(finding)
+            self._insert_findings(conn, findings)
+            
+        conn.row_factory = None
+        conn.execute('DROP TABLE findings')
+        conn.commit()
+        # Освобождаем место, занятое старой таблицей
+        conn.execute('VACUUM')
+        logger.info(f"Migrated {total} findings")
+    
+    def _intern(self, conn, table: str, id_column: str, value_column: str, values) -> Dict[str, int]:
+        """Возвращает id значений справочника, добавляя отсутствующие"""
+        values = list({value for value in values if value is not None})
+        ids = {}
+        if not values:
+            return ids
+        conn.executemany(
+            f'INSERT OR IGNORE INTO {table} ({value_column}) VALUES (?)', [(value,) for value in values]
+        )
+        for start in range(0, len(values), 500):
+            chunk = values[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            ids.update(conn.execute(
+                f'SELECT {value_column}, {id_column} FROM {table} WHERE {value_column} IN ({placeholders})', chunk
+            ).fetchall())
+        return ids
+    
+    def _insert_findings(self, conn, findings: List[Dict[str, Any]]) -> int:
+        """Пишет находки в finding_rows и справочники, возвращает число новых"""
+        urls = [split_url(finding['url']) for finding in findings]
+        host_ids = self._intern(conn, 'hosts', 'host_id', 'host', (host for host, _ in urls))
+        path_ids = self._intern(conn, 'paths', 'path_id', 'path', (path for _, path in urls))
+        codes = self._intern(conn, 'issue_codes', 'code', 'description',
+                             (issue for finding in findings for issue in finding['detected_issues']))
+        
+        cursor = conn.executemany('''
+            INSERT OR IGNORE INTO finding_rows 
+            (finding_id, task_id, host_id, path_id, status_code, content_length, words, lines, 
+             severity, raw_response, checked, change_type, previous_finding_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        ''', [(
+            finding['finding_id'],
+            finding['task_id'],
+            host_ids.get(host),
+            path_ids[path],
+            finding['status_code'],
+            finding['content_length'],
+            finding['words'],
+            finding['lines'],
+            SEVERITY_LEVELS.get(finding['severity'], 0),
+            compress_response(finding.get('raw_response')),
+            bool(finding.get('checked', False)),
+            finding.get('change_type'),
+            finding.get('previous_finding_id'),
+            finding.get('created_at')
+        ) for finding, (host, path) in zip(findings, urls)])
+        inserted = cursor.rowcount
+        if inserted > 0:
+            # Запись держит блокировку БД, поэтому id новых строк идут подряд
+            # и заканчиваются last_insert_rowid()
+            last = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+            self._count_findings(conn, last - inserted + 1, last)
+        
+        row_ids = {}
+        finding_ids = [finding['finding_id'] for finding in findings]
+        for start in range(0, len(finding_ids), 500):
+            chunk = finding_ids[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            row_ids.update(conn.execute(
+                f'SELECT finding_id, id FROM finding_rows WHERE finding_id IN ({placeholders})', chunk
+            ).fetchall())
+        conn.executemany(
+            'INSERT OR IGNORE INTO finding_issues (code, finding_row, position) VALUES (?, ?, ?)',
+            [(codes[issue], row_ids[finding['finding_id']], position)
+             for finding in findings for position, issue in enumerate(finding['detected_issues'])]
+        )
+        return inserted
+    
+    @staticmethod
+    def _finding_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        """Находка в прежнем формате: raw_response (если выбран) распаковывается"""
+        finding = dict(row)
+        if 'raw_response' in finding:
+            finding['raw_response'] = decompress_response(finding['raw_response'])
+        return finding
+    
     def save_task(self, task_data: Dict[str, Any]) -> bool:
         """Сохраняет задачу в БД"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 conn.execute('''
                     INSERT INTO tasks 
-                    (task_id, target, wordlist_name, wordlist_path, options, worker_ids, status)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    (task_id, target, wordlist_name, wordlist_path, options, worker_ids, status,
+                     parent_task_id, depth)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     task_data['task_id'],
                     task_data['target'],
@@ -98,7 +541,9 @@ class DatabaseManager:
                     task_data['wordlist_path'],
                     json.dumps(task_data['options']),
                     json.dumps(task_data['worker_ids']),
-                    'pending'
+                    'pending',
+                    task_data.get('parent_task_id'),
+                    task_data.get('depth', 0)
                 ))
                 conn.commit()
                 return True
@@ -129,70 +574,444 @@ class DatabaseManager:
     def save_finding(self, finding_data: Dict[str, Any]) -> bool:
         """Сохраняет находку в БД"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('''
-                    INSERT INTO findings 
-                    (finding_id, task_id, url, status_code, content_length, words, lines, 
-                     severity, detected_issues, raw_response)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    finding_data['finding_id'],
-                    finding_data['task_id'],
-                    finding_data['url'],
-                    finding_data['status_code'],
-                    finding_data['content_length'],
-                    finding_data['words'],
-                    finding_data['lines'],
-                    finding_data['severity'],
-                    json.dumps(finding_data['detected_issues']),
-                    finding_data.get('raw_response')
-                ))
+            with DB_WRITE_SECONDS.labels("save_finding").time(), sqlite3.connect(self.db_path) as conn:
+                inserted = self._insert_findings(conn, [finding_data])
                 conn.commit()
-                return True
+            FINDINGS_SAVED.inc(inserted)
+            return inserted == 1
         except Exception as e:
             logger.error(f"Failed to save finding: {str(e)}")
             return False
     
-    def get_tasks(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Возвращает список задач"""
+    def save_findings(self, findings: List[Dict[str, Any]]) -> int:
+        """Сохраняет пачку находок одной транзакцией, возвращает число записанных"""
+        if not findings:
+            return 0
+        
+        try:
+            with DB_WRITE_SECONDS.labels("save_findings").time(), sqlite3.connect(self.db_path) as conn:
+                inserted = self._insert_findings(conn, findings)
+                conn.commit()
+            FINDINGS_SAVED.inc(inserted)
+            return inserted
+        except Exception as e:
+            logger.error(f"Failed to save findings batch: {str(e)}")
+            return 0
+    
+    def get_tasks(self, limit: int = 100, changed_since: int = None) -> List[Dict[str, Any]]:
+        """Возвращает список задач, changed_since - только измененные после этой версии"""
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
-            cursor = conn.execute('''
-                SELECT * FROM tasks 
-                ORDER BY created_at DESC 
-                LIMIT ?
-            ''', (limit,))
+            if changed_since is not None:
+                cursor = conn.execute('''
+                    SELECT * FROM tasks
+                    WHERE version > ?
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                ''', (changed_since, limit))
+            else:
+                cursor = conn.execute('''
+                    SELECT * FROM tasks 
+                    ORDER BY created_at DESC 
+                    LIMIT ?
+                ''', (limit,))
             return [dict(row) for row in cursor.fetchall()]
     
-    def get_findings(self, task_id: str = None, checked: bool = None) -> List[Dict[str, Any]]:
-        """Возвращает список находок"""
+    def get_change_marks(self) -> Dict[str, int]:
+        """
+        Отметки изменений (все по индексам): последний id находки, последняя
+        версия отметки checked и последняя версия задачи. Клиент сравнивает
+        их со своими и забирает только изменившееся
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            return {
+                "findings": conn.execute('SELECT COALESCE(MAX(id), 0) FROM finding_rows').fetchone()[0],
+                "checked": conn.execute('SELECT COALESCE(MAX(checked_version), 0) FROM finding_rows').fetchone()[0],
+                "tasks": conn.execute('SELECT COALESCE(MAX(version), 0) FROM tasks').fetchone()[0]
+            }
+    
+    @staticmethod
+    def _finding_conditions(task_id: str = None, checked: bool = None, host: str = None,
+                            severity: str = None, issue_code: int = None,
+                            search: str = None, added_since: int = None,
+                            checked_since: int = None,
+                            finding_ids: List[str] = None) -> Tuple[List[str], List[Any]]:
+        """
+        Условия WHERE фильтров находок, все заданные фильтры объединяются через AND.
+        added_since и checked_since - отметки get_change_marks: только находки,
+        добавленные или сменившие checked после них. finding_ids - только эти находки
+        """
+        conditions = []
+        params = []
+        if finding_ids is not None:
+            conditions.append(f"r.finding_id IN ({', '.join('?' * len(finding_ids))})")
+            params.extend(finding_ids)
+        if added_since is not None:
+            conditions.append('r.id > ?')
+            params.append(added_since)
+        if checked_since is not None:
+            conditions.append('r.checked_version > ?')
+            params.append(checked_since)
+        if task_id is not None:
+            conditions.append('r.task_id = ?')
+            params.append(task_id)
+        if checked is not None:
+            conditions.append('r.checked = ?')
+            params.append(checked)
+        if host is not None:
+            conditions.append('r.host_id IN (SELECT host_id FROM hosts WHERE lower(host) = ?)')
+            params.append(host.rstrip('/').lower())
+        if severity is not None:
+            conditions.append('r.severity = ?')
+            params.append(SEVERITY_LEVELS[severity])
+        if issue_code is not None:
+            conditions.append('r.id IN (SELECT finding_row FROM finding_issues WHERE code = ?)')
+            params.append(issue_code)
+        if search:
+            # Подстрока URL ищется по справочникам путей и хостов, а не по каждой находке
+            pattern = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append(
+                "(r.path_id IN (SELECT path_id FROM paths WHERE path LIKE ? ESCAPE '\\') "
+                "OR r.host_id IN (SELECT host_id FROM hosts WHERE host LIKE ? ESCAPE '\\'))"
+            )
+            params.extend([pattern, pattern])
+        return conditions, params
+    
+    def get_findings(self, task_id: str = None, checked: bool = None,
+                     host: str = None, severity: str = None, issue_code: int = None,
+                     limit: int = None, fields: List[str] = None, search: str = None) -> List[Dict[str, Any]]:
+        """
+        Возвращает список находок (host - scheme://host[:port] цели,
+        issue_code - код из get_issue_codes, search - подстрока URL). fields - выбираемые поля
+        (см. FINDING_FIELDS, FINDING_LIST_FIELDS), по умолчанию все
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            
+            query = f'''
+                SELECT {finding_columns(fields or list(FINDING_FIELDS))}
+                FROM finding_rows r {FINDING_JOINS}
+            '''
+            conditions, params = self._finding_conditions(task_id, checked, host, severity, issue_code, search)
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            
+            query += ' ORDER BY r.created_at DESC, r.finding_id DESC'
+            
+            if limit:
+                query += ' LIMIT ?'
+                params.append(limit)
+            
+            cursor = conn.execute(query, params)
+            return [self._finding_from_row(row) for row in cursor.fetchall()]
+    
+    def get_findings_page(self, after: List[str] = None, page_size: int = 100,
+                          fields: List[str] = None, **filters) -> Dict[str, Any]:
+        """
+        Страница находок с keyset-пагинацией от новых к старым.
+        after - курсор [created_at, finding_id] последней находки предыдущей
+        страницы (None - первая страница), filters - как у get_findings.
+        Возвращает {"findings": [...], "next": курсор следующей страницы или None}
+        """
+        fields = list(fields or FINDING_FIELDS)
+        # Поля курсора нужны всегда, даже если не запрошены
+        selected = fields + [name for name in ('created_at', 'finding_id') if name not in fields]
+        
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             
-            query = '''
-                SELECT f.*, t.target, t.wordlist_name 
-                FROM findings f 
-                LEFT JOIN tasks t ON f.task_id = t.task_id
+            conditions, params = self._finding_conditions(**filters)
+            if after:
+                conditions.append('(r.created_at, r.finding_id) < (?, ?)')
+                params.extend(after)
+            
+            query = f'''
+                SELECT {finding_columns(selected)}
+                FROM finding_rows r {FINDING_JOINS}
             '''
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            # Строка сверх страницы показывает, есть ли следующая
+            query += ' ORDER BY r.created_at DESC, r.finding_id DESC LIMIT ?'
+            params.append(page_size + 1)
+            
+            rows = conn.execute(query, params).fetchall()
+            
+        findings = [self._finding_from_row(row) for row in rows[:page_size]]
+        next_cursor = None
+        if len(rows) > page_size:
+            last = findings[-1]
+            next_cursor = [last['created_at'], last['finding_id']]
+        for finding in findings:
+            for name in selected[len(fields):]:
+                del finding[name]
+        return {"findings": findings, "next": next_cursor}
+    
+    def count_findings(self, **filters) -> int:
+        """
+        Число находок, подходящих под фильтры get_findings. Фильтры по задаче
+        или хосту, критичности и checked считаются по счетчикам сводки
+        """
+        used = {name for name, value in filters.items() if value is not None}
+        if used <= {"task_id", "host", "severity", "checked"} and not {"task_id", "host"} <= used:
+            table, condition, params = self._counter_source(filters.get("task_id"), filters.get("host"))
+            conditions = [condition] if condition else []
+            if "severity" in used:
+                conditions.append('severity = ?')
+                params.append(SEVERITY_LEVELS[filters["severity"]])
+            if "checked" in used:
+                conditions.append('checked = ?')
+                params.append(filters["checked"])
+            query = f'SELECT COALESCE(SUM(count), 0) FROM {table}'
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            with sqlite3.connect(self.db_path) as conn:
+                return conn.execute(query, params).fetchone()[0]
+        
+        with sqlite3.connect(self.db_path) as conn:
+            conditions, params = self._finding_conditions(**filters)
+            query = 'SELECT COUNT(*) FROM finding_rows r'
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            return conn.execute(query, params).fetchone()[0]
+    
+    def get_finding(self, finding_id: str) -> Optional[Dict[str, Any]]:
+        """Возвращает находку со всеми полями, включая raw_response"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(f'''
+                SELECT {finding_columns(list(FINDING_FIELDS))}
+                FROM finding_rows r {FINDING_JOINS}
+                WHERE r.finding_id = ?
+            ''', (finding_id,)).fetchone()
+            return self._finding_from_row(row) if row else None
+    
+    def get_finding_counts(self, task_id: str = None, host: str = None) -> Dict[str, Any]:
+        """
+        Счетчики находок - всего, задачи или хоста цели (scheme://host[:port]):
+        {"severity": {имя: число}, "unchecked": число, "total": число}
+        """
+        table, condition, params = self._counter_source(task_id, host)
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(f'''
+                SELECT severity, checked, SUM(count) FROM {table}
+                {'WHERE ' + condition if condition else ''}
+                GROUP BY severity, checked
+            ''', params).fetchall()
+        
+        counts = {"severity": {}, "unchecked": 0, "total": 0}
+        for severity, checked, count in rows:
+            if not count:
+                continue
+            name = SEVERITY_NAMES.get(severity, "info")
+            counts["severity"][name] = counts["severity"].get(name, 0) + count
+            counts["total"] += count
+            if not checked:
+                counts["unchecked"] += count
+        return counts
+    
+    def get_recent_critical(self, fields: List[str] = None) -> List[Dict[str, Any]]:
+        """Последние критические находки из кольца recent_critical, от новых к старым"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(f'''
+                SELECT {finding_columns(fields or list(FINDING_FIELDS))}
+                FROM recent_critical rc JOIN finding_rows r ON r.id = rc.finding_row {FINDING_JOINS}
+                ORDER BY r.created_at DESC, r.finding_id DESC
+            ''')
+            return [self._finding_from_row(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _counter_source(task_id: str = None, host: str = None) -> Tuple[str, str, List[Any]]:
+        """Таблица счетчиков и условие для задачи, хоста или всех находок"""
+        if task_id is not None:
+            return 'task_finding_counts', 'task_id = ?', [task_id]
+        if host is not None:
+            return ('host_finding_counts', 'host_id IN (SELECT host_id FROM hosts WHERE lower(host) = ?)',
+                    [host.rstrip('/').lower()])
+        return 'finding_counts', '', []
+    
+    def get_issue_codes(self) -> Dict[int, str]:
+        """Справочник проблем: код -> описание"""
+        with sqlite3.connect(self.db_path) as conn:
+            return dict(conn.execute('SELECT code, description FROM issue_codes ORDER BY code').fetchall())
+    
+    def save_task_trace(self, task_id: str, shard_id: str, worker_id: str, stages: Dict[str, float]) -> bool:
+        """Сохраняет отметки стадий задачи"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO task_traces (task_id, shard_id, worker_id, stages)
+                    VALUES (?, ?, ?, ?)
+                ''', (task_id, shard_id, worker_id, json.dumps(stages)))
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Failed to save task trace: {str(e)}")
+            return False
+    
+    def get_task_traces(self, task_id: str = None, limit: int = None) -> List[Dict[str, Any]]:
+        """Возвращает трассировки задачи или последние трассировки всех задач"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            
+            query = 'SELECT * FROM task_traces'
             params = []
             
             if task_id is not None:
-                query += ' WHERE f.task_id = ?'
+                query += ' WHERE task_id = ?'
                 params.append(task_id)
-            elif checked is not None:
-                query += ' WHERE f.checked = ?'
-                params.append(checked)
             
-            query += ' ORDER BY f.created_at DESC'
+            query += ' ORDER BY rowid DESC'
             
-            cursor = conn.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
+            if limit:
+                query += ' LIMIT ?'
+                params.append(limit)
+            
+            traces = []
+            for row in conn.execute(query, params).fetchall():
+                trace = dict(row)
+                trace["stages"] = json.loads(trace["stages"])
+                traces.append(trace)
+            return traces
+    
+    def diff_baseline(self, scope: str, target: str, task_id: str,
+                      entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Сравнивает находки повторного сканирования с базовой линией цели.
+        entries - находки с полем url_key. Неизмененные находки только
+        продлевают базовую линию, остальные возвращаются с change_type и
+        previous_finding_id для сохранения
+        """
+        changes = []
+        with DB_WRITE_SECONDS.labels("diff_baseline").time(), sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            # Сравнение и обновление базовой линии - одна транзакция
+            conn.execute('BEGIN IMMEDIATE')
+            
+            known = {}
+            keys = [entry['url_key'] for entry in entries]
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                for row in conn.execute(
+                    f'SELECT * FROM baselines WHERE scope = ? AND url_key IN ({placeholders})', [scope] + chunk
+                ):
+                    known[row['url_key']] = dict(row)
+            
+            unchanged = []
+            for entry in entries:
+                previous = known.get(entry['url_key'])
+                signature = (entry['status_code'], entry['content_length'], entry['words'])
+                if previous is None:
+                    entry['change_type'] = 'new'
+                elif previous['disappeared']:
+                    entry['change_type'] = 'new'
+                    entry['previous_finding_id'] = previous['finding_id']
+                elif (previous['status_code'], previous['content_length'], previous['words']) != signature:
+                    entry['change_type'] = 'changed'
+                    entry['previous_finding_id'] = previous['finding_id']
+                else:
+                    unchanged.append((task_id, scope, entry['url_key']))
+                    continue
+                changes.append(entry)
+            
+            conn.executemany('''
+                UPDATE baselines SET last_task_id = ?, last_seen = CURRENT_TIMESTAMP
+                WHERE scope = ? AND url_key = ?
+            ''', unchanged)
+            conn.executemany('''
+                INSERT INTO baselines 
+                (scope, url_key, target, status_code, content_length, words, finding_id, last_task_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (scope, url_key) DO UPDATE SET
+                    status_code = excluded.status_code, content_length = excluded.content_length,
+                    words = excluded.words, finding_id = excluded.finding_id,
+                    last_task_id = excluded.last_task_id, disappeared = FALSE,
+                    last_seen = CURRENT_TIMESTAMP
+            ''', [(scope, entry['url_key'], target, entry['status_code'], entry['content_length'],
+                   entry['words'], entry['finding_id'], task_id) for entry in changes])
+            conn.commit()
+        return changes
+    
+    def mark_disappeared(self, scope: str, task_id: str) -> List[Dict[str, Any]]:
+        """
+        Отмечает в базовой линии URL, не найденные завершенным сканированием
+        task_id. Возвращает их последние находки (или данные базовой линии,
+        если находка удалена)
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute('''
+                SELECT b.url_key, b.status_code AS baseline_status, b.content_length AS baseline_length,
+                       b.words AS baseline_words, b.finding_id AS baseline_finding_id, f.*
+                FROM baselines b
+                LEFT JOIN findings f ON f.finding_id = b.finding_id
+                WHERE b.scope = ? AND b.last_task_id != ? AND NOT b.disappeared
+            ''', (scope, task_id)).fetchall()
+            conn.executemany('''
+                UPDATE baselines SET disappeared = TRUE, last_task_id = ?, last_seen = CURRENT_TIMESTAMP
+                WHERE scope = ? AND url_key = ?
+            ''', [(task_id, scope, row['url_key']) for row in rows])
+            conn.commit()
+        
+        previous = []
+        for row in rows:
+            row = dict(row)
+            previous.append({
+                "finding_id": row['baseline_finding_id'],
+                "url": row['url'] or row['url_key'],
+                "host": row['host'],
+                "status_code": row['baseline_status'],
+                "content_length": row['baseline_length'],
+                "words": row['baseline_words'],
+                "lines": row['lines'] or 0,
+                "severity": row['severity'] or 'info'
+            })
+        return previous
+    
+    def get_cached_results(self, cache_keys: List[str], now: float) -> Dict[str, bytes]:
+        """Возвращает неистекшие записи кэша сканирования: ключ -> сжатый отчет"""
+        entries = {}
+        with sqlite3.connect(self.db_path) as conn:
+            # Ограничение SQLite на число параметров запроса
+            for start in range(0, len(cache_keys), 500):
+                chunk = cache_keys[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                rows = conn.execute(
+                    f'SELECT cache_key, results FROM scan_cache WHERE cache_key IN ({placeholders}) AND expires_at > ?',
+                    chunk + [now]
+                ).fetchall()
+                entries.update({key: results for key, results in rows})
+        return entries
+    
+    def save_cached_result(self, cache_key: str, task_id: str, results: bytes, expires_at: float) -> bool:
+        """Сохраняет сжатый отчет шарда в кэш сканирования"""
+        try:
+            with DB_WRITE_SECONDS.labels("save_cached_result").time(), sqlite3.connect(self.db_path) as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO scan_cache (cache_key, task_id, results, expires_at)
+                    VALUES (?, ?, ?, ?)
+                ''', (cache_key, task_id, results, expires_at))
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Failed to save scan cache entry: {str(e)}")
+            return False
+    
+    def delete_expired_cache(self, now: float) -> int:
+        """Удаляет истекшие записи кэша сканирования"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute('DELETE FROM scan_cache WHERE expires_at <= ?', (now,))
+            conn.commit()
+            return cursor.rowcount
     
     def mark_finding_checked(self, finding_id: str, checked: bool = True):
         """Отмечает находку как проверенную"""
         with sqlite3.connect(self.db_path) as conn:
             conn.execute(
-                'UPDATE findings SET checked = ? WHERE finding_id = ?',
+                'UPDATE finding_rows SET checked = ? WHERE finding_id = ?',
                 (checked, finding_id)
             )
             conn.commit()
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Any
+import redis.asyncio as aioredis
+from .worker_core import WorkerCore
+from .task_processor import mark_stage
+
+logger = logging.getLogger(__name__)
+
+class AsyncWorkerCore(WorkerCore):
+    """
+    Asyncio-версия воркера.
+    
+    Вместо трех потоков с опросом Redis работает один event loop:
+    задачи и управляющие команды забираются блокирующим BLPOP без задержек
+    опроса, ffuf запускается через asyncio.create_subprocess_exec, несколько
+    процессов ffuf могут выполняться параллельно (max_concurrent_tasks),
+    а команда cancel_task сразу завершает нужный процесс.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.max_concurrent_tasks = max(1, config.get("max_concurrent_tasks", 1))
+        self.health_interval = config.get("health_interval", 30)
+        self.aredis = None
+        self.aqueue = None
+        self.loop = None
+        self.task_slots = None
+        self.running_tasks = {}
+        self.cancelled_tasks = set()
+        self._main_task = None
+        
+    def start(self):
+        """
+        Запускает воркер и блокируется до его остановки
+        """
+        self.is_running = True
+        logger.info(f"Worker {self.worker_id} started (async runtime)")
+        
+        self._register_worker()
+        self._load_master_capabilities()
+        self._start_metrics()
+        
+        try:
+            asyncio.run(self._run())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.is_running = False
+            self.profiler.stop()
+            self._unregister_worker()
+            self._stop_metrics()
+            logger.info(f"Worker {self.worker_id} stopped")
+            
+    def stop(self):
+        """
+        Останавливает воркер (можно вызывать из loop и из других потоков)
+        """
+        self.is_running = False
+        
+        if self.loop and self._main_task and not self._main_task.done():
+            self.loop.call_soon_threadsafe(self._main_task.cancel)
+            
+    async def _run(self):
+        """
+        Основная корутина воркера
+        """
+        self.loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        self.task_slots = asyncio.Semaphore(self.max_concurrent_tasks)
+        
+        connection = {
+            "host": self.config["redis_host"],
+            "port": self.config["redis_port"],
+            "password": self.config.get("redis_password")
+        }
+        self.aredis = aioredis.Redis(decode_responses=True, **connection)
+        # Очереди передают бинарные кадры, поэтому используют клиент без decode_responses
+        self.aqueue = aioredis.Redis(decode_responses=False, **connection)
+        
+        loops = [
+            asyncio.create_task(self._task_loop_async()),
+            asyncio.create_task(self._control_loop_async()),
+            asyncio.create_task(self._health_loop_async())
+        ]
+        
+        try:
+            await asyncio.gather(*loops)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            pending = loops + list(self.running_tasks.values())
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            
+            await self.aredis.aclose()
+            await self.aqueue.aclose()
+            
+    async def _task_loop_async(self):
+        """
+        Забирает задачи, пока есть свободные слоты
+        """
+        while self.is_running:
+            # Новая задача берется только при свободном слоте - остальные ждут в Redis
+            await self.task_slots.acquire()
+            handed_off = False
+            
+            try:
+                task_data = await self.aqueue.blpop(self.task_queue, timeout=30)
+                if not task_data:
+                    continue
+                    
+                _, raw_task = task_data
+                task = self.codec.decode(raw_task)
+                
+                # None - получен не последний чанк большого сообщения
+                if task is None:
+                    continue
+                    
+                mark_stage(task, "dequeued")
+                task_id = task.get("task_id")
+                logger.info(f"Received task: {task_id} ({task.get('shard_id', 'unsharded')})")
+                
+                # Шарды одной задачи могут выполняться параллельно - ключ по shard_id,
+                # а имя asyncio-задачи хранит task_id для отмены всей задачи
+                self.running_tasks[self._run_key(task)] = asyncio.create_task(self._run_task(task), name=task_id)
+                handed_off = True
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Task loop error: {str(e)}")
+                await asyncio.sleep(5)
+            finally:
+                if not handed_off:
+                    self.task_slots.release()
+                    
+    async def _run_task(self, task: Dict[str, Any]):
+        """
+        Выполняет задачу и отправляет результат мастеру
+        """
+        task_id = task.get("task_id")
+        key = self._run_key(task)
+        
+        try:
+            with self.profiler.profiled():
+                result = await self.task_processor.process_task_async(task)
+        except asyncio.CancelledError:
+            if key not in self.cancelled_tasks or not self.is_running:
+                raise
+            # Отмена по команде мастера - сообщаем ему об этом
+            result = self.task_processor._build_error(task, "cancelled")
+        finally:
+            self.running_tasks.pop(key, None)
+            self.cancelled_tasks.discard(key)
+            self.task_slots.release()
+            
+        try:
+            # Ждем, пока мастер разберет накопившиеся результаты
+            await self._wait_for_results_capacity_async()
+            
+            mark_stage(result, "result_pushed")
+            frames = self.codec.encode(result, self.result_codec)
+            await self.aqueue.rpush(self.result_queue, *frames)
+        except Exception as e:
+            logger.error(f"Failed to push result of task {task_id}: {str(e)}")
+            
+    async def _control_loop_async(self):
+        """
+        Обрабатывает управляющие команды сразу по поступлении
+        """
+        while self.is_running:
+            try:
+                command_data = await self.aqueue.blpop(self.control_queue, timeout=30)
+                if not command_data:
+                    continue
+                    
+                command = self.codec.decode(command_data[1])
+                if command is not None:
+                    self._handle_control_command(command)
+                    
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Control loop error: {str(e)}")
+                await asyncio.sleep(5)
+                
+    async def _health_loop_async(self):
+        """
+        Периодически отправляет health-check
+        """
+        while self.is_running:
+            try:
+                # get_status может запускать проверку ffuf - выполняем вне loop
+                health_data = await asyncio.to_thread(self._build_health_data)
+                await self.aredis.hset("workers:health", self.worker_id, json.dumps(health_data))
+                
+                # Мастер мог перезапуститься с другим набором кодеков
+                self._apply_master_capabilities(await self.aredis.hgetall("master:capabilities"))
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Health loop error: {str(e)}")
+                
+            await asyncio.sleep(self.health_interval)
+            
+    async def _wait_for_results_capacity_async(self):
+        """
+        Приостанавливает отправку, пока очередь результатов выше порога
+        """
+        delay = 0.5
+        
+        while self.is_running:
+            backlog = await self.aqueue.llen(self.result_queue)
+            if backlog < self.results_high_water:
+                break
+                
+            if not self.paused_by_backpressure:
+                logger.warning(f"Results backlog {backlog} >= {self.results_high_water}, pausing result push")
+                self.paused_by_backpressure = True
+                
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.backpressure_max_delay)
+            
+        if self.paused_by_backpressure:
+            logger.info("Results backlog drained, resuming result push")
+            self.paused_by_backpressure = False
+            
+    @staticmethod
+    def _run_key(task: Dict[str, Any]) -> str:
+        return task.get("shard_id") or task.get("task_id")
+        
+    def _running_task_count(self) -> int:
+        return len(self.running_tasks)
+        
+    def _build_health_data(self) -> Dict[str, Any]:
+        """
+        Формирует данные health-check
+        """
+        health_data = super()._build_health_data()
+        health_data["running_tasks"] = list(self.running_tasks)
+        health_data["max_concurrent_tasks"] = self.max_concurrent_tasks
+        return health_data
+        
+    def _handle_control_command(self, command: Dict[str, Any]):
+        """
+        Обрабатывает управляющие команды от мастера
+        """
+        if command.get("type") == "cancel_task":
+            # shard_id отменяет один шард, без него - все шарды задачи
+            task_id = command.get("task_id")
+            shard_id = command.get("shard_id")
+            matching = [key for key, running in self.running_tasks.items()
+                        if key == shard_id or (not shard_id and running.get_name() == task_id)]
+            
+            for key in matching:
+                logger.info(f"Cancelling task {task_id} ({key})")
+                self.cancelled_tasks.add(key)
+                self.running_tasks[key].cancel()
+            if not matching:
+                logger.info(f"Cancel requested for task {task_id}, but it is not running")
+            return
+            
+        super()._handle_control_command(command)
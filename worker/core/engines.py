@@ -0,0 +1,103 @@
+import asyncio
+import time
+import logging
+from typing import Dict, Union
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+ENGINE_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600, 7200)
+
+ENGINE_RUNS = metrics.counter("ffuf_worker_engine_runs_total", "Fuzzing engine runs", ["engine", "status"])
+ENGINE_SECONDS = metrics.histogram(
+    "ffuf_worker_engine_seconds", "Duration of fuzzing engine runs", ["engine"], buckets=ENGINE_BUCKETS
+)
+ENGINE_RESULTS = metrics.counter("ffuf_worker_engine_results_total", "Results reported by engines", ["engine"])
+ENGINE_REQUESTS = metrics.counter("ffuf_worker_requests_total", "HTTP requests sent by engines", ["engine"])
+
+
+def record_run(engine: str, started: float, report: Dict, requests: int = None):
+    """
+    Записывает метрики завершенного запуска движка.
+    requests=None - запросы уже посчитаны движком по ходу работы
+    """
+    ENGINE_SECONDS.labels(engine).observe(time.perf_counter() - started)
+    
+    error = report.get("error")
+    if error:
+        ENGINE_RUNS.labels(engine, "timeout" if error == "timeout" else "error").inc()
+        return
+        
+    ENGINE_RUNS.labels(engine, "ok").inc()
+    ENGINE_RESULTS.labels(engine).inc(len(report.get("results", [])))
+    if requests:
+        ENGINE_REQUESTS.labels(engine).inc(requests)
+
+
+def keyword_wordlists(wordlist: Union[str, Dict[str, str]]) -> Dict[str, str]:
+    """
+    Приводит словарь задачи к виду {ключевое слово: путь}.
+    Путь-строка означает один словарь для ключевого слова FUZZ
+    """
+    if isinstance(wordlist, dict):
+        return wordlist
+    return {"FUZZ": wordlist}
+
+
+def keyspace_size(sizes, mode: str) -> int:
+    """Число комбинаций: clusterbomb - произведение размеров словарей, pitchfork - минимум"""
+    sizes = list(sizes)
+    if not sizes:
+        return 0
+    if mode == "pitchfork":
+        return min(sizes)
+    total = 1
+    for size in sizes:
+        total *= size
+    return total
+
+class FuzzEngine:
+    """
+    Базовый интерфейс движка фаззинга.
+    
+    Движок получает цель с ключевым словом FUZZ, путь к словарю (или
+    {ключевое слово: путь} для нескольких словарей, режим - options["mode"])
+    и опции задачи и возвращает отчет в формате JSON-вывода ffuf
+    ({"results": [...]}) либо {"error": "..."} при ошибке.
+    """
+    
+    name = "base"
+    
+    def run(self, target: str, wordlist: str, options: Dict) -> Dict:
+        """
+        Синхронный запуск (для threaded runtime)
+        """
+        return asyncio.run(self.run_async(target, wordlist, options))
+        
+    async def run_async(self, target: str, wordlist: str, options: Dict) -> Dict:
+        """
+        Асинхронный запуск (для async runtime)
+        """
+        raise NotImplementedError
+        
+    def is_available(self) -> bool:
+        """
+        Проверяет, может ли движок работать на этом воркере
+        """
+        return True
+
+
+def create_engine(name: str, config: Dict = None) -> FuzzEngine:
+    """
+    Создает движок по имени: "ffuf" - внешний бинарник, "native" - встроенный HTTP фаззер
+    """
+    config = config or {}
+    
+    if name == "ffuf":
+        from .ffuf_wrapper import FFufWrapper
+        return FFufWrapper(config.get("ffuf_path", "ffuf"))
+    if name == "native":
+        from .native_fuzzer import NativeFuzzer
+        return NativeFuzzer()
+        
+    raise ValueError(f"Unknown fuzzing engine: {name}")
@@ -1,25 +1,50 @@
+import asyncio
 import subprocess
 import json
 import tempfile
 import os
+import time
 from typing import Dict, List, Optional
 import logging
+from .engines import FuzzEngine, record_run, keyword_wordlists, keyspace_size, ENGINE_RUNS
 
 logger = logging.getLogger(__name__)
 
-class FFufWrapper:
-    def __init__(self):
-        self.ffuf_path = "ffuf"
+# Опции задачи, соответствующие матчерам и фильтрам ffuf
+MATCHER_FLAGS = {
+    "match_codes": "-mc",
+    "match_size": "-ms",
+    "match_words": "-mw",
+    "match_lines": "-ml",
+    "match_regex": "-mr",
+    "filter_codes": "-fc",
+    "filter_size": "-fs",
+    "filter_words": "-fw",
+    "filter_lines": "-fl",
+    "filter_regex": "-fr",
+}
+
+class FFufWrapper(FuzzEngine):
+    name = "ffuf"
+    
+    def __init__(self, ffuf_path: str = "ffuf"):
+        self.ffuf_path = ffuf_path
         
-    def run_ffuf(self, target: str, wordlist: str, options: Dict) -> Dict:
+    def build_command(self, target: str, wordlist: str, options: Dict) -> List[str]:
         """
-        Запускает ffuf с указанными параметрами
+        Собирает командную строку ffuf
         """
         cmd = [self.ffuf_path]
         
         # Базовые параметры
         cmd.extend(["-u", target])
-        cmd.extend(["-w", wordlist])
+        if isinstance(wordlist, dict):
+            # Несколько словарей: -w путь:КЛЮЧЕВОЕ_СЛОВО и режим их сочетания
+            for keyword, path in wordlist.items():
+                cmd.extend(["-w", f"{path}:{keyword}"])
+            cmd.extend(["-mode", options.get("mode", "clusterbomb")])
+        else:
+            cmd.extend(["-w", wordlist])
         
         # Добавляем опции
         if options.get("method"):
@@ -30,21 +55,38 @@ class FFufWrapper:
                 cmd.extend(["-H", header])
         
         if options.get("data"):
-            cmd.extend([("-d", options["data"]))])
+            cmd.extend(["-d", options["data"]])
             
         if options.get("cookies"):
-            cmd.extend([("-b", options["cookies"]))])
+            cmd.extend(["-b", options["cookies"]])
         
         # Критические параметры для JSON вывода
         cmd.extend(["-o", "-", "-of", "json"])
         
         # Управление потоками
         threads = options.get("threads", 10)
-        cmd.extend([("-t", str(threads))])
+        cmd.extend(["-t", str(threads)])
         
         # Rate limiting
         if options.get("rate"):
-            cmd.extend([("-rate", str(options["rate"]))])
+            cmd.extend(["-rate", str(options["rate"])])
+        
+        # Матчеры и фильтры
+        for option, flag in MATCHER_FLAGS.items():
+            value = options.get(option)
+            if value is None or value == "":
+                continue
+            if isinstance(value, (list, tuple)):
+                value = ",".join(str(v) for v in value)
+            cmd.extend([flag, str(value)])
+        
+        return cmd
+    
+    def run_ffuf(self, target: str, wordlist: str, options: Dict) -> Dict:
+        """
+        Запускает ffuf с указанными параметрами
+        """
+        cmd = self.build_command(target, wordlist, options)
         
         logger.info(f"Running ffuf command: {' '.join(cmd)}")
         
@@ -69,6 +111,118 @@ class FFufWrapper:
             logger.error(f"FFuf execution failed: {str(e)}")
             return {"error": str(e)}
     
+    async def run_ffuf_async(self, target: str, wordlist: str, options: Dict) -> Dict:
+        """
+        Асинхронно запускает ffuf, читая stdout/stderr по мере поступления.
+        При отмене корутины процесс ffuf принудительно завершается
+        """
+        cmd = self.build_command(target, wordlist, options)
+        
+        logger.info(f"Running ffuf command: {' '.join(cmd)}")
+        
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except Exception as e:
+            logger.error(f"FFuf execution failed: {str(e)}")
+            return {"error": str(e)}
+        
+        readers = asyncio.gather(self._read_stream(process.stdout), self._read_stream(process.stderr))
+        
+        try:
+            stdout, stderr = await asyncio.wait_for(readers, timeout=options.get("timeout", 7200))
+            returncode = await process.wait()
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            self._kill_process(process)
+            await process.wait()
+            # Забираем исход отмененных читателей, чтобы asyncio не ругался в лог
+            await asyncio.gather(readers, return_exceptions=True)
+            
+            if isinstance(e, asyncio.CancelledError):
+                logger.info("FFuf execution cancelled")
+                raise
+            logger.error("FFuf execution timeout")
+            return {"error": "timeout"}
+        
+        if returncode == 0:
+            return self._parse_ffuf_output(stdout.decode("utf-8", errors="replace"))
+        
+        error = stderr.decode("utf-8", errors="replace")
+        logger.error(f"FFuf error: {error}")
+        return {"error": error}
+    
+    async def _read_stream(self, stream: asyncio.StreamReader) -> bytes:
+        """
+        Читает поток процесса блоками до EOF
+        """
+        chunks = []
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+    
+    def _kill_process(self, process):
+        """
+        Завершает процесс ffuf, если он еще работает
+        """
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+    
+    def run(self, target: str, wordlist: str, options: Dict) -> Dict:
+        started = time.perf_counter()
+        report = self.run_ffuf(target, wordlist, options)
+        requests = self._count_words(wordlist, report, options.get("mode", "clusterbomb"))
+        record_run(self.name, started, report, requests)
+        return report
+    
+    async def run_async(self, target: str, wordlist: str, options: Dict) -> Dict:
+        started = time.perf_counter()
+        try:
+            report = await self.run_ffuf_async(target, wordlist, options)
+        except asyncio.CancelledError:
+            ENGINE_RUNS.labels(self.name, "cancelled").inc()
+            raise
+        requests = self._count_words(wordlist, report, options.get("mode", "clusterbomb"))
+        record_run(self.name, started, report, requests)
+        return report
+    
+    def _count_words(self, wordlist, report: Dict, mode: str = "clusterbomb") -> int:
+        """
+        Число запросов ffuf равно числу строк словаря (числу комбинаций
+        для нескольких словарей) - ffuf не пишет его в JSON отчет
+        """
+        if report.get("error"):
+            return 0
+        
+        try:
+            sizes = []
+            for path in keyword_wordlists(wordlist).values():
+                count = 0
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        count += block.count(b"\n")
+                sizes.append(count)
+            return keyspace_size(sizes, mode)
+        except OSError:
+            return 0
+    
+    def is_available(self) -> bool:
+        """
+        Проверяет наличие бинарника ffuf
+        """
+        try:
+            return subprocess.run([self.ffuf_path, "-h"], capture_output=True).returncode == 0
+        except Exception:
+            return False
+    
     def _parse_ffuf_output(self, output: str) -> Dict:
         """
         Парсит JSON вывод ffuf
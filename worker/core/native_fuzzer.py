@@ -0,0 +1,438 @@
+import asyncio
+import itertools
+import re
+import ssl
+import time
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit, urljoin
+from .engines import FuzzEngine, record_run, keyword_wordlists, ENGINE_RUNS, ENGINE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Fuzz Faster U Fool v2.1.0-native"
+
+# Матчер ffuf по умолчанию: -mc 200-299,301,302,307,401,403,405,500
+DEFAULT_MATCH_CODES = "200-299,301,302,307,401,403,405,500"
+
+class HTTPResponse:
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes, keep_alive: bool):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.keep_alive = keep_alive
+
+
+class ResponseMatcher:
+    """
+    Матчеры и фильтры с семантикой ffuf: ответ попадает в результаты,
+    если совпал хотя бы с одним матчером и ни с одним фильтром
+    """
+    
+    def __init__(self, options: Dict):
+        self.match_codes = self._parse_ranges(options.get("match_codes", DEFAULT_MATCH_CODES))
+        self.match_size = self._parse_ranges(options.get("match_size"))
+        self.match_words = self._parse_ranges(options.get("match_words"))
+        self.match_lines = self._parse_ranges(options.get("match_lines"))
+        self.match_regex = self._compile(options.get("match_regex"))
+        
+        self.filter_codes = self._parse_ranges(options.get("filter_codes"))
+        self.filter_size = self._parse_ranges(options.get("filter_size"))
+        self.filter_words = self._parse_ranges(options.get("filter_words"))
+        self.filter_lines = self._parse_ranges(options.get("filter_lines"))
+        self.filter_regex = self._compile(options.get("filter_regex"))
+        
+    def matches(self, status: int, length: int, words: int, lines: int, body: bytes) -> bool:
+        """Проверяет, должен ли ответ попасть в результаты"""
+        matched = (
+            self._in(self.match_codes, status) or
+            self._in(self.match_size, length) or
+            self._in(self.match_words, words) or
+            self._in(self.match_lines, lines) or
+            (self.match_regex is not None and self.match_regex.search(body) is not None)
+        )
+        if not matched:
+            return False
+            
+        filtered = (
+            self._in(self.filter_codes, status) or
+            self._in(self.filter_size, length) or
+            self._in(self.filter_words, words) or
+            self._in(self.filter_lines, lines) or
+            (self.filter_regex is not None and self.filter_regex.search(body) is not None)
+        )
+        return not filtered
+        
+    @staticmethod
+    def _in(ranges: Optional[List[Tuple[int, int]]], value: int) -> bool:
+        if ranges is None:
+            return False
+        return any(low <= value <= high for low, high in ranges)
+        
+    @staticmethod
+    def _parse_ranges(spec) -> Optional[List[Tuple[int, int]]]:
+        """Разбирает "200,301-399" или список чисел; "all" - любое значение"""
+        if spec is None or spec == "":
+            return None
+        if isinstance(spec, (list, tuple)):
+            spec = ",".join(str(item) for item in spec)
+            
+        ranges = []
+        for part in str(spec).split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if part == "all":
+                ranges.append((0, 2 ** 63))
+            elif "-" in part:
+                low, high = part.split("-", 1)
+                ranges.append((int(low), int(high)))
+            else:
+                ranges.append((int(part), int(part)))
+        return ranges
+        
+    @staticmethod
+    def _compile(pattern: Optional[str]):
+        if not pattern:
+            return None
+        return re.compile(pattern.encode("utf-8"))
+
+
+class ConnectionPool:
+    """
+    Пул keep-alive соединений с ограничением параллельных запросов на хост
+    """
+    
+    def __init__(self, max_per_host: int, request_timeout: float, tls_verify: bool = False):
+        self.max_per_host = max_per_host
+        self.request_timeout = request_timeout
+        self.idle = {}
+        self.limits = {}
+        self.ssl_context = ssl.create_default_context()
+        if not tls_verify:
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+            
+    def limit(self, key: Tuple[str, str, int]) -> asyncio.Semaphore:
+        """Семафор, ограничивающий число одновременных запросов к хосту"""
+        if key not in self.limits:
+            self.limits[key] = asyncio.Semaphore(self.max_per_host)
+        return self.limits[key]
+        
+    async def acquire(self, key: Tuple[str, str, int]):
+        """Берет свободное соединение из пула или открывает новое"""
+        idle = self.idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+            
+        scheme, host, port = key
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=self.ssl_context if scheme == "https" else None),
+            timeout=self.request_timeout
+        )
+        return reader, writer, False
+        
+    def release(self, key: Tuple[str, str, int], reader, writer, reusable: bool):
+        """Возвращает соединение в пул или закрывает его"""
+        if reusable and not writer.is_closing():
+            self.idle.setdefault(key, deque()).append((reader, writer))
+        else:
+            writer.close()
+            
+    def close(self):
+        """Закрывает все соединения пула"""
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle.clear()
+
+
+class NativeFuzzer(FuzzEngine):
+    """
+    Встроенный асинхронный HTTP фаззер - альтернатива бинарнику ffuf.
+    
+    Не требует запуска процесса и разбора вывода: запросы отправляются через пул
+    keep-alive соединений HTTP/1.1, число параллельных запросов к одному хосту
+    ограничено, матчеры/фильтры совместимы с ffuf, результат имеет формат
+    JSON-отчета ffuf.
+    """
+    
+    name = "native"
+    
+    async def run_async(self, target: str, wordlist: str, options: Dict) -> Dict:
+        """
+        Выполняет фаззинг цели по словарю
+        """
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        
+        try:
+            results, stats = await asyncio.wait_for(
+                self._fuzz(target, wordlist, options),
+                timeout=options.get("timeout", 7200)
+            )
+        except asyncio.TimeoutError:
+            logger.error("Native fuzzer timeout")
+            record_run(self.name, started, {"error": "timeout"})
+            return {"error": "timeout"}
+        except asyncio.CancelledError:
+            ENGINE_RUNS.labels(self.name, "cancelled").inc()
+            raise
+        except OSError as e:
+            logger.error(f"Native fuzzer failed: {str(e)}")
+            record_run(self.name, started, {"error": str(e)})
+            return {"error": str(e)}
+            
+        logger.info(
+            f"Native fuzzer finished: {stats['requests']} requests, "
+            f"{stats['errors']} errors, {len(results)} results"
+        )
+        
+        report = {
+            "commandline": f"native -u {target} " + " ".join(
+                f"-w {path}:{keyword}" for keyword, path in keyword_wordlists(wordlist).items()),
+            "time": started_at.isoformat(),
+            "results": results,
+            "config": {
+                "url": target,
+                "method": options.get("method", "GET"),
+                "threads": options.get("threads", 10),
+                "engine": self.name,
+                "requests": stats["requests"],
+                "errors": stats["errors"]
+            }
+        }
+        # Запросы считаются по ходу фаззинга, здесь только длительность и результаты
+        record_run(self.name, started, report)
+        return report
+        
+    async def _fuzz(self, target: str, wordlist: str, options: Dict):
+        """Раздает слова словаря пулу корутин-исполнителей"""
+        threads = max(1, int(options.get("threads", 10)))
+        pool = ConnectionPool(
+            max_per_host=max(1, int(options.get("max_per_host", threads))),
+            request_timeout=options.get("request_timeout", 10),
+            tls_verify=options.get("tls_verify", False)
+        )
+        matcher = ResponseMatcher(options)
+        rate = options.get("rate")
+        interval = 1.0 / float(rate) if rate else 0
+        throttle = {"next": time.monotonic()}
+        
+        results = []
+        stats = {"requests": 0, "errors": 0}
+        requests_metric = ENGINE_REQUESTS.labels(self.name)
+        
+        inputs = self._iter_inputs(wordlist, options.get("mode", "clusterbomb"))
+        try:
+            words = enumerate(inputs, 1)
+            
+            async def runner():
+                # Итератор общий для всех исполнителей - словарь не грузится в память целиком
+                for position, word in words:
+                    if interval:
+                        now = time.monotonic()
+                        wait = throttle["next"] - now
+                        throttle["next"] = max(now, throttle["next"]) + interval
+                        if wait > 0:
+                            await asyncio.sleep(wait)
+                            
+                    stats["requests"] += 1
+                    requests_metric.inc()
+                    try:
+                        result = await self._fuzz_one(pool, matcher, target, word, position, options)
+                    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                        stats["errors"] += 1
+                        logger.debug(f"Request for '{word}' failed: {str(e)}")
+                        continue
+                        
+                    if result:
+                        results.append(result)
+                        
+            await asyncio.gather(*(runner() for _ in range(threads)))
+        finally:
+            pool.close()
+            inputs.close()
+            
+        results.sort(key=lambda item: item["position"])
+        return results, stats
+        
+    def _iter_inputs(self, wordlist, mode: str):
+        """
+        Генерирует подстановки {ключевое слово: значение}. В режиме clusterbomb
+        первый словарь читается потоком, остальные загружаются в память;
+        pitchfork берет строки всех словарей параллельно
+        """
+        wordlists = keyword_wordlists(wordlist)
+        files = [open(path, "r", encoding="utf-8", errors="replace") for path in wordlists.values()]
+        try:
+            streams = [(line.rstrip("\r\n") for line in f) for f in files]
+            if mode == "clusterbomb" and len(streams) > 1:
+                rest = [list(stream) for stream in streams[1:]]
+                combinations = ((value,) + tail for value in streams[0] for tail in itertools.product(*rest))
+            else:
+                combinations = zip(*streams)
+                
+            keywords = list(wordlists)
+            for values in combinations:
+                yield dict(zip(keywords, values))
+        finally:
+            for f in files:
+                f.close()
+                
+    @staticmethod
+    def _substitute(text: str, word: Dict[str, str]) -> str:
+        for keyword, value in word.items():
+            text = text.replace(keyword, value)
+        return text
+        
+    async def _fuzz_one(self, pool: ConnectionPool, matcher: ResponseMatcher, target: str,
+                        word: Dict[str, str], position: int, options: Dict) -> Optional[Dict[str, Any]]:
+        """Отправляет один запрос и проверяет ответ матчерами"""
+        url = self._substitute(target, word)
+        method = options.get("method") or "GET"
+        
+        headers = {}
+        for header in options.get("headers", []):
+            name, _, value = self._substitute(header, word).partition(":")
+            headers[name.strip()] = value.strip()
+        if options.get("cookies"):
+            headers["Cookie"] = self._substitute(options["cookies"], word)
+            
+        body = None
+        if options.get("data"):
+            body = self._substitute(options["data"], word).encode("utf-8")
+            
+        started = time.monotonic()
+        response = await self._request(pool, method, url, headers, body)
+        duration = int((time.monotonic() - started) * 1e9)
+        
+        length = len(response.body)
+        text = response.body.decode("utf-8", errors="replace")
+        words_count = len(text.split(" "))
+        lines_count = len(text.split("\n"))
+        
+        if not matcher.matches(response.status, length, words_count, lines_count, response.body):
+            return None
+            
+        location = response.headers.get("location", "")
+        return {
+            "input": word,
+            "position": position,
+            "status": response.status,
+            "length": length,
+            "words": words_count,
+            "lines": lines_count,
+            "content-type": response.headers.get("content-type", ""),
+            "redirectlocation": urljoin(url, location) if location else "",
+            "scraper": {},
+            "duration": duration,
+            "resultfile": "",
+            "url": url,
+            "host": urlsplit(url).netloc
+        }
+        
+    async def _request(self, pool: ConnectionPool, method: str, url: str,
+                       headers: Dict[str, str], body: Optional[bytes]) -> HTTPResponse:
+        """Выполняет HTTP/1.1 запрос через пул соединений"""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported scheme: {scheme}")
+            
+        host = parts.hostname
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, host, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+            
+        request_headers = {
+            "Host": parts.netloc,
+            "User-Agent": USER_AGENT,
+            "Accept": "*/*",
+            "Connection": "keep-alive"
+        }
+        request_headers.update(headers)
+        if body is not None:
+            request_headers["Content-Length"] = str(len(body))
+            
+        request = f"{method} {path} HTTP/1.1\r\n"
+        request += "".join(f"{name}: {value}\r\n" for name, value in request_headers.items())
+        payload = (request + "\r\n").encode("latin-1") + (body or b"")
+        
+        async with pool.limit(key):
+            for attempt in range(2):
+                reader, writer, reused = await pool.acquire(key)
+                try:
+                    writer.write(payload)
+                    await writer.drain()
+                    response = await asyncio.wait_for(
+                        self._read_response(reader, method),
+                        timeout=pool.request_timeout
+                    )
+                except (OSError, asyncio.IncompleteReadError):
+                    writer.close()
+                    # Сервер закрыл простаивавшее keep-alive соединение - повторяем на новом
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                    
+                pool.release(key, reader, writer, response.keep_alive)
+                return response
+                
+    async def _read_response(self, reader: asyncio.StreamReader, method: str) -> HTTPResponse:
+        """Читает и разбирает HTTP ответ"""
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b"", None)
+            
+        version, status = status_line.decode("latin-1").split(" ", 2)[:2]
+        status = int(status)
+        
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+            
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" and (version != "HTTP/1.0" or connection == "keep-alive")
+        
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            body = b""
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            body = await self._read_chunked(reader)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            # Длина не указана - тело до закрытия соединения
+            body = await reader.read()
+            keep_alive = False
+            
+        return HTTPResponse(status, headers, body, keep_alive)
+        
+    async def _read_chunked(self, reader: asyncio.StreamReader) -> bytes:
+        """Читает тело с Transfer-Encoding: chunked"""
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                # Пропускаем trailer-заголовки
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        return b"".join(chunks)
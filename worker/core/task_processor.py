@@ -1,15 +1,36 @@
+import asyncio
 import json
+import os
+import tempfile
 import time
 import logging
-from typing import Dict, Any
-from .ffuf_wrapper import FFufWrapper
+from typing import Dict, Any, Union
+from .engines import FuzzEngine, create_engine
+from utils import metrics
 
 logger = logging.getLogger(__name__)
 
+TASKS_PROCESSED = metrics.counter("ffuf_worker_tasks_total", "Tasks processed by the worker", ["status"])
+
+
+def mark_stage(message: Dict[str, Any], stage: str):
+    """
+    Ставит отметку стадии в трассировку сообщения (см. master/core/tracing.py)
+    """
+    trace = message.get("trace")
+    if trace is not None:
+        trace[stage] = time.time()
+
 class TaskProcessor:
-    def __init__(self):
-        self.ffuf = FFufWrapper()
+    def __init__(self, config: Dict[str, Any] = None):
+        self.config = config or {}
+        self.default_engine = self.config.get("engine", "ffuf")
+        self.ffuf = create_engine("ffuf", self.config)
+        self.engines = {"ffuf": self.ffuf}
         self.current_task = None
+        # Результат проверки ffuf кэшируется, чтобы не запускать процесс на каждый health-check
+        self._ffuf_available = None
+        self._ffuf_checked_at = 0
         
     def process_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -22,33 +43,249 @@ class TaskProcessor:
         
         try:
             # Выполняем фаззинг
-            result = self.ffuf.run_ffuf(
-                target=task_data["target"],
-                wordlist=task_data["wordlist_path"],
-                options=task_data.get("options", {})
-            )
+            engine = self._get_engine(task_data)
+            wordlist = self._prepare_wordlist(task_data)
+            try:
+                mark_stage(task_data, "ffuf_start")
+                result = engine.run(
+                    target=task_data["target"],
+                    wordlist=wordlist,
+                    options=self._run_options(task_data)
+                )
+                mark_stage(task_data, "ffuf_end")
+            finally:
+                self._cleanup_wordlist(task_data, wordlist)
+            
+            return self._build_response(task_data, result)
             
-            # Формируем ответ
-            response = {
-                "task_id": task_id,
-                "worker_id": task_data.get("worker_id"),
-                "status": "completed",
-                "results": result,
-                "timestamp": time.time(),
-                "error": result.get("error")
-            }
+        except Exception as e:
+            logger.error(f"Task processing failed: {str(e)}")
+            return self._build_error(task_data, str(e))
+    
+    async def process_task_async(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Асинхронно обрабатывает задачу от мастера
+        """
+        self.current_task = task_data
+        task_id = task_data.get("task_id")
+        
+        logger.info(f"Processing task {task_id}")
+        
+        try:
+            engine = self._get_engine(task_data)
+            wordlist = await asyncio.to_thread(self._prepare_wordlist, task_data)
+            try:
+                mark_stage(task_data, "ffuf_start")
+                result = await engine.run_async(
+                    target=task_data["target"],
+                    wordlist=wordlist,
+                    options=self._run_options(task_data)
+                )
+                mark_stage(task_data, "ffuf_end")
+            finally:
+                self._cleanup_wordlist(task_data, wordlist)
             
-            return response
+            return self._build_response(task_data, result)
             
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Task processing failed: {str(e)}")
-            return {
-                "task_id": task_id,
-                "worker_id": task_data.get("worker_id"),
-                "status": "failed",
-                "error": str(e),
-                "timestamp": time.time()
-            }
+            return self._build_error(task_data, str(e))
+    
+    def _prepare_wordlist(self, task_data: Dict[str, Any]) -> Union[str, Dict[str, str]]:
+        """
+        Возвращает путь к словарю шарда или {ключевое слово: путь} для задачи
+        с несколькими словарями. Для шарда с wordlist_range его диапазон строк
+        копируется во временный файл (чтение начинается с переданного мастером
+        байтового смещения). Для шарда с combination_range комбинации диапазона
+        выписываются построчно в файлы ключевых слов и перебираются в режиме pitchfork
+        """
+        wordlists = task_data.get("wordlists")
+        if wordlists and len(wordlists) > 1:
+            if task_data.get("combination_range"):
+                return self._combination_wordlists(task_data)
+            return dict(wordlists)
+        
+        wordlist_range = task_data.get("wordlist_range")
+        if not wordlist_range:
+            return task_data["wordlist_path"]
+        
+        start, end = wordlist_range
+        fd, path = tempfile.mkstemp(prefix="shard_", suffix=".txt")
+        
+        try:
+            with open(task_data["wordlist_path"], 'rb') as source, os.fdopen(fd, 'wb') as shard:
+                offset = task_data.get("wordlist_offset")
+                if offset is not None:
+                    source.seek(offset)
+                    skip = 0
+                else:
+                    skip = start
+                
+                for number, line in enumerate(source):
+                    if number < skip:
+                        continue
+                    if number >= skip + (end - start):
+                        break
+                    shard.write(line)
+        except Exception:
+            os.unlink(path)
+            raise
+        
+        return path
+    
+    def _combination_wordlists(self, task_data: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Выписывает комбинации [start, end) в файлы ключевых слов.
+        Номер комбинации clusterbomb - число в смешанной системе счисления
+        (последнее ключевое слово меняется быстрее всех), pitchfork - номер строки
+        """
+        keywords = list(task_data["wordlists"])
+        sizes = [task_data["keyword_sizes"][keyword] for keyword in keywords]
+        start, end = task_data["combination_range"]
+        pitchfork = task_data.get("options", {}).get("mode") == "pitchfork"
+        
+        first = [start] * len(keywords) if pitchfork else self._digits(start, sizes)
+        last = [end - 1] * len(keywords) if pitchfork else self._digits(end - 1, sizes)
+        
+        # Из каждого словаря читаются только строки, встречающиеся в диапазоне
+        values = []
+        for i, keyword in enumerate(keywords):
+            if pitchfork or first[:i] == last[:i]:
+                low, high = first[i], last[i]
+            else:
+                low, high = 0, sizes[i] - 1
+            values.append((low, self._read_lines(task_data["wordlists"][keyword], low, high)))
+        
+        paths = {}
+        files = []
+        try:
+            for keyword in keywords:
+                fd, path = tempfile.mkstemp(prefix=f"shard_{keyword}_", suffix=".txt")
+                paths[keyword] = path
+                files.append(os.fdopen(fd, 'wb'))
+            
+            digits = first
+            for _ in range(end - start):
+                for f, digit, (low, lines) in zip(files, digits, values):
+                    f.write(lines[digit - low])
+                    f.write(b"\n")
+                if pitchfork:
+                    digits = [digit + 1 for digit in digits]
+                else:
+                    self._increment(digits, sizes)
+        except Exception:
+            for f in files:
+                f.close()
+            for path in paths.values():
+                os.unlink(path)
+            raise
+        
+        for f in files:
+            f.close()
+        return paths
+    
+    @staticmethod
+    def _digits(number: int, sizes) -> list:
+        digits = []
+        for size in reversed(sizes):
+            number, digit = divmod(number, size)
+            digits.append(digit)
+        return digits[::-1]
+    
+    @staticmethod
+    def _increment(digits: list, sizes):
+        for i in range(len(digits) - 1, -1, -1):
+            digits[i] += 1
+            if digits[i] < sizes[i]:
+                return
+            digits[i] = 0
+    
+    @staticmethod
+    def _read_lines(path: str, low: int, high: int) -> list:
+        """Строки словаря с номерами low..high включительно"""
+        lines = []
+        with open(path, 'rb') as f:
+            for number, line in enumerate(f):
+                if number > high:
+                    break
+                if number >= low:
+                    lines.append(line.rstrip(b"\r\n"))
+        return lines
+    
+    def _run_options(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Опции запуска движка: комбинации шарда уже выписаны построчно,
+        поэтому словари ключевых слов перебираются параллельно
+        """
+        options = task_data.get("options", {})
+        if task_data.get("combination_range"):
+            return dict(options, mode="pitchfork")
+        return options
+    
+    def _cleanup_wordlist(self, task_data: Dict[str, Any], wordlist):
+        """
+        Удаляет временные словари шарда
+        """
+        originals = set((task_data.get("wordlists") or {}).values())
+        originals.add(task_data.get("wordlist_path"))
+        paths = wordlist.values() if isinstance(wordlist, dict) else [wordlist]
+        for path in paths:
+            if path in originals:
+                continue
+            try:
+                os.unlink(path)
+            except OSError as e:
+                logger.warning(f"Failed to remove shard wordlist {path}: {str(e)}")
+    
+    def _get_engine(self, task_data: Dict[str, Any]) -> FuzzEngine:
+        """
+        Возвращает движок, указанный в опциях задачи, или движок воркера по умолчанию
+        """
+        name = task_data.get("options", {}).get("engine") or self.default_engine
+        if name not in self.engines:
+            self.engines[name] = create_engine(name, self.config)
+        return self.engines[name]
+    
+    def _build_response(self, task_data: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Формирует ответ мастеру
+        """
+        TASKS_PROCESSED.labels("completed").inc()
+        return self._with_trace(task_data, {
+            "task_id": task_data.get("task_id"),
+            "worker_id": task_data.get("worker_id"),
+            "status": "completed",
+            # Цель шарда (у пакетной задачи она своя у каждого шарда) - для базовой линии на мастере
+            "target": task_data.get("target"),
+            "results": result,
+            "timestamp": time.time(),
+            "error": result.get("error")
+        })
+    
+    def _build_error(self, task_data: Dict[str, Any], error: str) -> Dict[str, Any]:
+        """
+        Формирует ответ об ошибке
+        """
+        TASKS_PROCESSED.labels("failed").inc()
+        return self._with_trace(task_data, {
+            "task_id": task_data.get("task_id"),
+            "worker_id": task_data.get("worker_id"),
+            "status": "failed",
+            "error": error,
+            "timestamp": time.time()
+        })
+    
+    def _with_trace(self, task_data: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Возвращает мастеру трассировку задачи (если она есть) и идентификатор шарда
+        """
+        if "trace" in task_data:
+            response["trace"] = task_data["trace"]
+        if "shard_id" in task_data:
+            response["shard_id"] = task_data["shard_id"]
+        return response
     
     def get_status(self) -> Dict[str, Any]:
         """
@@ -57,16 +294,17 @@ class TaskProcessor:
         return {
             "current_task": self.current_task,
             "ffuf_available": self._check_ffuf_availability(),
+            "default_engine": self.default_engine,
             "timestamp": time.time()
         }
     
     def _check_ffuf_availability(self) -> bool:
         """
-        Проверяет доступность ffuf
+        Проверяет доступность ffuf (результат кэшируется на 5 минут)
         """
-        try:
-            import subprocess
-            result = subprocess.run(["ffuf", "-h"], capture_output=True)
-            return result.returncode == 0
-        except:
-            return False
+        if self._ffuf_available is not None and time.time() - self._ffuf_checked_at < 300:
+            return self._ffuf_available
+        
+        self._ffuf_available = self.ffuf.is_available()
+        self._ffuf_checked_at = time.time()
+        return self._ffuf_available
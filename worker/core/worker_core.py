@@ -4,7 +4,10 @@ import time
 import threading
 import logging
 from typing import Dict, Any
-from .task_processor import TaskProcessor
+from .task_processor import TaskProcessor, mark_stage
+from utils.message_codec import MessageCodec, supported_codecs, negotiate_codec, CODEC_LEGACY_JSON
+from utils import metrics
+from utils.profiling import ProfilerController, store_profile, DEFAULT_PROFILE_TTL
 
 logger = logging.getLogger(__name__)
 
@@ -17,16 +20,40 @@ class WorkerCore:
             password=config.get("redis_password"),
             decode_responses=True
         )
-        self.task_processor = TaskProcessor()
+        # Очереди передают бинарные кадры, поэтому используют клиент без decode_responses
+        self.queue_client = redis.Redis(
+            host=config["redis_host"],
+            port=config["redis_port"],
+            password=config.get("redis_password"),
+            decode_responses=False
+        )
+        self.codec = MessageCodec(
+            compress_threshold=config.get("codec_compress_threshold", 4096),
+            chunk_size=config.get("codec_chunk_size", 1024 * 1024)
+        )
+        # До согласования с мастером результаты отправляются в старом JSON формате
+        self.result_codec = CODEC_LEGACY_JSON
+        # Порог очереди результатов, выше которого воркер приостанавливает отправку
+        self.results_high_water = config.get("results_high_water", 1000)
+        self.backpressure_max_delay = config.get("backpressure_max_delay", 10)
+        self.paused_by_backpressure = False
+        self.task_processor = TaskProcessor(config)
         self.worker_id = config["worker_id"]
         self.is_running = False
         self.threads = config.get("threads", 10)
+        self.processing = False
+        self.metrics_server = None
+        # Профилирование по командам мастера, результат загружается в Redis
+        self.profiler = ProfilerController(self.worker_id, self._upload_profile)
+        self.profile_ttl = config.get("profile_ttl", DEFAULT_PROFILE_TTL)
         
         # Очереди
         self.task_queue = f"tasks:{self.worker_id}"
         self.result_queue = "results"
         self.control_queue = f"control:{self.worker_id}"
         
+        self._register_metrics()
+        
     def start(self):
         """
         Запускает воркер
@@ -36,6 +63,8 @@ class WorkerCore:
         
         # Регистрируем воркера
         self._register_worker()
+        self._load_master_capabilities()
+        self._start_metrics()
         
         # Запускаем потоки для обработки задач и управления
         task_thread = threading.Thread(target=self._task_loop)
@@ -62,9 +91,46 @@ class WorkerCore:
         Останавливает воркер
         """
         self.is_running = False
+        self.profiler.stop()
         self._unregister_worker()
+        self._stop_metrics()
         logger.info(f"Worker {self.worker_id} stopped")
     
+    def _register_metrics(self):
+        """
+        Регистрирует метрики воркера. Значения gauge вычисляются только при запросе /metrics
+        """
+        metrics.gauge("ffuf_worker_info", "Worker identity", ["worker_id", "runtime", "engine"]).labels(
+            self.worker_id, self.config.get("runtime", "async"), self.task_processor.default_engine
+        ).set(1)
+        metrics.gauge("ffuf_worker_running_tasks", "Tasks currently being fuzzed").set_function(
+            self._running_task_count
+        )
+        metrics.gauge("ffuf_worker_threads", "Configured ffuf threads").set_function(lambda: self.threads)
+        metrics.gauge("ffuf_worker_backpressure_paused", "1 while result push is paused").set_function(
+            lambda: int(self.paused_by_backpressure)
+        )
+        metrics.gauge("ffuf_worker_results_queue_depth", "Messages in the shared results queue").set_function(
+            lambda: self.queue_client.llen(self.result_queue)
+        )
+        
+    def _running_task_count(self) -> int:
+        return int(self.processing)
+        
+    def _start_metrics(self):
+        """
+        Запускает /metrics, если задан metrics_port
+        """
+        self.metrics_server = metrics.start_metrics_server(
+            self.config.get("metrics_port", 0),
+            self.config.get("metrics_host", "127.0.0.1")
+        )
+        
+    def _stop_metrics(self):
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
+    
     def _task_loop(self):
         """
         Основной цикл обработки задач
@@ -72,19 +138,34 @@ class WorkerCore:
         while self.is_running:
             try:
                 # Блокирующее получение задачи (таймаут 1 сек)
-                task_data = self.redis_client.blpop(self.task_queue, 1)
+                task_data = self.queue_client.blpop(self.task_queue, 1)
                 
                 if task_data:
-                    _, task_json = task_data
-                    task = json.loads(task_json)
+                    _, raw_task = task_data
+                    task = self.codec.decode(raw_task)
+                    
+                    # None - получен не последний чанк большого сообщения
+                    if task is None:
+                        continue
                     
+                    mark_stage(task, "dequeued")
                     logger.info(f"Received task: {task.get('task_id')}")
                     
                     # Обрабатываем задачу
-                    result = self.task_processor.process_task(task)
+                    self.processing = True
+                    try:
+                        with self.profiler.profiled():
+                            result = self.task_processor.process_task(task)
+                    finally:
+                        self.processing = False
+                    
+                    # Ждем, пока мастер разберет накопившиеся результаты
+                    self._wait_for_results_capacity()
                     
                     # Отправляем результат
-                    self.redis_client.rpush(self.result_queue, json.dumps(result))
+                    mark_stage(result, "result_pushed")
+                    frames = self.codec.encode(result, self.result_codec)
+                    self.queue_client.rpush(self.result_queue, *frames)
                     
             except Exception as e:
                 logger.error(f"Task loop error: {str(e)}")
@@ -97,10 +178,12 @@ class WorkerCore:
         while self.is_running:
             try:
                 # Проверяем управляющие команды
-                command = self.redis_client.lpop(self.control_queue)
+                command = self.queue_client.lpop(self.control_queue)
                 
                 if command:
-                    self._handle_control_command(json.loads(command))
+                    command = self.codec.decode(command)
+                    if command is not None:
+                        self._handle_control_command(command)
                     
                 time.sleep(1)
                 
@@ -114,26 +197,35 @@ class WorkerCore:
         """
         while self.is_running:
             try:
-                health_data = {
-                    "worker_id": self.worker_id,
-                    "status": "active",
-                    "timestamp": time.time(),
-                    "current_threads": self.threads,
-                    "processor_status": self.task_processor.get_status()
-                }
-                
                 self.redis_client.hset(
                     "workers:health",
                     self.worker_id,
-                    json.dumps(health_data)
+                    json.dumps(self._build_health_data())
                 )
                 
+                # Мастер мог перезапуститься с другим набором кодеков
+                self._load_master_capabilities()
+                
                 time.sleep(30)  # Отправляем каждые 30 секунд
                 
             except Exception as e:
                 logger.error(f"Health loop error: {str(e)}")
                 time.sleep(30)
     
+    def _build_health_data(self) -> Dict[str, Any]:
+        """
+        Формирует данные health-check
+        """
+        return {
+            "worker_id": self.worker_id,
+            "status": "active",
+            "timestamp": time.time(),
+            "current_threads": self.threads,
+            "backpressure_paused": self.paused_by_backpressure,
+            "profile": self.profiler.status(),
+            "processor_status": self.task_processor.get_status()
+        }
+    
     def _handle_control_command(self, command: Dict[str, Any]):
         """
         Обрабатывает управляющие команды от мастера
@@ -145,6 +237,21 @@ class WorkerCore:
             self.threads = max(1, min(100, new_threads))  # Ограничение 1-100
             logger.info(f"Threads updated to {self.threads}")
             
+        elif cmd_type in ("start_profile", "tracemalloc_snapshot"):
+            # tracemalloc_snapshot - прирост памяти за окно duration
+            kind = "tracemalloc" if cmd_type == "tracemalloc_snapshot" else command.get("kind", "sampling")
+            self.profiler.start(
+                command.get("profile_id") or f"profile_{self.worker_id}_{int(time.time())}",
+                kind,
+                duration=command.get("duration", 30),
+                interval=command.get("interval", 0.01),
+                frames=command.get("frames", 1),
+                top=command.get("top", 50)
+            )
+            
+        elif cmd_type == "stop_profile":
+            self.profiler.stop(command.get("profile_id"))
+            
         elif cmd_type == "pause":
             # Реализация паузы (можно добавить флаг)
             logger.info("Pause command received")
@@ -152,10 +259,20 @@ class WorkerCore:
         elif cmd_type == "resume":
             logger.info("Resume command received")
             
+        elif cmd_type == "cancel_task":
+            # subprocess.run нельзя прервать - отмена поддерживается только в async runtime
+            logger.warning(f"Cancel of task {command.get('task_id')} is not supported by threaded runtime")
+            
         elif cmd_type == "shutdown":
             logger.info("Shutdown command received")
             self.stop()
     
+    def _upload_profile(self, meta: Dict[str, Any], data: bytes):
+        """
+        Загружает собранный профиль в Redis, откуда его забирает мастер
+        """
+        store_profile(self.queue_client, meta, data, self.profile_ttl)
+    
     def _register_worker(self):
         """
         Регистрирует воркера в системе
@@ -165,7 +282,8 @@ class WorkerCore:
             "status": "active",
             "start_time": time.time(),
             "threads": self.threads,
-            "hostname": self.config.get("hostname", "unknown")
+            "hostname": self.config.get("hostname", "unknown"),
+            "codecs": supported_codecs()
         }
         
         self.redis_client.hset(
@@ -174,6 +292,51 @@ class WorkerCore:
             json.dumps(worker_info)
         )
     
+    def _load_master_capabilities(self):
+        """
+        Согласует формат результатов и лимиты очередей по данным мастера
+        """
+        try:
+            self._apply_master_capabilities(self.redis_client.hgetall("master:capabilities"))
+        except Exception as e:
+            logger.error(f"Loading master capabilities failed: {str(e)}")
+    
+    def _apply_master_capabilities(self, capabilities: Dict[str, Any]):
+        """
+        Применяет опубликованные мастером кодеки и лимиты
+        """
+        master_codecs = capabilities.get("codecs")
+        codec = negotiate_codec(json.loads(master_codecs) if master_codecs else None)
+        
+        if codec != self.result_codec:
+            logger.info(f"Result codec negotiated: {codec}")
+            self.result_codec = codec
+        
+        if capabilities.get("results_high_water"):
+            self.results_high_water = int(capabilities["results_high_water"])
+    
+    def _wait_for_results_capacity(self):
+        """
+        Приостанавливает отправку, пока очередь результатов выше порога
+        """
+        delay = 0.5
+        
+        while self.is_running:
+            backlog = self.queue_client.llen(self.result_queue)
+            if backlog < self.results_high_water:
+                break
+            
+            if not self.paused_by_backpressure:
+                logger.warning(f"Results backlog {backlog} >= {self.results_high_water}, pausing result push")
+                self.paused_by_backpressure = True
+            
+            time.sleep(delay)
+            delay = min(delay * 2, self.backpressure_max_delay)
+        
+        if self.paused_by_backpressure:
+            logger.info("Results backlog drained, resuming result push")
+            self.paused_by_backpressure = False
+    
     def _unregister_worker(self):
         """
         Удаляет воркера из системы
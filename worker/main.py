@@ -8,6 +8,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from core.worker_core import WorkerCore
+from core.async_worker import AsyncWorkerCore
 from utils.config import load_config
 
 def setup_logging(level=logging.INFO):
@@ -28,6 +29,11 @@ def main():
     parser.add_argument('--redis-host', help='Redis host')
     parser.add_argument('--redis-port', type=int, help='Redis port')
     parser.add_argument('--threads', type=int, help='Number of threads')
+    parser.add_argument('--runtime', choices=['async', 'threaded'], help='Worker runtime')
+    parser.add_argument('--max-concurrent-tasks', type=int, help='Parallel ffuf processes (async runtime)')
+    parser.add_argument('--engine', choices=['ffuf', 'native'], help='Default fuzzing engine')
+    parser.add_argument('--ffuf-path', help='Path to ffuf binary')
+    parser.add_argument('--metrics-port', type=int, help='Serve Prometheus metrics on this port (0 disables)')
     parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], 
                        default='INFO', help='Log level')
     
@@ -48,13 +54,26 @@ def main():
         config["redis_port"] = args.redis_port
     if args.threads:
         config["threads"] = args.threads
+    if args.runtime:
+        config["runtime"] = args.runtime
+    if args.max_concurrent_tasks:
+        config["max_concurrent_tasks"] = args.max_concurrent_tasks
+    if args.engine:
+        config["engine"] = args.engine
+    if args.ffuf_path:
+        config["ffuf_path"] = args.ffuf_path
+    if args.metrics_port is not None:
+        config["metrics_port"] = args.metrics_port
     
     logger = logging.getLogger(__name__)
     logger.info(f"Starting worker with config: {config}")
     
     try:
         # Создаем и запускаем воркер
-        worker = WorkerCore(config)
+        if config.get("runtime", "async") == "async":
+            worker = AsyncWorkerCore(config)
+        else:
+            worker = WorkerCore(config)
         worker.start()
         
     except KeyboardInterrupt:
@@ -18,5 +18,14 @@ def load_config(config_path: str = None) -> Dict[str, Any]:
         "redis_password": os.environ.get("REDIS_PASSWORD"),
         "threads": int(os.environ.get("WORKER_THREADS", 10)),
         "hostname": os.environ.get("HOSTNAME", "unknown"),
-        "log_level": os.environ.get("LOG_LEVEL", "INFO")
+        "log_level": os.environ.get("LOG_LEVEL", "INFO"),
+        "codec_compress_threshold": int(os.environ.get("CODEC_COMPRESS_THRESHOLD", 4096)),
+        "codec_chunk_size": int(os.environ.get("CODEC_CHUNK_SIZE", 1024 * 1024)),
+        "results_high_water": int(os.environ.get("RESULTS_HIGH_WATER", 1000)),
+        "runtime": os.environ.get("WORKER_RUNTIME", "async"),
+        "max_concurrent_tasks": int(os.environ.get("MAX_CONCURRENT_TASKS", 1)),
+        "engine": os.environ.get("FUZZ_ENGINE", "ffuf"),
+        "ffuf_path": os.environ.get("FFUF_PATH", "ffuf"),
+        "metrics_port": int(os.environ.get("METRICS_PORT", 0)),
+        "profile_ttl": int(os.environ.get("PROFILE_TTL", 3600))
     }
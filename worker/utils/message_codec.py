@@ -0,0 +1,196 @@
+import json
+import struct
+import threading
+import time
+import uuid
+import zlib
+import logging
+from typing import Dict, List, Any, Optional
+
+try:
+    import msgpack
+except ImportError:  # без msgpack используется JSON-тело внутри бинарного кадра
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Модуль продублирован в master/utils/message_codec.py - изменения вносить в оба файла
+
+MAGIC = b"FFM"
+VERSION = 1
+
+FLAG_MSGPACK = 0x01
+FLAG_ZLIB = 0x02
+FLAG_ZSTD = 0x04
+FLAG_CHUNK = 0x08
+
+HEADER = struct.Struct(">3sBB")
+CHUNK_HEADER = struct.Struct(">16sII")
+
+CODEC_LEGACY_JSON = "json"
+CODEC_FFM_JSON = "ffm1-json"
+CODEC_FFM_MSGPACK = "ffm1-msgpack"
+ZSTD_SUFFIX = "+zstd"
+
+DEFAULT_COMPRESS_THRESHOLD = 4096
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def supported_codecs() -> List[str]:
+    """Возвращает поддерживаемые кодеки в порядке предпочтения"""
+    formats = [CODEC_FFM_JSON]
+    if msgpack is not None:
+        formats.insert(0, CODEC_FFM_MSGPACK)
+    
+    codecs = []
+    for fmt in formats:
+        if zstandard is not None:
+            codecs.append(fmt + ZSTD_SUFFIX)
+        codecs.append(fmt)
+    codecs.append(CODEC_LEGACY_JSON)
+    return codecs
+
+
+def negotiate_codec(remote_codecs: Optional[List[str]]) -> str:
+    """Выбирает лучший кодек, поддерживаемый обеими сторонами"""
+    if not remote_codecs:
+        return CODEC_LEGACY_JSON
+    for codec in supported_codecs():
+        if codec in remote_codecs:
+            return codec
+    return CODEC_LEGACY_JSON
+
+
+class MessageCodec:
+    """
+    Версионированный формат сообщений между мастером и воркерами.
+    
+    Кадр: MAGIC | версия | флаги | [заголовок чанка] | тело.
+    Тело - msgpack или JSON, сжатое zlib/zstd при превышении порога.
+    Большие сообщения режутся на чанки ограниченного размера.
+    Сообщения в старом формате (обычный JSON) принимаются всегда.
+    """
+    
+    def __init__(self, codec: str = None, compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, chunk_ttl: int = 600):
+        self.codec = codec or supported_codecs()[0]
+        self.compress_threshold = compress_threshold
+        self.chunk_size = max(1024, chunk_size)
+        self.chunk_ttl = chunk_ttl
+        self._partials = {}
+        self._partials_lock = threading.Lock()
+        
+    def encode(self, message: Dict[str, Any], codec: str = None) -> List[bytes]:
+        """Кодирует сообщение в один или несколько кадров"""
+        codec = codec or self.codec
+        
+        if codec == CODEC_LEGACY_JSON:
+            return [json.dumps(message).encode("utf-8")]
+            
+        flags = 0
+        if codec.startswith(CODEC_FFM_MSGPACK) and msgpack is not None:
+            body = msgpack.packb(message, use_bin_type=True)
+            flags |= FLAG_MSGPACK
+        else:
+            body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+            
+        if len(body) >= self.compress_threshold:
+            if codec.endswith(ZSTD_SUFFIX) and zstandard is not None:
+                body = zstandard.ZstdCompressor(level=3).compress(body)
+                flags |= FLAG_ZSTD
+            else:
+                body = zlib.compress(body, 6)
+                flags |= FLAG_ZLIB
+                
+        if len(body) <= self.chunk_size:
+            return [HEADER.pack(MAGIC, VERSION, flags) + body]
+            
+        # Режем на чанки, чтобы ни одно значение в Redis не было слишком большим
+        msg_id = uuid.uuid4().bytes
+        total = (len(body) + self.chunk_size - 1) // self.chunk_size
+        frames = []
+        for index in range(total):
+            part = body[index * self.chunk_size:(index + 1) * self.chunk_size]
+            frames.append(
+                HEADER.pack(MAGIC, VERSION, flags | FLAG_CHUNK) +
+                CHUNK_HEADER.pack(msg_id, index, total) +
+                part
+            )
+            
+        logger.debug(f"Encoded message into {total} chunks ({len(body)} bytes)")
+        return frames
+        
+    def decode(self, raw) -> Optional[Dict[str, Any]]:
+        """
+        Декодирует кадр. Возвращает None, если это чанк незавершенного сообщения
+        """
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+            
+        if not raw.startswith(MAGIC):
+            # Старый формат - обычный JSON
+            return json.loads(raw)
+            
+        _, version, flags = HEADER.unpack_from(raw)
+        if version > VERSION:
+            raise ValueError(f"Unsupported message version: {version}")
+            
+        offset = HEADER.size
+        if flags & FLAG_CHUNK:
+            msg_id, index, total = CHUNK_HEADER.unpack_from(raw, offset)
+            body = self._add_chunk(msg_id, index, total, raw[offset + CHUNK_HEADER.size:])
+            if body is None:
+                return None
+        else:
+            body = raw[offset:]
+            
+        return self._decode_body(body, flags)
+        
+    def _decode_body(self, body: bytes, flags: int) -> Dict[str, Any]:
+        """Распаковывает и десериализует тело сообщения"""
+        if flags & FLAG_ZSTD:
+            if zstandard is None:
+                raise ValueError("zstd-compressed message received but zstandard is not installed")
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif flags & FLAG_ZLIB:
+            body = zlib.decompress(body)
+            
+        if flags & FLAG_MSGPACK:
+            if msgpack is None:
+                raise ValueError("msgpack message received but msgpack is not installed")
+            return msgpack.unpackb(body, raw=False)
+        return json.loads(body)
+        
+    def _add_chunk(self, msg_id: bytes, index: int, total: int, part: bytes) -> Optional[bytes]:
+        """Накапливает чанки и возвращает собранное тело, когда пришли все части"""
+        with self._partials_lock:
+            partial = self._partials.setdefault(msg_id, {
+                "total": total,
+                "parts": {},
+                "received_at": time.time()
+            })
+            partial["parts"][index] = part
+            
+            if len(partial["parts"]) < partial["total"]:
+                return None
+                
+            del self._partials[msg_id]
+        return b"".join(partial["parts"][i] for i in range(partial["total"]))
+        
+    def expire_partials(self) -> int:
+        """Удаляет недособранные сообщения старше chunk_ttl"""
+        deadline = time.time() - self.chunk_ttl
+        with self._partials_lock:
+            expired = [msg_id for msg_id, partial in self._partials.items()
+                       if partial["received_at"] < deadline]
+            for msg_id in expired:
+                del self._partials[msg_id]
+                
+        if expired:
+            logger.warning(f"Dropped {len(expired)} incomplete chunked messages")
+        return len(expired)
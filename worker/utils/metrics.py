@@ -0,0 +1,360 @@
+import time
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Модуль продублирован в master/utils/metrics.py - изменения вносить в оба файла
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Timer:
+    """Контекстный менеджер, записывающий длительность блока в гистограмму"""
+    
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.started = 0.0
+        
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+        
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Metric:
+    """
+    Базовая метрика. Метрика с метками хранит дочерние значения
+    по кортежу значений меток, без меток - одно значение.
+    """
+    
+    type_name = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        
+    def labels(self, *values, **kwargs):
+        """Возвращает дочернюю метрику для набора значений меток"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}")
+            
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+        
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"Metric {self.name} requires labels {self.labelnames}")
+        return self.labels()
+        
+    def _new_child(self):
+        raise NotImplementedError
+        
+    def collect(self) -> List[str]:
+        """Возвращает строки в текстовом формате Prometheus"""
+        if not self.labelnames:
+            # Метрика без меток отдается с нулевым значением еще до первого изменения
+            self._default()
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+        
+    def _render_child(self, values: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}"]
+
+
+class _Value:
+    """Числовое значение, изменяемое под блокировкой"""
+    
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+        
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+            
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self._value -= amount
+            
+    def set(self, value: float):
+        self._value = float(value)
+        
+    def get(self) -> float:
+        return self._value
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик"""
+    
+    type_name = "counter"
+    
+    def _new_child(self):
+        return _Value()
+        
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+
+class Gauge(Metric):
+    """
+    Значение, которое может расти и уменьшаться.
+    Через set_function значение вычисляется только в момент запроса /metrics,
+    поэтому дорогие источники (например, длина очередей Redis) ничего не стоят,
+    пока метрики никто не собирает.
+    """
+    
+    type_name = "gauge"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], Any]] = None
+        
+    def _new_child(self):
+        return _Value()
+        
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+        
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+        
+    def set(self, value: float):
+        self._default().set(value)
+        
+    def set_function(self, function: Callable[[], Any]):
+        """
+        Задает функцию, вызываемую при сборе метрик. Для метрики без меток
+        функция возвращает число, с метками - словарь {значения меток: число}
+        """
+        self._function = function
+        
+    def collect(self) -> List[str]:
+        if self._function is None:
+            return super().collect()
+            
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        try:
+            value = self._function()
+        except Exception as e:
+            logger.error(f"Failed to collect metric {self.name}: {str(e)}")
+            return lines
+            
+        if not self.labelnames:
+            lines.append(f"{self.name} {_format_value(value)}")
+            return lines
+            
+        for values, sample in value.items():
+            if not isinstance(values, tuple):
+                values = (values,)
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(sample)}")
+        return lines
+
+
+class _HistogramValue:
+    """Накопленные значения одной гистограммы"""
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+        
+    def observe(self, value: float):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+                    
+    def time(self) -> _Timer:
+        return _Timer(self)
+        
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Histogram(Metric):
+    """Распределение значений (длительности, размеры) по корзинам"""
+    
+    type_name = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+        
+    def observe(self, value: float):
+        self._default().observe(value)
+        
+    def time(self) -> _Timer:
+        return self._default().time()
+        
+    def _render_child(self, values: Tuple[str, ...], child) -> List[str]:
+        counts, total, count = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            
+        labels = _format_labels(self.labelnames, values, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{labels} {count}")
+        
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Набор метрик процесса"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+        
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames, **kwargs) -> Metric:
+        # Повторная регистрация возвращает существующую метрику - модули можно импортировать многократно
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, tuple(labelnames), **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as {metric.type_name}")
+            return metric
+            
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+        
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+        
+    def histogram(self, name: str, documentation: str, labelnames=(),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+        
+    def render(self) -> str:
+        """Возвращает все метрики в текстовом формате Prometheus"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames=()) -> Counter:
+    return REGISTRY.counter(name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames=()) -> Gauge:
+    return REGISTRY.gauge(name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames=(),
+              buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.histogram(name, documentation, labelnames, buckets)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+    
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+            
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """HTTP сервер /metrics в фоновом потоке"""
+    
+    def __init__(self, port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY):
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+        
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+        
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+        logger.info(f"Metrics endpoint listening on http://{self.server.server_address[0]}:{self.port}/metrics")
+        
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> Optional[MetricsServer]:
+    """Запускает /metrics, если задан порт (0 - метрики по HTTP не отдаются)"""
+    if not port:
+        return None
+        
+    try:
+        server = MetricsServer(port, host)
+        server.start()
+        return server
+    except OSError as e:
+        logger.error(f"Failed to start metrics endpoint on port {port}: {str(e)}")
+        return None
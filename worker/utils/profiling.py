@@ -0,0 +1,319 @@
+import io
+import os
+import sys
+import json
+import time
+import zlib
+import marshal
+import pstats
+import cProfile
+import threading
+import tracemalloc
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Модуль продублирован в master/utils/profiling.py - изменения вносить в оба файла
+
+PROFILE_KINDS = ("cprofile", "sampling", "tracemalloc")
+# Формат и расширение файла, в котором профиль сохраняется на мастере
+PROFILE_FORMATS = {
+    "cprofile": ("pstats", ".prof"),
+    "sampling": ("collapsed", ".collapsed"),
+    "tracemalloc": ("text", ".txt")
+}
+
+MAX_PROFILE_DURATION = 600
+PROFILE_INDEX = "profiles:index"
+DEFAULT_PROFILE_TTL = 3600
+
+# С Python 3.12 cProfile работает через sys.monitoring и профилирует все потоки
+# процесса сразу. В более старых версиях профилировщик действует только в потоке,
+# который его включил, поэтому профилируются блоки, обернутые в profiled()
+PROCESS_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+
+def profile_key(profile_id: str) -> str:
+    return f"profiles:data:{profile_id}"
+
+
+class SamplingProfiler:
+    """
+    Сэмплирующий профилировщик: фоновый поток через sys._current_frames()
+    снимает стеки всех потоков с заданным интервалом. Накладные расходы не
+    зависят от числа вызовов функций, поэтому его можно включать под нагрузкой.
+    Результат - свернутые стеки (формат flamegraph.pl / speedscope)
+    """
+    
+    def __init__(self, interval: float = 0.01):
+        self.interval = max(0.001, interval)
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        
+    def stop(self) -> bytes:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+        
+    def _run(self):
+        own_id = threading.get_ident()
+        
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                    
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                    
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+
+class _ProfileSession:
+    """Активный сеанс профилирования"""
+    
+    def __init__(self, profile_id: str, kind: str, duration: float, options: Dict[str, Any]):
+        self.profile_id = profile_id
+        self.kind = kind
+        self.duration = duration
+        self.options = options
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.timer = None
+        # cprofile
+        self.stats = pstats.Stats()
+        self.profiler = None
+        # sampling
+        self.sampler = None
+        # tracemalloc
+        self.started_tracemalloc = False
+        self.snapshot = None
+
+
+class ProfilerController:
+    """
+    Управляет профилированием процесса по командам мастера.
+    
+    Одновременно активен один сеанс. Сеанс ограничен по времени: по истечении
+    duration (или по команде stop) результат собирается в фоновом потоке и
+    передается в on_complete(meta, data) - обычно для загрузки в Redis.
+    """
+    
+    def __init__(self, source: str, on_complete: Callable[[Dict[str, Any], bytes], None]):
+        self.source = source
+        self.on_complete = on_complete
+        self.session: Optional[_ProfileSession] = None
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        
+    def start(self, profile_id: str, kind: str = "sampling", duration: float = 30,
+              interval: float = 0.01, frames: int = 1, top: int = 50) -> bool:
+        """Запускает сеанс профилирования, возвращает False, если он не запущен"""
+        if kind not in PROFILE_KINDS:
+            logger.error(f"Unsupported profile kind: {kind}")
+            return False
+            
+        duration = max(1, min(float(duration or 30), MAX_PROFILE_DURATION))
+        
+        with self.lock:
+            if self.session is not None:
+                logger.warning(f"Profile {self.session.profile_id} is already running, ignoring {profile_id}")
+                return False
+                
+            session = _ProfileSession(profile_id, kind, duration, {"interval": interval, "frames": frames, "top": top})
+            try:
+                if kind == "cprofile" and PROCESS_WIDE_CPROFILE:
+                    session.profiler = cProfile.Profile()
+                    session.profiler.enable()
+                elif kind == "sampling":
+                    session.sampler = SamplingProfiler(interval)
+                    session.sampler.start()
+                elif kind == "tracemalloc":
+                    if not tracemalloc.is_tracing():
+                        tracemalloc.start(max(1, frames))
+                        session.started_tracemalloc = True
+                    session.snapshot = tracemalloc.take_snapshot()
+            except Exception as e:
+                logger.error(f"Failed to start {kind} profile: {str(e)}")
+                return False
+                
+            session.timer = threading.Timer(duration, self._finish, args=(session,))
+            session.timer.daemon = True
+            session.timer.start()
+            self.session = session
+            
+        logger.info(f"Started {kind} profile {profile_id} for {duration:.0f}s")
+        return True
+        
+    def stop(self, profile_id: str = None):
+        """Досрочно завершает сеанс (результат собирается в фоновом потоке)"""
+        session = self.session
+        if session is None or (profile_id and session.profile_id != profile_id):
+            logger.info(f"Profile {profile_id or ''} is not running")
+            return
+            
+        session.timer.cancel()
+        threading.Thread(target=self._finish, args=(session,), daemon=True).start()
+        
+    def status(self) -> Optional[Dict[str, Any]]:
+        session = self.session
+        if session is None:
+            return None
+        return {
+            "profile_id": session.profile_id,
+            "kind": session.kind,
+            "started_at": session.started_at,
+            "duration": session.duration
+        }
+        
+    @contextmanager
+    def profiled(self):
+        """
+        Профилирует блок работы (обработку задачи или результата) в текущем
+        потоке, пока идет сеанс cprofile. Вложенные и перекрывающиеся блоки
+        одного потока (корутины в event loop) используют общий профилировщик
+        """
+        session = self.session
+        if session is None or session.kind != "cprofile" or PROCESS_WIDE_CPROFILE:
+            yield
+            return
+            
+        local = self._local
+        if not getattr(local, "depth", 0):
+            local.depth = 0
+            local.session = session
+            local.profiler = cProfile.Profile()
+            try:
+                local.profiler.enable()
+            except ValueError:
+                # Поток уже профилируется другим инструментом
+                local.profiler = None
+        local.depth += 1
+        
+        try:
+            yield
+        finally:
+            local.depth -= 1
+            if local.depth == 0 and local.profiler is not None:
+                local.profiler.disable()
+                self._merge(local.session, local.profiler)
+                local.profiler = None
+                
+    def _merge(self, session: _ProfileSession, profiler: cProfile.Profile):
+        with session.lock:
+            # Блоки, завершившиеся после сбора результата, отбрасываются
+            if self.session is session:
+                session.stats.add(profiler)
+                
+    def _finish(self, session: _ProfileSession):
+        """Собирает результат сеанса и передает его в on_complete"""
+        with self.lock:
+            if self.session is not session:
+                return
+            self.session = None
+            
+        meta = {
+            "profile_id": session.profile_id,
+            "source": self.source,
+            "kind": session.kind,
+            "format": PROFILE_FORMATS[session.kind][0],
+            "extension": PROFILE_FORMATS[session.kind][1],
+            "started_at": session.started_at,
+            "finished_at": time.time(),
+            "duration": round(time.time() - session.started_at, 3)
+        }
+        
+        try:
+            if session.kind == "cprofile":
+                with session.lock:
+                    if session.profiler is not None:
+                        session.profiler.disable()
+                        session.stats.add(session.profiler)
+                    data = marshal.dumps(session.stats.stats)
+                meta["functions"] = len(session.stats.stats)
+            elif session.kind == "sampling":
+                data = session.sampler.stop()
+                meta["samples"] = session.sampler.samples
+            else:
+                data = self._tracemalloc_report(session)
+        except Exception as e:
+            logger.error(f"Failed to collect profile {session.profile_id}: {str(e)}")
+            meta["error"] = str(e)
+            data = b""
+        finally:
+            if session.started_tracemalloc:
+                tracemalloc.stop()
+                
+        meta["size"] = len(data)
+        
+        try:
+            self.on_complete(meta, data)
+            logger.info(f"Profile {session.profile_id} collected ({len(data)} bytes)")
+        except Exception as e:
+            logger.error(f"Failed to upload profile {session.profile_id}: {str(e)}")
+            
+    def _tracemalloc_report(self, session: _ProfileSession) -> bytes:
+        """Прирост памяти за время сеанса по строкам кода"""
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        top = session.options["top"]
+        
+        output = io.StringIO()
+        output.write(f"tracemalloc report for {self.source}, window {time.time() - session.started_at:.1f}s\n")
+        output.write(f"Traced memory: current {current / 1024 / 1024:.1f} MiB, peak {peak / 1024 / 1024:.1f} MiB\n")
+        
+        output.write(f"\nTop {top} allocation changes during the window:\n")
+        for stat in snapshot.compare_to(session.snapshot, "lineno")[:top]:
+            output.write(f"{stat}\n")
+            
+        output.write(f"\nTop {top} live allocations:\n")
+        for stat in snapshot.statistics("lineno")[:top]:
+            output.write(f"{stat}\n")
+            
+        return output.getvalue().encode("utf-8")
+
+
+def store_profile(client, meta: Dict[str, Any], data: bytes, ttl: int = DEFAULT_PROFILE_TTL):
+    """Сохраняет профиль в Redis (client без decode_responses)"""
+    pipe = client.pipeline()
+    pipe.set(profile_key(meta["profile_id"]), zlib.compress(data), ex=ttl)
+    pipe.hset(PROFILE_INDEX, meta["profile_id"], json.dumps(meta))
+    pipe.execute()
+
+
+def list_profiles(client) -> List[Dict[str, Any]]:
+    """Возвращает метаданные доступных профилей, удаляя из индекса истекшие"""
+    profiles = []
+    for profile_id, meta_json in client.hgetall(PROFILE_INDEX).items():
+        if isinstance(profile_id, bytes):
+            profile_id = profile_id.decode()
+        if not client.exists(profile_key(profile_id)):
+            client.hdel(PROFILE_INDEX, profile_id)
+            continue
+        profiles.append(json.loads(meta_json))
+    return sorted(profiles, key=lambda meta: meta.get("started_at", 0), reverse=True)
+
+
+def load_profile(client, profile_id: str) -> Optional[bytes]:
+    """Загружает профиль из Redis, None - профиль истек или не найден"""
+    data = client.get(profile_key(profile_id))
+    if data is None:
+        return None
+    return zlib.decompress(data)